@@ -27,10 +27,12 @@ from gwproto.named_types import (
 from gwproto.named_types.web_server_gt import DEFAULT_WEB_SERVER_NAME
 from actors.scada_actor import ScadaActor
 from enums import LogLevel
-from named_types import Glitch, PicoMissing
+from named_types import Glitch, PicoMissing, TicklistBatch
 from pydantic import BaseModel
 from result import Ok, Result
-from drivers.pipe_flow_sensor.signal_processing import butter_lowpass, filtering
+from drivers.pipe_flow_sensor.hz_estimator import StreamingHzEstimator
+from drivers.pipe_flow_sensor.signal_processing import filtering, lowpass_design
+from drivers.pipe_flow_sensor.ticklist_codec import TicklistBatcher
 
 
 FLATLINE_REPORT_S = 60
@@ -103,6 +105,19 @@ class ApiFlowModule(ScadaActor):
             self.slow_turner = True
 
         self.validate_config_params()
+        # Stateful filtering of the new ticks only, instead of re-filtering each ticklist
+        self.hz_estimator: Optional[StreamingHzEstimator] = None
+        if self.settings.flow_hz_streaming and not self.slow_turner:
+            butterworth = self._component.gt.HzCalcMethod == HzCalcMethod.BasicButterWorth
+            self.hz_estimator = StreamingHzEstimator(
+                no_flow_ms=self._component.gt.NoFlowMs,
+                exp_alpha=None if butterworth else self._component.gt.ExpAlpha,
+                cutoff_frequency=self._component.gt.CutoffFrequency if butterworth else None,
+            )
+        # Ticklists forwarded to the atn in compressed batches instead of one message each
+        self.ticklist_batcher: Optional[TicklistBatcher] = None
+        if self.settings.seconds_per_ticklist_batch > 0 and self._component.gt.SendTickLists:
+            self.ticklist_batcher = TicklistBatcher(self.settings.seconds_per_ticklist_batch)
         if self._component.gt.Enabled:
             if self._component.cac.MakeModel == MakeModel.GRIDWORKS__PICOFLOWHALL:
                 self._services.add_web_route(
@@ -207,6 +222,8 @@ class ApiFlowModule(ScadaActor):
             ):
                 self.latest_gpm = None
                 self.latest_hz = None
+                if self.hz_estimator is not None:
+                    self.hz_estimator.reset()
                 self._send_to(
                     self.pico_cycler,
                     PicoMissing(
@@ -215,6 +232,8 @@ class ApiFlowModule(ScadaActor):
                     ),
                 )
                 self.last_error_report = time.time()
+            if self.ticklist_batcher is not None and self.ticklist_batcher.due():
+                self.flush_ticklist_batch()
             # publish readings synchronously every capture_s
             try:
                 if time.time() > self.next_sync_s:
@@ -440,6 +459,8 @@ class ApiFlowModule(ScadaActor):
         )
 
     def publish_zero_flow(self):
+        if self.hz_estimator is not None:
+            self.hz_estimator.reset()
         channel_names = [self.gpm_channel.Name]
         values = [0]
         # if there weren't any ticks, then we want to set the flow
@@ -508,14 +529,13 @@ class ApiFlowModule(ScadaActor):
         # now we can assume we have at least one tick
         self.update_timestamps_for_reed(data)
         if self._component.gt.SendTickLists:
-            self._send_to(
-                self.atn,
+            self.forward_ticklist(
                 TicklistReedReport(
                     TerminalAssetAlias=self.services.hardware_layout.terminal_asset_g_node_alias,
                     ChannelName=self.name,
                     ScadaReceivedUnixMs=int(time.time() * 1000),
                     Ticklist=data,
-                ),
+                )
             )
         if len(data.RelativeMillisecondList) == 1:
             final_tick_ns = self.nano_timestamps[-1]
@@ -526,6 +546,8 @@ class ApiFlowModule(ScadaActor):
             self.latest_tick_ns = final_tick_ns
             self.latest_report_ns = final_tick_ns
             self.latest_hz = 0
+            if self.hz_estimator is not None:
+                self.hz_estimator.reset()
             if self.slow_turner:
                 micro_hz_readings = ChannelReadings(
                     ChannelName=self.hz_channel.Name,
@@ -578,14 +600,13 @@ class ApiFlowModule(ScadaActor):
                 self.publish_zero_flow()
         else:
             if self._component.gt.SendTickLists:
-                self._send_to(
-                    self.atn,
+                self.forward_ticklist(
                     TicklistHallReport(
                         TerminalAssetAlias=self.services.hardware_layout.terminal_asset_g_node_alias,
                         ChannelName=self._component.gt.FlowNodeName,
                         ScadaReceivedUnixMs=int(time.time() * 1000),
                         Ticklist=data,
-                    ),
+                    )
                 )
             self.ticklist = data
             self.update_timestamps_for_hall(data)
@@ -597,6 +618,27 @@ class ApiFlowModule(ScadaActor):
                     if self._component.gt.SendHz:
                         self._send_to(self.primary_scada, hz_readings)
 
+    def forward_ticklist(self, report: TicklistHallReport | TicklistReedReport) -> None:
+        if self.ticklist_batcher is None:
+            self._send_to(self.atn, report)
+        else:
+            self.send_ticklist_batch(self.ticklist_batcher.add(report))
+
+    def flush_ticklist_batch(self) -> None:
+        self.send_ticklist_batch(self.ticklist_batcher.flush())
+
+    def send_ticklist_batch(self, batch: Optional[TicklistBatch]) -> None:
+        if batch is None:
+            return
+        self._send_to(self.atn, batch)
+        counter = self.ticklist_batcher.counter
+        if counter.ticks:
+            self.services.logger.info(
+                f"[{self.name}] Sent {batch.TicklistCount} ticklists ({batch.TickCount} ticks) to the atn. "
+                f"{counter.encoded_bytes_per_tick:.2f} bytes per tick instead of "
+                f"{counter.raw_bytes_per_tick:.2f} since start"
+            )
+
     def process_message(self, message: Message) -> Result[bool, BaseException]:
         match message.Payload:
             case TicklistReed():
@@ -616,6 +658,8 @@ class ApiFlowModule(ScadaActor):
         Here we stop periodic reporting task.
         """
         self._stop_requested = True
+        if self.ticklist_batcher is not None:
+            self.flush_ticklist_batch()
 
     async def join(self) -> None:
         """IOLoop will take care of shutting down the associated task."""
@@ -644,6 +688,17 @@ class ApiFlowModule(ScadaActor):
             raise ValueError(
                 "Should only call get_hz_readings with at least 2 timestamps!"
             )
+        if self.hz_estimator is not None:
+            sampled_timestamps, smoothed_frequencies = self.hz_estimator.update(self.nano_timestamps)
+            if len(sampled_timestamps) == 0:
+                return ChannelReadings(
+                    ChannelName=self.hz_channel.Name,
+                    ValueList=[],
+                    ScadaReadTimeUnixMsList=[],
+                )
+            return self.micro_hz_readings_on_change(
+                sampled_timestamps.tolist(), smoothed_frequencies.tolist(), first_reading=self.latest_hz is None
+            )
         first_reading = False
 
         # Sort timestamps and compute frequencies
@@ -726,7 +781,7 @@ class ApiFlowModule(ScadaActor):
                 # Re-sample frequency accordingly using a linear interpolaton
                 sampled_frequencies = np.interp(sampled_timestamps, timestamps, frequencies)
                 # Butterworth low-pass filter
-                b, a = butter_lowpass(N=5, Wn=self._component.gt.CutoffFrequency, fs=f_s)
+                b, a, _ = lowpass_design(self._component.gt.CutoffFrequency, f_s)
                 smoothed_frequencies = filtering(b, a, sampled_frequencies)
                 # Remove points resulting from adding the first recorded frequency
                 smoothed_frequencies = [smoothed_frequencies[i] for i in range(len(smoothed_frequencies)) 
@@ -754,7 +809,11 @@ class ApiFlowModule(ScadaActor):
                 ValueList=[int(x*1e6) for x in smoothed_frequencies],
                 ScadaReadTimeUnixMsList=[int(x/1e6) for x in sampled_timestamps],
             )
-        
+        return self.micro_hz_readings_on_change(sampled_timestamps, smoothed_frequencies, first_reading)
+
+    def micro_hz_readings_on_change(
+            self, sampled_timestamps: Sequence[float], smoothed_frequencies: Sequence[float], first_reading: bool
+    ) -> ChannelReadings:
         # Record Hz on change
         threshold_gpm = self._component.gt.AsyncCaptureThresholdGpmTimes100 / 100
         gallons_per_tick = self._component.gt.ConstantGallonsPerTick
@@ -1,10 +1,10 @@
 import asyncio
 import json
-import math
 import time
 from functools import cached_property
 from typing import List, Literal, Optional, Sequence
 
+import numpy as np
 from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from gw.errors import DcError
@@ -20,12 +20,9 @@ from gwproto.named_types.web_server_gt import DEFAULT_WEB_SERVER_NAME
 from pydantic import BaseModel
 from result import Ok, Result
 from actors.scada_actor import ScadaActor
+from drivers.thermistor import PicoTankThermistor, c_to_f, pico_tank_thermistor
 from named_types import PicoMissing, ChannelFlatlined
 
-R_FIXED_KOHMS = 5.65  # The voltage divider resistors in the TankModule
-THERMISTOR_T0 = 298  # i.e. 25 degrees
-THERMISTOR_R0_KOHMS = 10  # The R0 of the NTC thermistor - an industry standard
-
 FLATLINE_REPORT_S = 60
 
 
@@ -86,6 +83,20 @@ class ApiTankModule(ScadaActor):
             self.depth4_channel = self.layout.data_channels[f"{self.name}-depth4"]
         except KeyError as e:
             raise Exception(f"Problem setting up ApiTankModule channels! {e}")
+        # Indexed once: depth1 holds the capture period of the tank module
+        self.depth1_config = next(
+            (
+                cfg
+                for cfg in self._component.gt.ConfigList
+                if cfg.ChannelName == f"{self.name}-depth1"
+            ),
+            None,
+        )
+        self.thermistor: Optional[PicoTankThermistor] = None
+        if self._component.gt.PicoKOhms is not None:
+            self.thermistor = pico_tank_thermistor(
+                self._component.gt.ThermistorBeta, self._component.gt.PicoKOhms
+            )
 
     @cached_property
     def microvolts_path(self) -> str:
@@ -161,15 +172,7 @@ class ApiTankModule(ScadaActor):
             return Response()
 
         if self.is_valid_pico_uid(params):
-            cfg = next(
-                (
-                    cfg
-                    for cfg in self._component.gt.ConfigList
-                    if cfg.ChannelName == f"{self.name}-depth1"
-                ),
-                None,
-            )
-
+            cfg = self.depth1_config
             period = cfg.CapturePeriodS
             offset = round(period - time.time() % period, 3) - 2
             new_params = TankModuleParams(
@@ -228,29 +231,44 @@ class ApiTankModule(ScadaActor):
             return
         channel_name_list = []
         value_list = []
+        temps_c = None
+        if self._component.gt.TempCalcMethod == TempCalcMethod.SimpleBetaForPico:
+            try:
+                temps_c = self.simple_beta_for_pico(np.array(data.MicroVoltsList) / 1e6)
+            except BaseException as e:
+                self.services.send_threadsafe(
+                    Message(
+                        Payload=Problems(
+                            msg=f"Volts to temp problem for {data.AboutNodeNameList}",
+                            errors=[e],
+                        ).problem_event(
+                            summary=f"Volts to temp problem for {self.name}",
+                        )
+                    )
+                )
         for i in range(len(data.AboutNodeNameList)):
-            volts = data.MicroVoltsList[i] / 1e6
             if self._component.gt.SendMicroVolts:
                 value_list.append(data.MicroVoltsList[i])
                 channel_name_list.append(f"{data.AboutNodeNameList[i]}-micro-v")
-                #print(f"Updated {channel_name_list[-1]}: {round(volts,3)} V")
             if self._component.gt.TempCalcMethod == TempCalcMethod.SimpleBetaForPico:
-                try:
-                    value_list.append(int(self.simple_beta_for_pico(volts) * 1000))
-                    channel_name_list.append(data.AboutNodeNameList[i])
-                except BaseException as e:
+                if temps_c is None:
+                    continue
+                if np.isnan(temps_c[i]):
                     self.services.send_threadsafe(
                         Message(
                             Payload=Problems(
                                 msg=(
                                     f"Volts to temp problem for {data.AboutNodeNameList[i]}"
                                 ),
-                                errors=[e],
+                                errors=[ValueError("Disconnected thermistor!")],
                             ).problem_event(
                                 summary=(f"Volts to temp problem for {data.AboutNodeNameList[i]}"),
                             )
                         )
                     )
+                    continue
+                value_list.append(int(temps_c[i] * 1000))
+                channel_name_list.append(data.AboutNodeNameList[i])
             else:
                 raise Exception(f"No code for {self._component.gt.TempCalcMethod}!")
         msg = SyncedReadings(
@@ -281,12 +299,7 @@ class ApiTankModule(ScadaActor):
         """IOLoop will take care of shutting down the associated task."""
 
     def flatline_seconds(self) -> int:
-        cfg = next(
-            cfg
-            for cfg in self._component.gt.ConfigList
-            if cfg.ChannelName == f"{self.name}-depth1"
-        )
-        return cfg.CapturePeriodS
+        return self.depth1_config.CapturePeriodS
 
     @property
     def monitored_names(self) -> Sequence[MonitoredName]:
@@ -332,42 +345,18 @@ class ApiTankModule(ScadaActor):
                     self.last_error_report = time.time()
             await asyncio.sleep(10)
 
-    def simple_beta_for_pico(self, volts: float, fahrenheit=False) -> float:
+    def simple_beta_for_pico(self, volts: np.ndarray, fahrenheit=False) -> np.ndarray:
         """
-        Return temperature Celcius as a function of volts.
-        Uses a fixed estimated resistance for the pico
-        """
-        r_therm_kohms = self.thermistor_resistance(volts)
-        return self.temp_beta(r_therm_kohms, fahrenheit=fahrenheit)
-
-    def temp_beta(self, r_therm_kohms: float, fahrenheit: bool = False) -> float:
-        """
-        beta formula specs for the Amphenol MA100GG103BN
-        Uses T0 and R0 are a matching pair of values: this is a 10 K thermistor
-        which means at 25 deg C (T0) it has a resistance of 10K Ohms
+        Return temperatures Celcius as a function of volts, NaN for a disconnected thermistor.
+        Uses a fixed estimated resistance for the pico, and the beta formula specs for the
+        Amphenol MA100GG103BN (see drivers.thermistor)
 
         [More info](https://drive.google.com/drive/u/0/folders/1f8SaqCHOFt8iJNW64A_kNIBGijrJDlsx)
         """
-        t0, r0 = (
-            THERMISTOR_T0,
-            THERMISTOR_R0_KOHMS,
-        )
-        beta = self._component.gt.ThermistorBeta
-        r_therm = r_therm_kohms
-        temp_c = 1 / ((1 / t0) + (math.log(r_therm / r0) / beta)) - 273
-
-        temp_f = 32 + (temp_c * 9 / 5)
-        return round(temp_f, 2) if fahrenheit else round(temp_c, 2)
-
-    def thermistor_resistance(self, volts):
-        r_fixed = R_FIXED_KOHMS
-        r_pico = self._component.gt.PicoKOhms
-        if r_pico is None:
+        if self.thermistor is None:
             raise DcError(f"{self.name} component missing PicoKOhms!")
-        r_therm = 1 / ((3.3 / volts - 1) / r_fixed - 1 / r_pico)
-        if r_therm <= 0:
-            raise ValueError("Disconnected thermistor!")
-        return r_therm
+        temp_c = self.thermistor.temp_c(volts)
+        return np.round(c_to_f(temp_c), 2) if fahrenheit else np.round(temp_c, 2)
 
     @property
     def pico_cycler(self) -> Optional[ShNode]:
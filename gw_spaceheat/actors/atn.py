@@ -18,6 +18,10 @@ import random
 import rich
 import httpx
 from actors.flo import DGraph
+from actors.flo_process import FloProcess
+from actors.report_codec import decode_report
+from actors.snapshot_delta import SnapshotAssembler
+from drivers.pipe_flow_sensor.ticklist_codec import TicklistByteCounter, decode_ticklist_batch
 from data_classes.house_0_layout import House0Layout
 from data_classes.house_0_names import H0CN, H0N
 from enums import MarketPriceUnit, MarketQuantityUnit, MarketTypeName
@@ -36,10 +40,10 @@ from gwproto.messages import (EventBase, PowerWatts, Report, ReportEvent)
 from gwproto.named_types import AnalogDispatch, SendSnap, MachineStates
 from actors.atn_contract_handler import AtnContractHandler
 from enums import ContractStatus, LogLevel
-from named_types import (AtnBid, FloParamsHouse0, Glitch, Ha1Params, LatestPrice, LayoutLite, 
-                         NoNewContractWarning, PriceQuantityUnitless, 
+from named_types import (AtnBid, CompactReportEvent, FloParamsHouse0, Glitch, Ha1Params, LatestPrice, LayoutLite, 
+                         NoNewContractWarning, PriceQuantityUnitless, ReportEncoding,
                          ScadaParams, SendLayout,
-                         SlowContractHeartbeat,  SnapshotSpaceheat)
+                         SlowContractHeartbeat, SnapshotDelta, SnapshotSpaceheat, TicklistBatch)
 
 from paho.mqtt.client import MQTTMessageInfo
 from pydantic import BaseModel
@@ -67,7 +71,9 @@ class BidRunner(threading.Thread):
                  atn_g_node_alias: str,
                  send_threadsafe: Callable[[Message], None],
                  on_complete: Callable[[str], None],
-                 logger: LoggerOrAdapter):
+                 logger: LoggerOrAdapter,
+                 graph: Optional[DGraph] = None,
+                 flo_process: Optional[FloProcess] = None):
         super().__init__()
         self.stop_event = threading.Event()
         self.logger = logger or print  # Fallback to print if no logger provided
@@ -79,26 +85,65 @@ class BidRunner(threading.Thread):
         self.on_complete = on_complete
         self.bid: Optional[AtnBid] = None
         self.get_bid_event = threading.Event()
+        # Graph kept from a previous BidRunner when atn_settings.flo_persistent_graph is set
+        self.graph = graph
+        # With atn_settings.flo_process_mode the graph lives in this worker process instead,
+        # and only the PQ pairs come back to the Atn
+        self.flo_process = flo_process
+        # True while solving or generating the bid, for the event loop lag metrics
+        self.busy = False
 
     def run(self):
         try:
             while not self.stop_event.is_set():
                 # Run FLO
                 self.logger.info("Creating graph and solving Dijkstra...")
+                self.busy = True
                 st = time.time()
-                g = DGraph(self.params, self.logger)
-                g.solve_dijkstra()
-                self.logger.info(f"Built and solved in {round(time.time()-st,2)} seconds!")
-                # After solving, trim the graph to reduce memory usage while waiting
-                g.trim_graph_for_waiting()
+                if self.flo_process is not None:
+                    solve_seconds = self.flo_process.solve(self.params, logger=self.logger)
+                    self.logger.info(
+                        f"Built and solved in a worker process in {round(solve_seconds,2)} seconds "
+                        f"({round(time.time()-st,2)} seconds with the hand-off)"
+                    )
+                else:
+                    if self.atn_settings.flo_persistent_graph and self.graph is not None:
+                        g = self.graph
+                        g.refresh(self.params)
+                    else:
+                        g = DGraph(
+                            self.params,
+                            self.logger,
+                            vectorized_solver=self.atn_settings.flo_vectorized_solver,
+                            persistent=self.atn_settings.flo_persistent_graph,
+                        )
+                        if self.atn_settings.flo_persistent_graph:
+                            self.graph = g
+                    g.solve_dijkstra()
+                    self.logger.info(f"Built and solved in {round(time.time()-st,2)} seconds!")
                 # Pause until get_bid is called
+                self.busy = False
                 self.get_bid_event.clear()
                 self.logger.info("BidRunner waiting for get_bid to be called before computing bid.")
                 self.get_bid_event.wait()
 
                 self.logger.info("Generating bid...")
-                g.generate_bid(self.updated_flo_params)
-                self.logger.info(f"Done! Found {len(g.pq_pairs)} PQ pairs.")
+                self.busy = True
+                price_grid = dict(
+                    min_price_usd_mwh=self.atn_settings.flo_bid_min_price_usd_mwh,
+                    max_price_usd_mwh=self.atn_settings.flo_bid_max_price_usd_mwh,
+                    price_step_usd_mwh=self.atn_settings.flo_bid_price_step_usd_mwh,
+                )
+                if self.flo_process is not None:
+                    pq_pairs = self.flo_process.generate_bid(
+                        self.updated_flo_params, **price_grid, logger=self.logger
+                    )
+                else:
+                    g.generate_bid(self.updated_flo_params, **price_grid)
+                    pq_pairs = g.pq_pairs
+                    # Explicitly delete the graph to free memory (unless it is kept for the next bid)
+                    del g
+                self.logger.info(f"Done! Found {len(pq_pairs)} PQ pairs.")
 
                 # Generate bid
                 t = time.time()
@@ -108,7 +153,7 @@ class BidRunner(threading.Thread):
                 self.bid = AtnBid(
                     BidderAlias=self.atn_alias,
                     MarketSlotName=market_slot_name,
-                    PqPairs=g.pq_pairs,
+                    PqPairs=pq_pairs,
                     InjectionIsPositive=False,  # withdrawing energy since load not generation
                     PriceUnit=MarketPriceUnit.USDPerMWh,
                     QuantityUnit=MarketQuantityUnit.AvgkW,
@@ -123,15 +168,12 @@ class BidRunner(threading.Thread):
                         Payload=self.bid
                     )
                 )
-
-                # Explicitly delete the graph to free memory
-                del g
-                
                 break
         except Exception as e:
             self.logger.info(f"An error occured running Dijkstra or getting bid: {e}")
         finally:
             # Ensure cleanup happens even if there's an error
+            self.busy = False
             self.logger.info("Done running bid runner")
             self.on_complete(self.atn_name)
 
@@ -178,6 +220,26 @@ class Telemetry(BaseModel):
     Unit: TelemetryName
 
 
+@dataclass
+class LoopLagStats:
+    """How late the Atn event loop wakes up from a short sleep"""
+    samples: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+
+    def record(self, lag_s: float) -> None:
+        self.samples += 1
+        self.total_s += lag_s
+        self.max_s = max(self.max_s, lag_s)
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.samples if self.samples else 0.0
+
+    def __str__(self) -> str:
+        return f"max {round(self.max_s*1000)} ms, mean {round(self.mean_s*1000, 1)} ms ({self.samples} samples)"
+
+
 @dataclass
 class AtnData:
     layout: House0Layout
@@ -194,6 +256,7 @@ class AtnData:
     
 class Atn(ActorInterface, Proactor):
     MAIN_LOOP_SLEEP_SECONDS = 61
+    LOOP_LAG_SAMPLE_SECONDS = 0.1
     HEARTBEAT_INTERVAL_S = 60
     P_NODE = "hw1.isone.ver.keene"
     SCADA_MQTT = "scada"
@@ -212,6 +275,7 @@ class Atn(ActorInterface, Proactor):
         super().__init__(name=name, settings=settings, hardware_layout=hardware_layout)
         self._web_manager.disable()
         self.data = AtnData(hardware_layout)
+        self.snapshot_assembler = SnapshotAssembler(request_keyframe=self.snap)
         self._links.add_mqtt_link(
             LinkSettings(
                 client_name=Atn.SCADA_MQTT,
@@ -237,6 +301,7 @@ class Atn(ActorInterface, Proactor):
         self.temperature_channel_names = None
         self.ha1_params: Optional[Ha1Params] = None
         self.latest_report: Optional[Report] = None
+        self.ticklist_byte_counters: Dict[str, TicklistByteCounter] = {}
         self.report_output_dir = Path(f"{self.settings.paths.data_dir}/report")
         self.report_output_dir.mkdir(parents=True, exist_ok=True)
         if self.settings.dashboard.print_gui:
@@ -263,6 +328,15 @@ class Atn(ActorInterface, Proactor):
             send_threadsafe=self.send_threadsafe,
         )
         self.bid_runner: BidRunner = None
+        self.flo_graph: Optional[DGraph] = None
+        self.flo_process: Optional[FloProcess] = None
+        if self.settings.flo_process_mode:
+            self.flo_process = FloProcess(
+                vectorized_solver=self.settings.flo_vectorized_solver,
+                persistent=self.settings.flo_persistent_graph,
+            )
+        # Event loop lag while a BidRunner is solving or generating a bid, and otherwise
+        self.loop_lag: Dict[str, LoopLagStats] = {"solving": LoopLagStats(), "idle": LoopLagStats()}
         self.sending_contracts: bool = True
         self.send_bid_minute: int = 57
         min_minute = min(max(3, datetime.now().minute), self.send_bid_minute-2)
@@ -375,9 +449,16 @@ class Atn(ActorInterface, Proactor):
                 self.process_scada_params(decoded.Payload)
             case SnapshotSpaceheat():
                 path_dbg |= 0x00000010
-                self.process_snapshot(decoded.Payload)
+                self.process_snapshot(self.snapshot_assembler.process(decoded.Payload))
+            case SnapshotDelta():
+                path_dbg |= 0x00000010
+                snapshot = self.snapshot_assembler.process(decoded.Payload)
+                if snapshot is not None:
+                    self.process_snapshot(snapshot)
             case SlowContractHeartbeat():
                 self.contract_handler.process_slow_contract_heartbeat(decoded.Payload)
+            case TicklistBatch():
+                self.process_ticklist_batch(decoded.Payload)
             case EventBase():
                 path_dbg |= 0x00000020
                 self._process_event(decoded.Payload)
@@ -387,6 +468,12 @@ class Atn(ActorInterface, Proactor):
                 ):
                     path_dbg |= 0x00000040
                     self.process_report(decoded.Payload.Report)
+                elif (
+                    decoded.Payload.TypeName
+                    == CompactReportEvent.model_fields["TypeName"].default
+                ):
+                    path_dbg |= 0x00000040
+                    self.process_report(decode_report(decoded.Payload.Report))
                 elif (
                     decoded.Payload.TypeName
                     == SnapshotSpaceheat.model_fields["TypeName"].default
@@ -469,6 +556,19 @@ class Atn(ActorInterface, Proactor):
             for x in layout.DataChannels
             if "depth" in x.Name and "micro-v" not in x.Name
         ]
+        if self.settings.report_encoding != "json":
+            # The scada sends its layout when the link comes up
+            self.send_threadsafe(
+                Message(
+                    Src=self.name,
+                    Dst=self.scada.name,
+                    Payload=ReportEncoding(
+                        FromGNodeAlias=self.layout.atn_g_node_alias,
+                        Encoding=self.settings.report_encoding,
+                        UnixTimeMs=int(time.time() * 1000),
+                    ),
+                )
+            )
         if self.contract_handler.layout_received is False:
             self.contract_handler.layout_received = True # Necessary for bids & contracts
             self.logger.info("Received layout data - ATN now ready for contract operations")
@@ -490,6 +590,19 @@ class Atn(ActorInterface, Proactor):
             with report_file.open("w") as f:
                 f.write(str(report))
 
+    def process_ticklist_batch(self, batch: TicklistBatch) -> None:
+        reports = decode_ticklist_batch(batch)
+        counter = self.ticklist_byte_counters.setdefault(batch.ChannelName, TicklistByteCounter())
+        for report in reports:
+            counter.add_report(report)
+        counter.add_batch(batch)
+        if self.settings.save_events:
+            ticklist_file = self.report_output_dir / (
+                f"{batch.TicklistTypeName}.{batch.ChannelName}.{batch.FirstScadaReceivedUnixMs}.json"
+            )
+            with ticklist_file.open("w") as f:
+                f.write(json.dumps([report.model_dump() for report in reports]))
+
     def _process_event(self, event: EventBase) -> None:
         if self.settings.save_events:
             timezone = pytz.timezone("America/New_York")
@@ -557,6 +670,11 @@ class Atn(ActorInterface, Proactor):
         )
         self.event_loop_thread.start()
 
+    def stop(self) -> None:
+        if self.flo_process is not None:
+            self.flo_process.shutdown()
+        super().stop()
+
     def stop_and_join_thread(self):
         self.contract_handler._stop_requested = True
         self.stop()
@@ -573,6 +691,17 @@ class Atn(ActorInterface, Proactor):
         self._tasks.append(
             asyncio.create_task(self.fake_market_maker(), name="fake market maker")
         )
+        self._tasks.append(
+            asyncio.create_task(self.monitor_loop_lag(), name="loop lag monitor")
+        )
+
+    async def monitor_loop_lag(self) -> None:
+        while not self._stop_requested:
+            st = time.monotonic()
+            await asyncio.sleep(self.LOOP_LAG_SAMPLE_SECONDS)
+            lag_s = max(0.0, time.monotonic() - st - self.LOOP_LAG_SAMPLE_SECONDS)
+            bid_runner = self.bid_runner
+            self.loop_lag["solving" if bid_runner is not None and bid_runner.busy else "idle"].record(lag_s)
 
     async def main(self):
         async with aiohttp.ClientSession() as session:
@@ -717,7 +846,10 @@ class Atn(ActorInterface, Proactor):
                 DGraph.LOGGER_NAME,
                 level=self.settings.flo_logging_level
             ),
+            graph=self.flo_graph,
+            flo_process=self.flo_process,
         )
+        self.loop_lag["solving"] = LoopLagStats()
         self.bid_runner.start()  
         # Instead of waiting, return to event loop
         self.log("Started Dijkstra computation in background")
@@ -725,6 +857,12 @@ class Atn(ActorInterface, Proactor):
     def _cleanup_bid_runner(self, atn_name: str) -> None:
         """Callback to clean up bid runner when it's done.
         Note: This is called from the BidRunner thread."""
+        if self.bid_runner is not None and self.bid_runner.graph is not None:
+            self.flo_graph = self.bid_runner.graph
+        self.log(
+            f"Event loop lag while solving: {self.loop_lag['solving']}; "
+            f"otherwise: {self.loop_lag['idle']}"
+        )
         self.log("Cleaned up bid runner")
         self.bid_runner = None
 
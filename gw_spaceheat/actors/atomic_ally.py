@@ -113,6 +113,10 @@ class AtomicAlly(ScadaActor):
             H0CN.buffer_cold_pipe, H0CN.buffer_hot_pipe, H0CN.store_cold_pipe, H0CN.store_hot_pipe,
             *(depth for tank in self.cn.tank.values() for depth in [tank.depth1, tank.depth2, tank.depth3, tank.depth4])
         ]
+        self.buffer_channel_names = [x for x in self.temperature_channel_names if 'buffer-depth' in x]
+        self.temperature_channels = self.subscribe_channels(
+            self.temperature_channel_names + [H0N.usable_energy, H0N.required_energy]
+        )
         self.temperatures_available: bool = False
         self.no_temps_since: Optional[int] = None
         # State machine
@@ -518,13 +522,7 @@ class AtomicAlly(ScadaActor):
 
     def get_latest_temperatures(self):
         if not self.is_simulated:
-            temp = {
-                x: self.data.latest_channel_values[x] 
-                for x in self.temperature_channel_names
-                if x in self.data.latest_channel_values
-                and self.data.latest_channel_values[x] is not None
-                }
-            self.latest_temperatures = temp.copy()
+            self.latest_temperatures = self.temperature_channels.latest(self.temperature_channel_names)
         else:
             self.log("IN SIMULATION - set all temperatures to 60 degC")
             self.latest_temperatures = {}
@@ -539,15 +537,13 @@ class AtomicAlly(ScadaActor):
         else:
             self.temperatures_available = False
             print('Some temperatures are missing')
-            all_buffer = [x for x in self.temperature_channel_names if 'buffer-depth' in x]
-            available_buffer = [x for x in list(self.latest_temperatures.keys()) if 'buffer-depth' in x]
-            if all_buffer == available_buffer:
+            if all(x in self.latest_temperatures for x in self.buffer_channel_names):
                 print("All the buffer temperatures are available")
                 self.fill_missing_store_temps()
                 print("Successfully filled in the missing storage temperatures.")
                 self.temperatures_available = True
-        total_usable_kwh = self.data.latest_channel_values[H0N.usable_energy]
-        required_storage = self.data.latest_channel_values[H0N.required_energy]
+        total_usable_kwh = self.temperature_channels[H0N.usable_energy]
+        required_storage = self.temperature_channels[H0N.required_energy]
         if total_usable_kwh is None or required_storage is None:
             self.temperatures_available = False
 
@@ -0,0 +1,134 @@
+"""Channel subscriptions of the actors run by the Scada.
+
+An actor subscribes once to the channels it decides on, and gets a ChannelView: the latest
+value of each of those channels, updated by ScadaData as readings are ingested, so the actor
+does not rebuild dicts from latest_channel_values or filter channel names on each of its
+loops. A subscription may also have a callback, which the Scada calls after ingesting a
+message with the names of the channels that changed. Changes are coalesced: one call per
+ingested message at most, and at most one call per min_interval_s, the changes in between
+being delivered together with the next one.
+"""
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+ChannelCallback = Callable[["ChannelView", Set[str]], None]
+
+
+class ChannelView:
+    """The latest values of the channels of one subscription, in subscription order"""
+
+    def __init__(
+        self,
+        subscriber_name: str,
+        channel_names: Sequence[str],
+        callback: Optional[ChannelCallback] = None,
+        min_interval_s: float = 0,
+    ):
+        self.subscriber_name = subscriber_name
+        self.channel_names: List[str] = list(dict.fromkeys(channel_names))
+        self.callback = callback
+        self.min_interval_s = min_interval_s
+        self.changed: Set[str] = set()
+        self.last_notified_s: float = float("-inf")
+        self.notifications = 0
+        self._position: Dict[str, int] = {name: i for i, name in enumerate(self.channel_names)}
+        self._values: List[Optional[int]] = [None] * len(self.channel_names)
+        self._unix_ms: List[Optional[int]] = [None] * len(self.channel_names)
+        self._missing = len(self.channel_names)
+
+    def __contains__(self, channel_name: str) -> bool:
+        """Whether the channel has a reading"""
+        pos = self._position.get(channel_name)
+        return pos is not None and self._values[pos] is not None
+
+    def __getitem__(self, channel_name: str) -> Optional[int]:
+        return self._values[self._position[channel_name]]
+
+    def get(self, channel_name: str, default: Optional[int] = None) -> Optional[int]:
+        pos = self._position.get(channel_name)
+        if pos is None or self._values[pos] is None:
+            return default
+        return self._values[pos]
+
+    def unix_ms(self, channel_name: str) -> Optional[int]:
+        return self._unix_ms[self._position[channel_name]]
+
+    @property
+    def complete(self) -> bool:
+        """Whether every channel has a reading"""
+        return self._missing == 0
+
+    def latest(self, channel_names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Channel name -> latest value of the channels with a reading, in the order of
+        channel_names (by default, the subscription's)"""
+        if channel_names is None:
+            return {name: value for name, value in zip(self.channel_names, self._values) if value is not None}
+        return {name: self[name] for name in channel_names if name in self}
+
+    def _update(self, pos: int, value: Optional[int], unix_ms: Optional[int]) -> None:
+        """Record the latest reading of a channel, or its flatlining (value None)"""
+        self._missing += (value is None) - (self._values[pos] is None)
+        self._values[pos] = value
+        self._unix_ms[pos] = unix_ms
+
+
+class ChannelBus:
+    """Routes the readings ingested by ScadaData to the ChannelViews subscribed to them"""
+
+    def __init__(self, channel_idx: Dict[str, int]):
+        self.channel_idx = channel_idx
+        self._views_by_idx: List[List[Tuple[ChannelView, int]]] = [[] for _ in channel_idx]
+        self._pending: Dict[int, ChannelView] = {}  # id -> view with undelivered changes
+
+    def subscribe(
+        self,
+        view: ChannelView,
+        latest_values: Sequence[Optional[int]] = (),
+        latest_unix_ms: Sequence[Optional[int]] = (),
+    ) -> ChannelView:
+        """Route the view's channels to it, starting from the latest values (by channel idx)
+        if given. Channels that are not in the layout stay without a reading."""
+        for pos, name in enumerate(view.channel_names):
+            idx = self.channel_idx.get(name)
+            if idx is None:
+                continue
+            self._views_by_idx[idx].append((view, pos))
+            if idx < len(latest_values) and latest_values[idx] is not None:
+                view._update(pos, latest_values[idx], latest_unix_ms[idx])
+        return view
+
+    def publish(self, idx: int, value: Optional[int], unix_ms: Optional[int]) -> None:
+        for view, pos in self._views_by_idx[idx]:
+            view._update(pos, value, unix_ms)
+            if view.callback is not None:
+                view.changed.add(view.channel_names[pos])
+                self._pending[id(view)] = view
+
+    def flush(
+        self,
+        now_s: Optional[float] = None,
+        on_error: Optional[Callable[[ChannelView, Exception], None]] = None,
+    ) -> Optional[float]:
+        """Call back the views with changes, except those notified less than their
+        min_interval_s ago. Returns when the earliest of those is due, if any."""
+        if not self._pending:
+            return None
+        if now_s is None:
+            now_s = time.monotonic()
+        next_due: Optional[float] = None
+        for key, view in list(self._pending.items()):
+            due = view.last_notified_s + view.min_interval_s
+            if now_s < due:
+                next_due = due if next_due is None else min(next_due, due)
+                continue
+            del self._pending[key]
+            changed, view.changed = view.changed, set()
+            view.last_notified_s = now_s
+            view.notifications += 1
+            try:
+                view.callback(view, changed)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(view, e)
+        return next_due
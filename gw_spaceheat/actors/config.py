@@ -1,4 +1,5 @@
 import logging
+from typing import Dict
 
 from gwproactor.config.mqtt import TLSInfo
 from pydantic import model_validator, BaseModel
@@ -14,6 +15,13 @@ class PersisterSettings(BaseModel):
     max_bytes: int = DEFAULT_MAX_EVENT_BYTES
 
 
+class ReportStoreSettings(BaseModel):
+    spill_to_disk: bool = False  # up to reports_per_segment * max_segments reports in data_dir/reports
+    max_in_memory: int = 12  # an hour of 5 minute reports
+    reports_per_segment: int = 288  # a day of 5 minute reports
+    max_segments: int = 30
+
+
 class AdminLinkSettings(MQTTClient):
     enabled: bool = False
     name: str = H0N.admin
@@ -32,6 +40,7 @@ class ScadaSettings(ProactorSettings):
     seconds_per_snapshot: int = 30
     async_power_reporting_threshold: float = 0.02
     persister: PersisterSettings = PersisterSettings()
+    report_store: ReportStoreSettings = ReportStoreSettings()
     admin: AdminLinkSettings = AdminLinkSettings()
     timezone_str: str = "America/New_York"
     latitude: float = 45.6573 
@@ -51,6 +60,13 @@ class ScadaSettings(ProactorSettings):
     oil_boiler_for_onpeak_backup: bool = True
     stratboss_dist_010v: int = 100
     monitor_only: bool = False
+    flow_hz_streaming: bool = False
+    seconds_per_ticklist_batch: int = 0
+    power_meter_idle_poll_period_ms: int = 0
+    tsnap_pipelined_reads: bool = False
+    compact_reports: bool = False
+    snapshot_keyframe_every: int = 0
+    snapshot_delta_thresholds: Dict[str, int] = {}
     hp_model: HpModel = HpModel.SamsungFiveTonneHydroKit # TODO: move to layout
     model_config = SettingsConfigDict(env_prefix="SCADA_", extra="ignore")
 
@@ -1,5 +1,6 @@
 import numpy as np
-from typing import Optional
+from collections.abc import Sequence
+from typing import Dict, Iterator, List, Optional, Tuple
 from named_types import FloParamsHouse0
 
 
@@ -116,6 +117,11 @@ class DParams():
 
 
 class DNode():
+    __slots__ = (
+        "params", "time_slice", "top_temp", "middle_temp", "bottom_temp",
+        "thermocline1", "thermocline2", "energy", "pathcost", "next_node",
+    )
+
     def __init__(
             self, 
             parameters: DParams,
@@ -146,14 +152,148 @@ class DNode():
         return f"[{self.time_slice}]{self.top_temp}({self.thermocline1}){self.middle_temp}({self.thermocline2}){self.bottom_temp}"
         
     def get_energy(self):
-        m_layer_kg = self.params.storage_volume*3.785 / self.params.num_layers
-        kWh_top = self.thermocline1*m_layer_kg * 4.187/3600 * to_kelvin(self.top_temp)
-        kWh_midlle = (self.thermocline2-self.thermocline1)*m_layer_kg * 4.187/3600 * to_kelvin(self.middle_temp)
-        kWh_bottom = (self.params.num_layers-self.thermocline2)*m_layer_kg * 4.187/3600 * to_kelvin(self.bottom_temp)
-        return kWh_top + kWh_midlle + kWh_bottom
+        return storage_energy(
+            self.params, self.top_temp, self.middle_temp, self.bottom_temp, self.thermocline1, self.thermocline2
+        )
+
+
+class DNodeTable():
+    """Struct-of-arrays storage for the nodes of a DGraph.
+
+    The storage state (temperatures, thermoclines, energy) is the same in every
+    time slice, so it is stored once. Only the Dijkstra state (pathcost and the
+    index of the next node) is stored per time slice.
+    """
+    def __init__(self, parameters: DParams, node_tuples: List[Tuple[int, int, int, int, int]]):
+        self.num_nodes = len(node_tuples)
+        self.top_temp = [n[0] for n in node_tuples]
+        self.thermocline1 = [n[1] for n in node_tuples]
+        self.middle_temp = [n[2] for n in node_tuples]
+        self.thermocline2 = [n[3] for n in node_tuples]
+        self.bottom_temp = [n[4] for n in node_tuples]
+        self.top_temp_array = np.array(self.top_temp)
+        self.energy = [
+            storage_energy(parameters, t, m, b, th1, th2) for t, th1, m, th2, b in node_tuples
+        ]
+        self.energy_array = np.array(self.energy)
+        self.idx_by: Dict[Tuple, Dict[Tuple, int]] = {}
+        for i, (t, th1, m, th2, b) in enumerate(node_tuples):
+            self.idx_by.setdefault((t, m, b), {})[(th1, th2)] = i
+        self.reset(parameters)
+
+    def reset(self, parameters: DParams) -> None:
+        """Clear the Dijkstra state, for parameters with the same storage topology"""
+        self.params = parameters
+        self.horizon = parameters.horizon
+        self.pathcost = np.full((self.horizon+1, self.num_nodes), 1e9)
+        self.pathcost[self.horizon] = 0
+        self.next_node_idx = np.full((self.horizon, self.num_nodes), -1, dtype=np.int32)
+
+    def node(self, time_slice: int, idx: int) -> "DNodeView":
+        return DNodeView(self, time_slice, idx)
+
+    def layers(self) -> List["DLayer"]:
+        return [DLayer(self, h) for h in range(self.horizon+1)]
+
+
+class DNodeView():
+    """DNode-like view of one node of a DNodeTable in one time slice"""
+    __slots__ = ("table", "time_slice", "idx")
+
+    def __init__(self, table: DNodeTable, time_slice: int, idx: int):
+        self.table = table
+        self.time_slice = time_slice
+        self.idx = idx
+
+    @property
+    def params(self) -> DParams:
+        return self.table.params
+
+    @property
+    def top_temp(self) -> int:
+        return self.table.top_temp[self.idx]
+
+    @property
+    def middle_temp(self) -> int:
+        return self.table.middle_temp[self.idx]
+
+    @property
+    def bottom_temp(self) -> int:
+        return self.table.bottom_temp[self.idx]
+
+    @property
+    def thermocline1(self) -> int:
+        return self.table.thermocline1[self.idx]
+
+    @property
+    def thermocline2(self) -> int:
+        return self.table.thermocline2[self.idx]
+
+    @property
+    def energy(self) -> float:
+        return self.table.energy[self.idx]
+
+    @property
+    def pathcost(self) -> float:
+        return float(self.table.pathcost[self.time_slice, self.idx])
+
+    @pathcost.setter
+    def pathcost(self, value: float) -> None:
+        self.table.pathcost[self.time_slice, self.idx] = value
+
+    @property
+    def next_node(self) -> Optional["DNodeView"]:
+        if self.time_slice >= self.table.horizon:
+            return None
+        next_idx = int(self.table.next_node_idx[self.time_slice, self.idx])
+        if next_idx < 0:
+            return None
+        return DNodeView(self.table, self.time_slice+1, next_idx)
+
+    @next_node.setter
+    def next_node(self, node: "DNodeView") -> None:
+        self.table.next_node_idx[self.time_slice, self.idx] = node.idx
+
+    def to_string(self):
+        return f"{self.top_temp}({self.thermocline1}){self.middle_temp}({self.thermocline2}){self.bottom_temp}"
+
+    def __repr__(self):
+        return f"[{self.time_slice}]{self.to_string()}"
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, DNodeView) and self.table is other.table
+            and self.time_slice == other.time_slice and self.idx == other.idx
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.time_slice, self.idx))
+
+
+class DLayer(Sequence):
+    """The nodes of one time slice, as DNodeViews created on access"""
+    __slots__ = ("table", "time_slice")
+
+    def __init__(self, table: DNodeTable, time_slice: int):
+        self.table = table
+        self.time_slice = time_slice
+
+    def __len__(self) -> int:
+        return self.table.num_nodes
+
+    def __getitem__(self, idx: int) -> DNodeView:
+        if not 0 <= idx < self.table.num_nodes:
+            raise IndexError(idx)
+        return DNodeView(self.table, self.time_slice, int(idx))
+
+    def __iter__(self) -> Iterator[DNodeView]:
+        for idx in range(self.table.num_nodes):
+            yield DNodeView(self.table, self.time_slice, idx)
 
 
 class DEdge():
+    __slots__ = ("tail", "head", "cost", "hp_heat_out")
+
     def __init__(self, tail:DNode, head:DNode, cost:float, hp_heat_out:float):
         self.tail: DNode = tail
         self.head: DNode = head
@@ -162,7 +302,62 @@ class DEdge():
 
     def __repr__(self):
         return f"Edge[{self.tail} --cost:{round(self.cost,3)}, hp:{round(self.hp_heat_out,2)}--> {self.head}]"
-    
+
+
+class DEdgeTable():
+    """Struct-of-arrays storage for the edges of a DGraph, indexed by
+    [time_slice, node_idx, level]. Unused levels have an infinite cost."""
+    def __init__(self, table: DNodeTable, num_levels: int):
+        self.table = table
+        shape = (table.horizon, table.num_nodes, num_levels)
+        self.heads = np.zeros(shape, dtype=np.int32)
+        self.costs = np.full(shape, np.inf)
+        self.hp_heat_out = np.zeros(shape)
+
+    def __getitem__(self, node: DNodeView) -> List[DEdge]:
+        h, i = node.time_slice, node.idx
+        return [
+            DEdge(node, DNodeView(self.table, h+1, head), cost, hp_heat_out)
+            for head, cost, hp_heat_out in zip(
+                self.heads[h, i].tolist(), self.costs[h, i].tolist(), self.hp_heat_out[h, i].tolist()
+            )
+            if cost != np.inf
+        ]
+
+
+class DScenarioTable():
+    """Edges and Dijkstra state of several scenarios solved on the same DNodeTable, indexed
+    by [scenario, time_slice, node_idx(, level)]. Scenarios share the nodes and the
+    transitions, only the forecasts differ, so the node state is not repeated."""
+    def __init__(self, table: DNodeTable, scenario_params: List[DParams], num_levels: int):
+        self.table = table
+        self.params = scenario_params
+        self.num_scenarios = len(scenario_params)
+        self.horizon = table.horizon
+        shape = (self.num_scenarios, table.horizon, table.num_nodes, num_levels)
+        self.heads = np.zeros(shape, dtype=np.int32)
+        self.costs = np.full(shape, np.inf)
+        self.hp_heat_out = np.zeros(shape)
+        self.pathcost = np.full((self.num_scenarios, table.horizon+1, table.num_nodes), 1e9)
+        self.pathcost[:, table.horizon] = 0
+        self.next_node_idx = np.full((self.num_scenarios, table.horizon, table.num_nodes), -1, dtype=np.int32)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes for a in (self.heads, self.costs, self.hp_heat_out, self.pathcost, self.next_node_idx)
+        )
+
+
+def storage_energy(
+        params: DParams, top_temp: float, middle_temp: float, bottom_temp: float, thermocline1: int, thermocline2: int
+) -> float:
+    m_layer_kg = params.storage_volume*3.785 / params.num_layers
+    kWh_top = thermocline1*m_layer_kg * 4.187/3600 * to_kelvin(top_temp)
+    kWh_midlle = (thermocline2-thermocline1)*m_layer_kg * 4.187/3600 * to_kelvin(middle_temp)
+    kWh_bottom = (params.num_layers-thermocline2)*m_layer_kg * 4.187/3600 * to_kelvin(bottom_temp)
+    return kWh_top + kWh_midlle + kWh_bottom
+
 
 def to_kelvin(t):
     return (t-32)*5/9 + 273.15
\ No newline at end of file
@@ -1,18 +1,40 @@
-import gc
 import time
-import json
 import numpy as np
-from typing import Dict, List, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional
 from gwproactor.logger import LoggerOrAdapter
-from .dijkstra_types import DParams, DNode, DEdge
+from .dijkstra_types import DParams, DNode, DEdge, DEdgeTable, DLayer, DNodeTable, DScenarioTable
+from .super_graph import SuperGraph, SUPER_GRAPH_FILE, SUPER_GRAPH_JSON_FILE, read_node_str
 from named_types import FloParamsHouse0, PriceQuantityUnitless
 
 
 class DGraph():
     LOGGER_NAME="flo"
-    def __init__(self, flo_params: FloParamsHouse0, logger: LoggerOrAdapter):
+    MAX_HP_HEAT_OUT_LEVELS = 3
+    # Changing any of these requires rebuilding the nodes from the super graph
+    TOPOLOGY_PARAMS = ("NumLayers", "StorageVolumeGallons", "HpMaxElecKw", "HpMinElecKw")
+    # Scenarios solved on the same graph only differ in the other parameters (forecasts)
+    SCENARIO_SHARED_PARAMS = TOPOLOGY_PARAMS + (
+        "HorizonHours", "StorageLossesPercent", "InitialTopTempF", "InitialMiddleTempF",
+        "InitialBottomTempF", "InitialThermocline1", "InitialThermocline2",
+    )
+
+    def __init__(
+            self,
+            flo_params: FloParamsHouse0,
+            logger: LoggerOrAdapter,
+            vectorized_solver: bool = False,
+            persistent: bool = False,
+    ):
+        """With persistent=True the super graph stays open and refresh() can be used to
+        re-solve for new parameters without rebuilding the nodes."""
         self.logger = logger
         self.params = DParams(flo_params)
+        self.vectorized_solver = vectorized_solver
+        self.persistent = persistent
+        self.build()
+
+    def build(self):
         start_time = time.time()
         try:
             self.load_super_graph()
@@ -30,56 +52,76 @@ class DGraph():
         start_time = time.time()
         try:
             self.create_edges()
-            self.logger.info(f"Created edges in {round(time.time()-start_time, 1)} seconds")
+            self.logger.info(
+                f"Created edges in {round(time.time()-start_time, 1)} seconds "
+                f"({', '.join(f'{k} {round(v, 2)}s' for k, v in self.edge_timing.items())})"
+            )
         except Exception as e:
             self.logger.warning(f"Error with create_edges! {e}")
             raise
-        del self.super_graph
-        gc.collect()
-        self.logger.info("Cleared super graph from memory")
+        if not self.persistent:
+            del self.super_graph
+            self.logger.info("Closed super graph")
+
+    def refresh(self, flo_params: FloParamsHouse0):
+        """Update the graph for new parameters (prices, weather, load, initial state).
+        Nodes and transitions are reused unless the tank or heat pump parameters changed."""
+        params = DParams(flo_params)
+        if not self.persistent or self.topology_changed(params):
+            self.logger.info("Rebuilding graph")
+            self.params = params
+            self.build()
+            return
+        start_time = time.time()
+        self.params = params
+        self.node_table.reset(params)
+        self.nodes = self.node_table.layers()
+        try:
+            self.create_edges()
+        except Exception as e:
+            self.logger.warning(f"Error with create_edges! {e}")
+            raise
+        self.logger.info(f"Refreshed edges in {round(time.time()-start_time, 1)} seconds")
+
+    def topology_changed(self, params: DParams) -> bool:
+        return any(
+            getattr(params.flo_params, name) != getattr(self.node_table.params.flo_params, name)
+            for name in self.TOPOLOGY_PARAMS
+        )
         
     def load_super_graph(self):
-        with open("super_graph.json", 'r') as f:
-            self.super_graph: Dict = json.load(f)
-        self.discretized_store_heat_in = [float(x) for x in list(self.super_graph.keys())]
-        self.discretized_store_heat_in_array = np.array(self.discretized_store_heat_in)
+        if Path(SUPER_GRAPH_FILE).exists():
+            self.super_graph = SuperGraph.load(SUPER_GRAPH_FILE)
+        else:
+            self.logger.warning(f"No {SUPER_GRAPH_FILE}, falling back to {SUPER_GRAPH_JSON_FILE}")
+            self.super_graph = SuperGraph.from_json(SUPER_GRAPH_JSON_FILE)
 
     def create_nodes(self):
-        self.nodes: Dict[int, List[DNode]] = {h: [] for h in range(self.params.horizon+1)}
-        self.nodes_by: Dict[int, Dict[Tuple, Dict[Tuple, DNode]]] = {h: {} for h in range(self.params.horizon+1)}
-        self.bid_nodes: Dict[int, List[DNode]] = {h: [] for h in range(self.params.horizon+1)}
-
-        super_graph_nodes: List[str] = self.super_graph['0.0']
-
-        for node_no_time_slice in super_graph_nodes:
-            t, th1, m, th2, b = self.read_node_str(node_no_time_slice)
-
-            for h in range(self.params.horizon+1):
-                node = DNode(
-                    time_slice=h,
-                    top_temp=t,
-                    middle_temp=m,
-                    bottom_temp=b,
-                    thermocline1=th1,
-                    thermocline2=th2,
-                    parameters=self.params
-                )
-
-                self.nodes[h].append(node)
-                if h==0:
-                    self.bid_nodes[h].append(node)
-                if h==0 and (t,m,b) not in self.nodes_by[h]:
-                    for hour in range(self.params.horizon+1):
-                        self.nodes_by[hour][(t,m,b)] = {}
-                self.nodes_by[h][(t,m,b)][(th1,th2)] = node
-                
-        self.logger.info(f"Built a graph with {self.params.horizon} layers of {len(self.nodes[0])} nodes each")
-        self.min_node_energy = min(self.nodes[0], key=lambda n: n.energy).energy
-        self.max_node_energy = max(self.nodes[0], key=lambda n: n.energy).energy
+        # Node state is shared by all time slices, self.nodes[h][i] is a view on it
+        self.node_table = DNodeTable(self.params, self.super_graph.node_tuples())
+        self.nodes: List[DLayer] = self.node_table.layers()
+        self.logger.info(f"Built a graph with {self.params.horizon} layers of {self.node_table.num_nodes} nodes each")
+        self.min_node_energy = min(self.node_table.energy)
+        self.max_node_energy = max(self.node_table.energy)
 
     def create_edges(self):
-        self.edges: Dict[DNode, List[DEdge]] = {}
+        self.edges = DEdgeTable(self.node_table, self.MAX_HP_HEAT_OUT_LEVELS)
         self.bid_edges: Dict[DNode, List[DEdge]] = {}
+        # A single forecast is a scenario axis of length one
+        self.fill_edges(
+            [self.params], self.edges.heads[None], self.edges.costs[None], self.edges.hp_heat_out[None]
+        )
+
+    def fill_edges(
+            self,
+            scenario_params: List[DParams],
+            heads: np.ndarray,
+            costs: np.ndarray,
+            hp_heat_out_array: np.ndarray,
+    ):
+        """Fill [scenario, time_slice, node_idx, level] edge arrays. The scenarios share the
+        storage topology and initial state (self.params), only their forecasts differ."""
+        table = self.node_table
 
         current_state = DNode(
             top_temp=self.params.initial_top_temp,
@@ -104,74 +146,197 @@ class DGraph():
             print(f"Storage is currently full.")
             self.storage_is_currently_full = True
 
+        transitions_by_idx = np.asarray(self.super_graph.transitions)
+        num_scenarios = len(scenario_params)
+        losses = self.params.storage_losses_percent/100 * (table.energy_array-self.min_node_energy)
+        # Can not put out more heat than what would fill the storage
+        store_heat_in_for_full = self.max_node_energy - table.energy_array
+        self.edge_timing = {"levels": 0.0, "transitions": 0.0, "costs": 0.0}
+
         for h in range(self.params.horizon):
 
-            load = self.params.load_forecast[h]
-            rswt = self.params.rswt_forecast[h]
-            cop = self.params.COP(oat=self.params.oat_forecast[h])
-
-            turn_on_minutes = self.params.hp_turn_on_minutes if h==0 else self.params.hp_turn_on_minutes/2
-            max_hp_elec_in = ((1-turn_on_minutes/60) if (h==0 and self.params.hp_is_off) else 1) * self.params.max_hp_elec_in
-            max_hp_heat_out = max_hp_elec_in * cop
-            
-            for node_now in self.nodes[h]:
-                self.edges[node_now] = []
-                if h==0:
-                    self.bid_edges[node_now] = []
-
-                losses = self.params.storage_losses_percent/100 * (node_now.energy-self.min_node_energy)
-                
-                # Can not put out more heat than what would fill the storage
-                store_heat_in_for_full = self.max_node_energy - node_now.energy
-                hp_heat_out_for_full = store_heat_in_for_full + load + losses
-                if hp_heat_out_for_full < max_hp_heat_out:
-                    hp_heat_out_levels = [0, hp_heat_out_for_full] if hp_heat_out_for_full > 10 else [0]
-                else:
-                    hp_heat_out_levels = [0, max_hp_heat_out]
-                # If the HP is already on, add the "meet the load" edge in the first hour
-                if h==0 and load>0 and not self.params.hp_is_off:
-                    hp_heat_out_levels += [load+losses]
-                
-                for hp_heat_out in hp_heat_out_levels:
-                    store_heat_in = hp_heat_out - load - losses
-                    closest_store_heat_in = self.discretized_store_heat_in[abs(self.discretized_store_heat_in_array-store_heat_in).argmin()]
-                    
-                    node_next_str: str = self.super_graph[str(closest_store_heat_in)][node_now.to_string()]
-                    t, th1, m, th2, b = self.read_node_str(node_next_str)
-                    node_next = self.nodes_by[node_now.time_slice+1][(t,m,b)][(th1,th2)]
-
-                    if self.storage_is_currently_full and node_next.energy>current_state.energy:
-                        t, m, b = node_now.top_temp, node_now.middle_temp, node_now.bottom_temp
-                        th1, th2 = node_now.thermocline1, node_now.thermocline2
-                        node_next = self.nodes_by[node_now.time_slice+1][(t,m,b)][(th1,th2)]
-
-                    cost = self.params.elec_price_forecast[h]/100 * hp_heat_out/cop
-                    if store_heat_in<0 and load>0 and (node_now.top_temp<rswt or node_next.top_temp<rswt):
-                        cost += 1e5
-
-                    self.edges[node_now].append(DEdge(node_now, node_next, cost, hp_heat_out))
-                    if h==0:
-                        self.bid_edges[node_now].append(DEdge(node_now, node_next, cost, hp_heat_out))
+            load = np.array([p.load_forecast[h] for p in scenario_params])
+            rswt = np.array([p.rswt_forecast[h] for p in scenario_params])
+            cop = np.array([p.COP(oat=p.oat_forecast[h]) for p in scenario_params])
+            elec_price = np.array([p.elec_price_forecast[h] for p in scenario_params])
+
+            max_hp_elec_in = np.empty(num_scenarios)
+            for s, p in enumerate(scenario_params):
+                turn_on_minutes = p.hp_turn_on_minutes if h==0 else p.hp_turn_on_minutes/2
+                max_hp_elec_in[s] = ((1-turn_on_minutes/60) if (h==0 and p.hp_is_off) else 1) * p.max_hp_elec_in
+            max_hp_heat_out = (max_hp_elec_in * cop)[:, None]
+
+            # Heat out levels for all nodes, one column per level (NaN where a node does not have that level)
+            st = time.time()
+            hp_heat_out_for_full = store_heat_in_for_full[None, :] + load[:, None] + losses[None, :]
+            hp_heat_out_levels = np.full((num_scenarios, table.num_nodes, self.MAX_HP_HEAT_OUT_LEVELS), np.nan)
+            hp_heat_out_levels[:, :, 0] = 0
+            hp_heat_out_levels[:, :, 1] = np.where(
+                hp_heat_out_for_full < max_hp_heat_out,
+                np.where(hp_heat_out_for_full > 10, hp_heat_out_for_full, np.nan),
+                max_hp_heat_out,
+            )
+            # If the HP is already on, add the "meet the load" edge in the first hour
+            for s, p in enumerate(scenario_params):
+                if h==0 and load[s]>0 and not p.hp_is_off:
+                    hp_heat_out_levels[s, :, 2] = load[s]+losses
+            self.edge_timing["levels"] += time.time() - st
+
+            for level in range(self.MAX_HP_HEAT_OUT_LEVELS):
+                st = time.time()
+                has_level = ~np.isnan(hp_heat_out_levels[:, :, level])
+                if not has_level.any():
+                    continue
+                scenario_idx, node_idx = np.nonzero(has_level)
+                hp_heat_out = hp_heat_out_levels[:, :, level][has_level]
+                store_heat_in = hp_heat_out - load[scenario_idx] - losses[node_idx]
+                store_heat_in_idx = self.super_graph.store_heat_in_idx(store_heat_in)
+                node_next_idx = transitions_by_idx[store_heat_in_idx, node_idx]
+                if self.storage_is_currently_full:
+                    node_next_idx = np.where(
+                        table.energy_array[node_next_idx]>current_state.energy, node_idx, node_next_idx
+                    )
+                self.edge_timing["transitions"] += time.time() - st
+
+                st = time.time()
+                cost = elec_price[scenario_idx]/100 * hp_heat_out/cop[scenario_idx]
+                rswt_at_node = rswt[scenario_idx]
+                cost = np.where(
+                    (load[scenario_idx]>0) & (store_heat_in<0) & (
+                        (table.top_temp_array[node_idx]<rswt_at_node) | (table.top_temp_array[node_next_idx]<rswt_at_node)
+                    ),
+                    cost + 1e5,
+                    cost,
+                )
+                heads[:, h, :, level][has_level] = node_next_idx
+                costs[:, h, :, level][has_level] = cost
+                hp_heat_out_array[:, h, :, level][has_level] = hp_heat_out
+                self.edge_timing["costs"] += time.time() - st
 
             print(f"Built edges for hour {h}")
     
     def solve_dijkstra(self):
         start_time = time.time()
         try:
-            for time_slice in range(self.params.horizon-1, -1, -1):
-                for node in self.nodes[time_slice]:
-                    best_edge = min(self.edges[node], key=lambda e: e.head.pathcost + e.cost)
-                    node.pathcost = best_edge.head.pathcost + best_edge.cost
-                    node.next_node = best_edge.head
+            if self.vectorized_solver:
+                self.solve_dijkstra_vectorized()
+            else:
+                for time_slice in range(self.params.horizon-1, -1, -1):
+                    for node in self.nodes[time_slice]:
+                        best_edge = min(self.edges[node], key=lambda e: e.head.pathcost + e.cost)
+                        node.pathcost = best_edge.head.pathcost + best_edge.cost
+                        node.next_node = best_edge.head
             self.logger.info(f"Solved Dijkstra in {round(time.time()-start_time, 1)} seconds")
         except Exception as e:
             self.logger.error(f"Error solving Dijkstra algorithm: {e}")
             raise
 
+    def solve_dijkstra_vectorized(self):
+        """Backward induction over the edge arrays, one argmin per hour.
+        Ties resolve to the first edge, like min() in the object solver."""
+        table = self.node_table
+        all_nodes = np.arange(table.num_nodes)
+        for h in range(self.params.horizon-1, -1, -1):
+            total_costs = table.pathcost[h+1][self.edges.heads[h]] + self.edges.costs[h]
+            best_level = total_costs.argmin(axis=1)
+            table.pathcost[h] = total_costs[all_nodes, best_level]
+            table.next_node_idx[h] = self.edges.heads[h][all_nodes, best_level]
+
+    def solve_scenarios(self, scenario_flo_params: List[FloParamsHouse0]) -> DScenarioTable:
+        """Solve several forecast scenarios (e.g. perturbed LmpForecast and OatForecastF) in one
+        pass. The scenarios keep the storage topology, horizon and initial state of the graph:
+        their edges are stacked along a scenario axis on the nodes of this graph and all the
+        scenarios go through the same vectorized backward induction."""
+        if not scenario_flo_params:
+            raise ValueError("No scenarios to solve")
+        for i, flo_params in enumerate(scenario_flo_params):
+            different = [
+                name for name in self.SCENARIO_SHARED_PARAMS
+                if getattr(flo_params, name) != getattr(self.params.flo_params, name)
+            ]
+            if different:
+                raise ValueError(f"Scenario {i} does not share {', '.join(different)} with the graph")
+        start_time = time.time()
+        scenario_params = [DParams(flo_params) for flo_params in scenario_flo_params]
+        self.scenarios = DScenarioTable(self.node_table, scenario_params, self.MAX_HP_HEAT_OUT_LEVELS)
+        super_graph_was_closed = not hasattr(self, "super_graph")
+        if super_graph_was_closed:
+            self.load_super_graph()
+        try:
+            self.fill_edges(scenario_params, self.scenarios.heads, self.scenarios.costs, self.scenarios.hp_heat_out)
+        except Exception as e:
+            self.logger.warning(f"Error with create_edges for scenarios! {e}")
+            raise
+        finally:
+            if super_graph_was_closed:
+                del self.super_graph
+        self.logger.info(f"Created edges for {len(scenario_params)} scenarios in {round(time.time()-start_time, 1)} seconds")
+        start_time = time.time()
+        self.solve_scenarios_vectorized()
+        self.logger.info(f"Solved {len(scenario_params)} scenarios in {round(time.time()-start_time, 1)} seconds")
+        return self.scenarios
+
+    def solve_scenarios_vectorized(self):
+        """solve_dijkstra_vectorized with a leading scenario axis"""
+        scenarios = self.scenarios
+        scenario_idx = np.arange(scenarios.num_scenarios)[:, None, None]
+        for h in range(scenarios.horizon-1, -1, -1):
+            heads = scenarios.heads[:, h]
+            total_costs = scenarios.pathcost[:, h+1][scenario_idx, heads] + scenarios.costs[:, h]
+            best_level = total_costs.argmin(axis=2)[:, :, None]
+            scenarios.pathcost[:, h] = np.take_along_axis(total_costs, best_level, axis=2)[:, :, 0]
+            scenarios.next_node_idx[:, h] = np.take_along_axis(heads, best_level, axis=2)[:, :, 0]
+
+    def generate_scenario_bids(
+            self,
+            weights: Optional[List[float]] = None,
+            min_price_usd_mwh: float = -100,
+            max_price_usd_mwh: float = 2000,
+            price_step_usd_mwh: float = 1,
+    ):
+        """Bid of each solved scenario (scenario_pq_pairs, on the price grid plus that scenario's
+        forecasted price) and an aggregated bid (aggregated_pq_pairs): at every price of the grid
+        plus all the forecasted prices, the weighted mean of the scenario quantities.
+        scenario_pathcosts is the cost of the best path from the initial node in each scenario."""
+        scenarios = self.scenarios
+        if weights is None:
+            weights = [1] * scenarios.num_scenarios
+        weights = np.asarray(weights, dtype=float)
+        if len(weights) != scenarios.num_scenarios or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError(f"Need {scenarios.num_scenarios} non-negative weights with a positive sum, got {weights.tolist()}")
+        self.find_initial_node()
+        i = self.initial_node.idx
+        self.scenario_pathcosts: List[float] = scenarios.pathcost[:, 0, i].tolist()
+
+        price_grid_usd_mwh = np.arange(min_price_usd_mwh, max_price_usd_mwh, price_step_usd_mwh)
+        forecasted_prices_usd_mwh = [p.elec_price_forecast[0]*10 for p in scenarios.params]
+        all_prices = np.sort(np.append(price_grid_usd_mwh, forecasted_prices_usd_mwh))
+        self.scenario_pq_pairs: List[List[PriceQuantityUnitless]] = []
+        quantities = np.empty((scenarios.num_scenarios, len(all_prices)))
+        for s, params in enumerate(scenarios.params):
+            heads = scenarios.heads[s, 0, i]
+            has_edge = scenarios.costs[s, 0, i] != np.inf
+            if self.storage_is_currently_full:
+                has_edge &= self.node_table.energy_array[heads] <= self.node_table.energy_array[i]
+            edges = (
+                scenarios.pathcost[s, 1, heads[has_edge]],
+                scenarios.costs[s, 0, i][has_edge],
+                scenarios.hp_heat_out[s, 0, i][has_edge],
+                params.COP(oat=params.oat_forecast[0]),
+            )
+            prices = np.sort(np.append(price_grid_usd_mwh, forecasted_prices_usd_mwh[s]))
+            self.scenario_pq_pairs.append(
+                self.pq_pairs_from_quantities(prices, self.bid_quantities(*edges, prices))
+            )
+            quantities[s] = self.bid_quantities(*edges, all_prices)
+        aggregated = np.trunc(weights @ quantities / weights.sum()).astype(np.int64)
+        self.aggregated_pq_pairs = self.pq_pairs_from_quantities(all_prices, aggregated)
+        self.logger.info(
+            f"Done ({len(self.aggregated_pq_pairs)} aggregated PQ pairs from {scenarios.num_scenarios} scenarios)."
+        )
+
     def read_node_str(self, node_str: str):
-        parts = node_str.replace(')', '(').split('(')
-        top, thermocline1, middle, thermocline2, bottom = int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4])
-        return top, thermocline1, middle, thermocline2, bottom
+        return read_node_str(node_str)
 
     def find_initial_node(self, updated_flo_params: FloParamsHouse0=None):
         if updated_flo_params:
@@ -186,17 +351,17 @@ class DGraph():
             parameters=self.params
         )
 
-        top_temps = set([n.top_temp for n in self.bid_nodes[0]])
+        top_temps = set([n.top_temp for n in self.nodes[0]])
         closest_top_temp = min(top_temps, key=lambda x: abs(x-self.initial_state.top_temp))
 
-        bottom_temps = set([n.bottom_temp for n in self.bid_nodes[0] if n.top_temp==closest_top_temp])
+        bottom_temps = set([n.bottom_temp for n in self.nodes[0] if n.top_temp==closest_top_temp])
         closest_bottom_temp = min(bottom_temps, key=lambda x: abs(x-self.initial_state.bottom_temp))
 
-        middle_temps = set([n.middle_temp for n in self.bid_nodes[0] if n.top_temp==closest_top_temp  and n.bottom_temp==closest_bottom_temp])
+        middle_temps = set([n.middle_temp for n in self.nodes[0] if n.top_temp==closest_top_temp  and n.bottom_temp==closest_bottom_temp])
         closest_middle_temp = min(middle_temps, key=lambda x: abs(x-self.initial_state.middle_temp))
 
         nodes_with_similar_temperatures = [
-            n for n in self.bid_nodes[0]
+            n for n in self.nodes[0]
             if n.top_temp == closest_top_temp
             and n.middle_temp == closest_middle_temp
             and n.bottom_temp == closest_bottom_temp
@@ -217,39 +382,78 @@ class DGraph():
         print(f"Initial state: {self.initial_state}")
         print(f"Initial node: {self.initial_node}")
 
+        self.bid_edges = {self.initial_node: self.edges[self.initial_node]}
         for e in self.bid_edges[self.initial_node]:
             if self.storage_is_currently_full and e.head.energy > self.initial_node.energy:
                 self.bid_edges[self.initial_node].remove(e)
                 print(f"Removed edge {e} because the storage is already close to full.")
 
-    def generate_bid(self, updated_flo_params: FloParamsHouse0=None):
+    def generate_bid(
+            self,
+            updated_flo_params: FloParamsHouse0=None,
+            min_price_usd_mwh: float = -100,
+            max_price_usd_mwh: float = 2000,
+            price_step_usd_mwh: float = 1,
+    ):
+        """Find the bid curve on the price grid [min_price_usd_mwh, max_price_usd_mwh)
+        with a price_step_usd_mwh step, plus the forecasted price."""
         self.logger.info("Generating bid...")
-        self.pq_pairs: List[PriceQuantityUnitless] = []
         self.find_initial_node(updated_flo_params)
         
         forecasted_cop = self.params.COP(oat=self.params.oat_forecast[0])
         forecasted_price_usd_mwh = self.params.elec_price_forecast[0]*10
-        price_range_usd_mwh = sorted(list(range(-100, 2000)) + [forecasted_price_usd_mwh])
-        edge_cost = {}
-
-        for price_usd_mwh in price_range_usd_mwh:
-            for edge in self.bid_edges[self.initial_node]:
-                edge_cost[edge] = edge.cost if edge.cost >= 1e4 else edge.hp_heat_out/forecasted_cop * price_usd_mwh/1000
-            best_edge: DEdge = min(self.bid_edges[self.initial_node], key=lambda e: e.head.pathcost + edge_cost[e])
-            best_quantity_kwh = max(0, best_edge.hp_heat_out/forecasted_cop)
-            if not self.pq_pairs or (self.pq_pairs[-1].QuantityTimes1000-int(best_quantity_kwh*1000)>10):
-                self.pq_pairs.append(
+        price_range_usd_mwh = np.sort(np.append(
+            np.arange(min_price_usd_mwh, max_price_usd_mwh, price_step_usd_mwh), forecasted_price_usd_mwh
+        ))
+        self.pq_pairs: List[PriceQuantityUnitless] = self.get_pq_pairs(
+            self.bid_edges[self.initial_node], forecasted_cop, price_range_usd_mwh
+        )
+        self.logger.info(f"Done ({len(self.pq_pairs)} PQ pairs found).")
+
+    @staticmethod
+    def get_pq_pairs(
+        bid_edges: List[DEdge], forecasted_cop: float, price_range_usd_mwh: np.ndarray
+    ) -> List[PriceQuantityUnitless]:
+        """For every price, the best edge is the one minimizing head pathcost + edge cost at
+        that price. All prices are evaluated at once as a (prices, edges) array. A PQ pair is
+        added each time the quantity drops by more than 10 (QuantityTimes1000)."""
+        prices = np.asarray(price_range_usd_mwh, dtype=float)
+        quantity_times_1000 = DGraph.bid_quantities(
+            np.array([e.head.pathcost for e in bid_edges], dtype=float),
+            np.array([e.cost for e in bid_edges], dtype=float),
+            np.array([e.hp_heat_out for e in bid_edges], dtype=float),
+            forecasted_cop,
+            prices,
+        )
+        return DGraph.pq_pairs_from_quantities(prices, quantity_times_1000)
+
+    @staticmethod
+    def bid_quantities(
+        head_pathcost: np.ndarray,
+        cost: np.ndarray,
+        hp_heat_out: np.ndarray,
+        forecasted_cop: float,
+        prices: np.ndarray,
+    ) -> np.ndarray:
+        """QuantityTimes1000 of the best first hour edge at every price"""
+        edge_cost = np.where(
+            cost >= 1e4,
+            cost,
+            (hp_heat_out/forecasted_cop)[None, :] * prices[:, None]/1000,
+        )
+        best_edge = (head_pathcost + edge_cost).argmin(axis=1)
+        return np.trunc(np.maximum(0, hp_heat_out/forecasted_cop)*1000).astype(np.int64)[best_edge]
+
+    @staticmethod
+    def pq_pairs_from_quantities(prices: np.ndarray, quantity_times_1000: np.ndarray) -> List[PriceQuantityUnitless]:
+        # Within a run of prices with the same quantity, only the first price can add a PQ pair
+        run_starts = np.flatnonzero(np.diff(quantity_times_1000, prepend=quantity_times_1000[0]-1))
+        pq_pairs: List[PriceQuantityUnitless] = []
+        for price_usd_mwh, quantity in zip(prices[run_starts].tolist(), quantity_times_1000[run_starts].tolist()):
+            if not pq_pairs or (pq_pairs[-1].QuantityTimes1000-quantity>10):
+                pq_pairs.append(
                     PriceQuantityUnitless(
                         PriceTimes1000 = int(price_usd_mwh * 1000),
-                        QuantityTimes1000 = int(best_quantity_kwh * 1000))
+                        QuantityTimes1000 = quantity)
                 )
-        self.logger.info(f"Done ({len(self.pq_pairs)} PQ pairs found).")
-
-    def trim_graph_for_waiting(self):
-        """Remove all but the first two time slices to save memory while waiting to generate bid."""
-        start_time = time.time()
-        del self.nodes_by
-        del self.nodes
-        del self.edges
-        gc.collect()
-        self.logger.info(f"Trimmed graph in {round(time.time()-start_time, 1)} seconds.")
\ No newline at end of file
+        return pq_pairs
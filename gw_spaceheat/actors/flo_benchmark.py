@@ -0,0 +1,218 @@
+"""Benchmark of the FLO phases on synthetic FloParamsHouse0, for tracking regressions.
+
+A small super graph is generated in a temporary directory for each NumLayers, then
+every horizon times on it: DGraph construction (dgraph_build: super graph load, nodes and
+edges), a second create_edges on the open super graph as refresh() does for each bid
+(rebuild_edges), solve_dijkstra, find_initial_node and generate_bid. Wall times are the
+best of `repeat` untraced runs; allocations come from one extra run under tracemalloc, so
+that tracing overhead does not leak into the wall times.
+"""
+import contextlib
+import gc
+import io
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from .flo import DGraph
+from .super_graph import SUPER_GRAPH_FILE, SuperGraph
+from .super_graph_generator import SuperGraphGenerator
+from named_types import FloParamsHouse0
+
+BENCHMARK_HORIZONS = (24, 48, 72)
+BENCHMARK_NUM_LAYERS = (6, 8, 12)
+BENCHMARK_HP_MAX_ELEC_KW = 5
+DGRAPH_PHASES = ("dgraph_build", "rebuild_edges", "solve_dijkstra", "find_initial_node", "generate_bid")
+
+
+def synthetic_flo_params(horizon: int = 24, num_layers: int = 6, **kwargs) -> FloParamsHouse0:
+    """Deterministic shoulder-season forecasts: two daily price peaks and a daily temperature
+    swing, mild enough that the heat pump is not always at max and the bid has several steps"""
+    hours = np.arange(horizon)
+    hour_of_day = hours % 24
+    lmp = 40 + 60 * np.exp(-((hour_of_day - 8) ** 2) / 6) + 90 * np.exp(-((hour_of_day - 18) ** 2) / 6)
+    oat = 42 + 8 * np.sin((hour_of_day - 9) / 24 * 2 * np.pi) - hours / 24
+    d = dict(
+        GNodeAlias="d1.isone.ver.keene.holly",
+        StartUnixS=1734476400,
+        HorizonHours=horizon,
+        NumLayers=num_layers,
+        HpMaxElecKw=BENCHMARK_HP_MAX_ELEC_KW,
+        InitialTopTempF=150,
+        InitialMiddleTempF=130,
+        InitialBottomTempF=100,
+        InitialThermocline1=num_layers // 2,
+        InitialThermocline2=num_layers * 5 // 6,
+        LmpForecast=[round(x, 2) for x in lmp.tolist()],
+        DistPriceForecast=[45 if 7 <= h < 11 or 16 <= h < 20 else 10 for h in hour_of_day.tolist()],
+        RegPriceForecast=[10] * horizon,
+        OatForecastF=[round(x, 1) for x in oat.tolist()],
+        WindSpeedForecastMph=[8] * horizon,
+        AlphaTimes10=120,
+        BetaTimes100=-22,
+        GammaEx6=0,
+        IntermediatePowerKw=1.5,
+        IntermediateRswtF=100,
+        DdPowerKw=5,
+        DdRswtF=160,
+        DdDeltaTF=20,
+        MaxEwtF=170,
+    )
+    d.update(kwargs)
+    return FloParamsHouse0(**d)
+
+
+def peak_rss_mb() -> float:
+    """High water mark of the resident set size of this process"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def reset_peak_rss() -> bool:
+    """Reset the RSS high water mark, where the kernel allows it (Linux)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class PhaseRecorder():
+    def __init__(self, traced: bool):
+        self.traced = traced
+        self.phases: Dict[str, Dict[str, float]] = {}
+
+    def run(self, name: str, fn: Callable[[], Any]) -> Any:
+        gc.collect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if self.traced:
+                blocks = sys.getallocatedblocks()
+                tracemalloc.start()
+                result = fn()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.phases[name] = {
+                    "traced_peak_mb": peak / 1e6,
+                    "traced_net_mb": current / 1e6,
+                    "allocated_blocks": sys.getallocatedblocks() - blocks,
+                }
+            else:
+                rss_reset = reset_peak_rss()
+                st = time.perf_counter()
+                result = fn()
+                self.phases[name] = {
+                    "wall_s": time.perf_counter() - st,
+                    "peak_rss_mb": peak_rss_mb(),
+                    "peak_rss_is_per_phase": rss_reset,
+                }
+        return result
+
+
+def run_dgraph_phases(flo_params: FloParamsHouse0, recorder: PhaseRecorder, vectorized_solver: bool) -> DGraph:
+    logger = logging.getLogger(DGraph.LOGGER_NAME)
+    # The constructor builds the edges too. persistent keeps the super graph open, so they
+    # can be rebuilt on their own afterwards
+    g = recorder.run(
+        "dgraph_build", lambda: DGraph(flo_params, logger, vectorized_solver=vectorized_solver, persistent=True)
+    )
+    recorder.run("rebuild_edges", g.create_edges)
+    recorder.run("solve_dijkstra", g.solve_dijkstra)
+    recorder.run("find_initial_node", g.find_initial_node)
+    recorder.run("generate_bid", g.generate_bid)
+    return g
+
+
+def merge_phases(timed: List[Dict[str, Dict[str, float]]], traced: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    phases = {}
+    for name in timed[0]:
+        best = min((run[name] for run in timed), key=lambda x: x["wall_s"])
+        phases[name] = {**best, **traced.get(name, {})}
+    return phases
+
+
+def run_benchmark(
+        horizons: Sequence[int] = BENCHMARK_HORIZONS,
+        num_layers: Sequence[int] = BENCHMARK_NUM_LAYERS,
+        vectorized_solver: bool = False,
+        repeat: int = 1,
+        trace_allocations: bool = True,
+) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "meta": {
+            "created_unix_s": int(time.time()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "vectorized_solver": vectorized_solver,
+            "repeat": repeat,
+            "trace_allocations": trace_allocations,
+        },
+        "super_graphs": [],
+        "runs": [],
+    }
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="flo-benchmark-") as tmp:
+        try:
+            for layers in num_layers:
+                d = Path(tmp) / f"num_layers_{layers}"
+                d.mkdir()
+                os.chdir(d)
+                params = synthetic_flo_params(max(horizons), layers)
+                passes = [False] * repeat + ([True] if trace_allocations else [])
+                timed, traced = [], {}
+                for is_traced in passes:
+                    recorder = PhaseRecorder(is_traced)
+                    recorder.run("super_graph_generate", lambda: SuperGraphGenerator(params).generate())
+                    if is_traced:
+                        traced = recorder.phases
+                    else:
+                        timed.append(recorder.phases)
+                super_graph = SuperGraph.load(SUPER_GRAPH_FILE)
+                results["super_graphs"].append({
+                    "num_layers": layers,
+                    "num_nodes": super_graph.num_nodes,
+                    "num_store_heat_in": len(super_graph.store_heat_in),
+                    "file_mb": Path(SUPER_GRAPH_FILE).stat().st_size / 1e6,
+                    "phases": merge_phases(timed, traced),
+                })
+                del super_graph
+
+                for horizon in horizons:
+                    params = synthetic_flo_params(horizon, layers)
+                    timed, traced = [], {}
+                    for is_traced in passes:
+                        recorder = PhaseRecorder(is_traced)
+                        g = run_dgraph_phases(params, recorder, vectorized_solver)
+                        if is_traced:
+                            traced = recorder.phases
+                        else:
+                            timed.append(recorder.phases)
+                    results["runs"].append({
+                        "num_layers": layers,
+                        "horizon": horizon,
+                        "num_nodes": g.node_table.num_nodes,
+                        "num_pq_pairs": len(g.pq_pairs),
+                        "phases": merge_phases(timed, traced),
+                    })
+                    del g
+        finally:
+            os.chdir(cwd)
+    return results
@@ -0,0 +1,135 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+from gwproactor.logger import LoggerOrAdapter
+
+from .flo import DGraph
+from named_types import FloParamsHouse0, PriceQuantityUnitless
+
+
+class FloProcess():
+    """Builds and solves DGraphs in a worker process, so the Atn event loop keeps the GIL.
+
+    The graph, including its pathcost and next node arrays, stays in the worker: solve()
+    only returns the solve time, and generate_bid() only sends the updated parameters and
+    gets the PQ pairs back. The Atn has no use for the solution beyond the bid, so copying
+    it out (through shared memory or otherwise) would only cost time and memory.
+    The worker is spawned rather than forked since the Atn runs several threads. Spawned
+    workers do not inherit the logging handlers, so the DGraph log lines of each call are
+    sent back with its result and logged with the logger passed to the call.
+    """
+    def __init__(self, vectorized_solver: bool = False, persistent: bool = False):
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_flo_worker,
+            initargs=(vectorized_solver, persistent),
+        )
+
+    def solve(self, flo_params: FloParamsHouse0, logger: Optional[LoggerOrAdapter] = None) -> float:
+        """Build and solve the graph in the worker, and return the seconds it took"""
+        return _relay_log(self.executor.submit(_solve, flo_params).result(), logger)
+
+    def generate_bid(
+            self,
+            updated_flo_params: Optional[FloParamsHouse0] = None,
+            min_price_usd_mwh: float = -100,
+            max_price_usd_mwh: float = 2000,
+            price_step_usd_mwh: float = 1,
+            logger: Optional[LoggerOrAdapter] = None,
+    ) -> List[PriceQuantityUnitless]:
+        """The bid of the graph solved last. Without one (after a bid, unless persistent),
+        the graph is first built and solved from updated_flo_params."""
+        return _relay_log(
+            self.executor.submit(
+                _generate_bid, updated_flo_params, min_price_usd_mwh, max_price_usd_mwh, price_step_usd_mwh
+            ).result(),
+            logger,
+        )
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _relay_log(result: Tuple[Any, List[Tuple[int, str]]], logger: Optional[LoggerOrAdapter]) -> Any:
+    value, log = result
+    if logger is not None:
+        for level, msg in log:
+            logger.log(level, msg)
+    return value
+
+
+class _LogCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.log: List[Tuple[int, str]] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.log.append((record.levelno, record.getMessage()))
+
+    def take(self) -> List[Tuple[int, str]]:
+        log, self.log = self.log, []
+        return log
+
+
+_vectorized_solver: bool = False
+_persistent: bool = False
+_graph: Optional[DGraph] = None
+_log_collector: Optional[_LogCollector] = None
+
+
+def _init_flo_worker(vectorized_solver: bool, persistent: bool):
+    global _vectorized_solver, _persistent, _log_collector
+    _vectorized_solver = vectorized_solver
+    _persistent = persistent
+    _log_collector = _LogCollector()
+    logger = logging.getLogger(DGraph.LOGGER_NAME)
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(_log_collector)
+    logger.propagate = False
+
+
+def _build_and_solve(flo_params: FloParamsHouse0) -> None:
+    global _graph
+    if _persistent and _graph is not None:
+        _graph.refresh(flo_params)
+    else:
+        _graph = DGraph(
+            flo_params,
+            logging.getLogger(DGraph.LOGGER_NAME),
+            vectorized_solver=_vectorized_solver,
+            persistent=_persistent,
+        )
+    _graph.solve_dijkstra()
+
+
+def _solve(flo_params: FloParamsHouse0) -> Tuple[float, List[Tuple[int, str]]]:
+    st = time.time()
+    _build_and_solve(flo_params)
+    return time.time() - st, _log_collector.take()
+
+
+def _generate_bid(
+        updated_flo_params: Optional[FloParamsHouse0],
+        min_price_usd_mwh: float,
+        max_price_usd_mwh: float,
+        price_step_usd_mwh: float,
+) -> Tuple[List[PriceQuantityUnitless], List[Tuple[int, str]]]:
+    global _graph
+    if _graph is None:
+        if updated_flo_params is None:
+            raise ValueError("No solved graph: call solve() first or pass updated_flo_params")
+        _build_and_solve(updated_flo_params)
+    _graph.generate_bid(
+        updated_flo_params,
+        min_price_usd_mwh=min_price_usd_mwh,
+        max_price_usd_mwh=max_price_usd_mwh,
+        price_step_usd_mwh=price_step_usd_mwh,
+    )
+    pq_pairs = _graph.pq_pairs
+    if not _persistent:
+        _graph = None
+    return pq_pairs, _log_collector.take()
@@ -1,5 +1,5 @@
 import asyncio
-from typing import List, Optional, Sequence, cast
+from typing import List, Optional, Sequence, Set, cast
 from enum import auto
 import time
 import uuid
@@ -17,6 +17,7 @@ from transitions import Machine
 from data_classes.house_0_names import H0N, H0CN
 from gwproto.data_classes.components.dfr_component import DfrComponent
 
+from actors.channel_bus import ChannelView
 from actors.scada_actor import ScadaActor
 from named_types import (
             GoDormant, Glitch, Ha1Params, HeatingForecast,
@@ -73,6 +74,7 @@ class TopStateEvent(GwStrEnum):
 
 class HomeAlone(ScadaActor):
     MAIN_LOOP_SLEEP_SECONDS = 60
+    TEMPERATURES_CHANGED_MIN_INTERVAL_S = 5
     BLIND_MINUTES = 5
     states = [
         "Dormant",
@@ -149,6 +151,19 @@ class HomeAlone(ScadaActor):
             H0CN.buffer_cold_pipe, H0CN.buffer_hot_pipe, H0CN.store_cold_pipe, H0CN.store_hot_pipe,
             *(depth for tank in self.cn.tank.values() for depth in [tank.depth1, tank.depth2, tank.depth3, tank.depth4])
         ]
+        self.buffer_channel_names = [x for x in self.temperature_channel_names if 'buffer-depth' in x]
+        self.temperature_channels = self.subscribe_channels(
+            self.temperature_channel_names + [H0N.usable_energy, H0N.required_energy],
+            callback=self.temperatures_changed,
+            min_interval_s=self.TEMPERATURES_CHANGED_MIN_INTERVAL_S,
+        )
+        self.zone_setpoint_channel_names = [x for x in self.data.latest_channel_values if 'zone' in x and 'set' in x]
+        self.zone_channels = self.subscribe_channels(
+            self.zone_setpoint_channel_names
+            + [x.replace('-set', '-temp') for x in self.zone_setpoint_channel_names]
+        )
+        # set when the main loop should not wait for the end of its sleep
+        self._wake_main_loop = asyncio.Event()
 
         self.temperatures_available = False
         self.storage_declared_ready = False
@@ -437,7 +452,11 @@ class HomeAlone(ScadaActor):
                         waking_up = self.state==HomeAloneState.Initializing
                     self.engage_brain(waking_up=waking_up)
                 self.starting_up = False
-            await asyncio.sleep(self.MAIN_LOOP_SLEEP_SECONDS)
+            try:
+                await asyncio.wait_for(self._wake_main_loop.wait(), self.MAIN_LOOP_SLEEP_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake_main_loop.clear()
 
     def engage_brain(self, waking_up: bool = False) -> None:
         """
@@ -501,8 +520,8 @@ class HomeAlone(ScadaActor):
                     if self.is_storage_ready():
                         self.trigger_normal_event(HomeAloneEvent.OffPeakBufferFullStorageReady)
                     else:
-                        usable = self.data.latest_channel_values[H0N.usable_energy] / 1000
-                        required = self.data.latest_channel_values[H0N.required_energy] / 1000
+                        usable = self.temperature_channels[H0N.usable_energy] / 1000
+                        required = self.temperature_channels[H0N.required_energy] / 1000
                         if usable < required:
                             self.trigger_normal_event(HomeAloneEvent.OffPeakBufferFullStorageNotReady)
                         else:
@@ -524,8 +543,8 @@ class HomeAlone(ScadaActor):
                     if self.is_buffer_empty():
                         self.trigger_normal_event(HomeAloneEvent.OffPeakBufferEmpty)
                     elif not self.is_storage_ready():
-                        usable = self.data.latest_channel_values[H0N.usable_energy] / 1000
-                        required = self.data.latest_channel_values[H0N.required_energy] / 1000
+                        usable = self.temperature_channels[H0N.usable_energy] / 1000
+                        required = self.temperature_channels[H0N.required_energy] / 1000
                         if self.storage_declared_ready:
                             if self.full_storage_energy is None:
                                 if usable > 0.9*required:
@@ -836,15 +855,17 @@ class HomeAlone(ScadaActor):
             value_below = self.latest_temperatures[layer]  
         self.latest_temperatures = {k:self.latest_temperatures[k] for k in sorted(self.latest_temperatures)}
 
+    def temperatures_changed(self, view: ChannelView, changed: Set[str]) -> None:
+        # Enough temperatures are in (see get_latest_temperatures) while they were not: decide
+        # now rather than at the end of the sleep
+        if self.temperatures_available or self.is_simulated:
+            return
+        if all(x in view for x in self.buffer_channel_names + [H0N.usable_energy, H0N.required_energy]):
+            self._wake_main_loop.set()
+
     def get_latest_temperatures(self):
         if not self.is_simulated:
-            temp = {
-                x: self.data.latest_channel_values[x] 
-                for x in self.temperature_channel_names
-                if x in self.data.latest_channel_values
-                and self.data.latest_channel_values[x] is not None
-                }
-            self.latest_temperatures = temp.copy()
+            self.latest_temperatures = self.temperature_channels.latest(self.temperature_channel_names)
         else:
             self.log("IN SIMULATION - set all temperatures to 20 degC")
             self.latest_temperatures = {}
@@ -854,15 +875,13 @@ class HomeAlone(ScadaActor):
             self.temperatures_available = True
         else:
             self.temperatures_available = False
-            all_buffer = [x for x in self.temperature_channel_names if 'buffer-depth' in x]
-            available_buffer = [x for x in list(self.latest_temperatures.keys()) if 'buffer-depth' in x]
-            if all_buffer == available_buffer:
+            if all(x in self.latest_temperatures for x in self.buffer_channel_names):
                 print("All the buffer temperatures are available")
                 self.fill_missing_store_temps()
                 print("Successfully filled in the missing storage temperatures.")
                 self.temperatures_available = True
-        total_usable_kwh = self.data.latest_channel_values[H0N.usable_energy]
-        required_storage = self.data.latest_channel_values[H0N.required_energy]
+        total_usable_kwh = self.temperature_channels[H0N.usable_energy]
+        required_storage = self.temperature_channels[H0N.required_energy]
         if total_usable_kwh is None or required_storage is None:
             self.temperatures_available = False
 
@@ -920,8 +939,8 @@ class HomeAlone(ScadaActor):
             return False
 
     def is_storage_ready(self, return_missing=False) -> bool:
-        total_usable_kwh = self.data.latest_channel_values[H0N.usable_energy] / 1000
-        required_storage = self.data.latest_channel_values[H0N.required_energy] / 1000
+        total_usable_kwh = self.temperature_channels[H0N.usable_energy] / 1000
+        required_storage = self.temperature_channels[H0N.required_energy] / 1000
         if return_missing:
             return total_usable_kwh, required_storage
         if total_usable_kwh >= required_storage:
@@ -942,7 +961,7 @@ class HomeAlone(ScadaActor):
         
     def is_storage_empty(self):
         if not self.is_simulated:
-            total_usable_kwh = self.data.latest_channel_values[H0N.usable_energy] / 1000
+            total_usable_kwh = self.temperature_channels[H0N.usable_energy] / 1000
         else:
             total_usable_kwh = 0
         if total_usable_kwh < 0.2:
@@ -959,13 +978,13 @@ class HomeAlone(ScadaActor):
             return
         self.zone_setpoints = {}
         temps = {}
-        for zone_setpoint in [x for x in self.data.latest_channel_values if 'zone' in x and 'set' in x]:
+        for zone_setpoint in self.zone_setpoint_channel_names:
             zone_name = zone_setpoint.replace('-set','')
             self.log(f"Found zone: {zone_name}")
-            if self.data.latest_channel_values[zone_setpoint] is not None:
-                self.zone_setpoints[zone_name] = self.data.latest_channel_values[zone_setpoint]
-            if self.data.latest_channel_values[zone_setpoint.replace('-set','-temp')] is not None:
-                temps[zone_name] = self.data.latest_channel_values[zone_setpoint.replace('-set','-temp')]
+            if self.zone_channels[zone_setpoint] is not None:
+                self.zone_setpoints[zone_name] = self.zone_channels[zone_setpoint]
+            if self.zone_channels[zone_setpoint.replace('-set','-temp')] is not None:
+                temps[zone_name] = self.zone_channels[zone_setpoint.replace('-set','-temp')]
         self.log(f"Found all zone setpoints: {self.zone_setpoints}")
         self.log(f"Found all zone temperatures: {temps}")
     
@@ -973,10 +992,10 @@ class HomeAlone(ScadaActor):
         for zone in self.zone_setpoints:
             setpoint = self.zone_setpoints[zone]
             if not self.is_simulated:
-                if zone+'-temp' not in self.data.latest_channel_values:
+                if zone+'-temp' not in self.zone_channels:
                     self.log(f"Could not find latest temperature for {zone}!")
                     continue
-                temperature = self.data.latest_channel_values[zone+'-temp']
+                temperature = self.zone_channels[zone+'-temp']
             else:
                 temperature = 40
             if temperature < setpoint - 1*1000:
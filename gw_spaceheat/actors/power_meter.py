@@ -125,7 +125,44 @@ class DriverThreadSetupHelper:
         return response_dict
 
 
+class AdaptivePollScheduler:
+    """Poll period of the power meter: MinPollPeriodMs while the power is changing, backing
+    off by doubling to idle_period_ms once it has been stable for QUIET_POLLS_BEFORE_BACKOFF
+    polls. Any change brings the period straight back to the fastest.
+
+    With idle_period_ms at or below fast_period_ms the period stays at fast_period_ms.
+    """
+    QUIET_POLLS_BEFORE_BACKOFF = 10
+    BACKOFF_FACTOR = 2
+
+    fast_period_ms: float
+    idle_period_ms: float
+    period_ms: float
+    quiet_polls: int
+
+    def __init__(self, fast_period_ms: float, idle_period_ms: float):
+        self.fast_period_ms = fast_period_ms
+        self.idle_period_ms = max(fast_period_ms, idle_period_ms)
+        self.period_ms = fast_period_ms
+        self.quiet_polls = 0
+
+    def update(self, active: bool) -> float:
+        """The period until the next poll, given whether the last poll saw activity"""
+        if active:
+            self.quiet_polls = 0
+            self.period_ms = self.fast_period_ms
+        else:
+            self.quiet_polls += 1
+            if self.quiet_polls >= self.QUIET_POLLS_BEFORE_BACKOFF:
+                self.period_ms = min(self.period_ms * self.BACKOFF_FACTOR, self.idle_period_ms)
+        return self.period_ms
+
+
 class PowerMeterDriverThread(SyncAsyncInteractionThread):
+    # Aggregated power moving by more than this fraction of the PowerWatts reporting
+    # threshold counts as activity for the poll scheduler
+    ACTIVITY_FRACTION_OF_ASYNC_THRESHOLD = 0.25
+
     eq_reporting_config: Dict[DataChannel, ElectricMeterChannelConfig]
     driver: PowerMeterDriver
     transactive_nameplate_watts: Dict[DataChannel, int]
@@ -134,6 +171,8 @@ class PowerMeterDriverThread(SyncAsyncInteractionThread):
     latest_telemetry_value: Dict[DataChannel, Optional[int]]
     _last_sampled_s: Dict[DataChannel, Optional[int]]
     async_power_reporting_threshold: float
+    poll_scheduler: AdaptivePollScheduler
+    _previous_agg_power_w: Optional[int] = None
     _telemetry_destination: str
     _hardware_layout: HardwareLayout
     _hw_uid: str = ""
@@ -180,6 +219,11 @@ class PowerMeterDriverThread(SyncAsyncInteractionThread):
             ch: None for ch in self.my_channels
         }
         self.async_power_reporting_threshold = settings.async_power_reporting_threshold
+        self.poll_scheduler = AdaptivePollScheduler(
+            fast_period_ms=component.cac.MinPollPeriodMs,
+            idle_period_ms=settings.power_meter_idle_poll_period_ms,
+        )
+        self._previous_agg_power_w = None
 
     def _validate_channels_with_component(self, component: ElectricMeterComponent) -> None:
         for channel in self.my_channels:
@@ -245,7 +289,9 @@ class PowerMeterDriverThread(SyncAsyncInteractionThread):
         start_s = time.time()
         self._ensure_hardware_uid()
         self.update_latest_value_dicts()
+        active = self.agg_power_is_changing()
         if self.should_report_aggregated_power():
+            active = True
             self.report_aggregated_power_w()
         channel_report_list = [
             ch
@@ -253,35 +299,69 @@ class PowerMeterDriverThread(SyncAsyncInteractionThread):
             if self.should_report_telemetry_reading(ch)
         ]
         if channel_report_list:
+            active = active or any(
+                self.value_exceeds_async_threshold(ch)
+                for ch in channel_report_list
+                if self.last_reported_telemetry_value[ch] is not None
+            )
             self.report_sampled_telemetry_values(channel_report_list)
-        sleep_time_ms = self.driver.component.cac.MinPollPeriodMs
+        # Never later than the next synced reading, and never faster than MinPollPeriodMs
+        sleep_time_ms = max(
+            self.poll_scheduler.fast_period_ms,
+            min(self.poll_scheduler.update(active), 1000 * self.seconds_until_next_capture()),
+        )
         delta_ms = 1000 * (time.time() - start_s)
         if delta_ms < sleep_time_ms:
             sleep_time_ms -= delta_ms
         self._iterate_sleep_seconds = sleep_time_ms / 1000
 
+    def agg_power_is_changing(self) -> bool:
+        latest_agg_power_w = self.latest_agg_power_w
+        previous_agg_power_w, self._previous_agg_power_w = self._previous_agg_power_w, latest_agg_power_w
+        if latest_agg_power_w is None or previous_agg_power_w is None:
+            return False
+        return abs(latest_agg_power_w - previous_agg_power_w) > (
+            self.ACTIVITY_FRACTION_OF_ASYNC_THRESHOLD
+            * self.async_power_reporting_threshold
+            * self.nameplate_agg_power_w
+        )
+
+    def seconds_until_next_capture(self) -> float:
+        """Time until a channel is due for its CapturePeriodS synced reading, so that backing
+        off never delays one"""
+        now = time.time()
+        return min(
+            (
+                self._last_sampled_s[ch] + self.eq_reporting_config[ch].CapturePeriodS - now
+                if self._last_sampled_s[ch] is not None else 0.0
+                for ch in self.my_channels
+            ),
+            default=float("inf"),
+        )
+
     def update_latest_value_dicts(self):
-        logged_one = False
-        for ch in self.my_channels:
-            read = self.driver.read_telemetry_value(ch)
-            if read.is_ok():
-                if read.value.value is not None:
-                    self.latest_telemetry_value[ch] = read.value.value
-                if read.value.warnings:
-                    log_event = False
-                    if not logged_one and self._logger.isEnabledFor(logging.DEBUG):
-                        logged_one = True
-                        log_event = True
-                        self._logger.info(f"PowerMeter: TryConnectResult:\n{read.value}")
-                        problems = Problems(warnings=read.value.warnings)
-                        self._logger.info(f"PowerMeter: Problems:\n{problems}")
-                    self._report_problems(
-                        problems=Problems(warnings=read.value.warnings),
-                        tag="read warnings",
-                        log_event=log_event
-                    )
-            else:
-                raise read.value
+        # All the channels in one driver call, so that drivers can read them together
+        read = self.driver.read_telemetry_values(self.my_channels)
+        if read.is_ok():
+            if read.value.value is not None:
+                for ch in self.my_channels:
+                    value = read.value.value.get(ch.Name)
+                    if value is not None:
+                        self.latest_telemetry_value[ch] = value
+            if read.value.warnings:
+                log_event = False
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    log_event = True
+                    self._logger.info(f"PowerMeter: TryConnectResult:\n{read.value}")
+                    problems = Problems(warnings=read.value.warnings)
+                    self._logger.info(f"PowerMeter: Problems:\n{problems}")
+                self._report_problems(
+                    problems=Problems(warnings=read.value.warnings),
+                    tag="read warnings",
+                    log_event=log_event
+                )
+        else:
+            raise read.value
 
     def report_sampled_telemetry_values(
         self, channel_report_list: List[DataChannel]
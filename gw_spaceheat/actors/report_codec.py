@@ -0,0 +1,126 @@
+"""Columnar encoding of the channel readings of a Report, for the upstream link.
+
+The readings of a 5 minute report are mostly regular read times and slowly changing values,
+which take a lot of room as json decimal text. A CompactReport stores them as integer
+columns, channel after channel:
+
+    reading counts (one per channel),
+    read times: delta from the previous read time of the channel (from the slot start for
+        the first one), then delta again from one delta to the next, so that regular
+        sampling encodes as zeros,
+    values: delta from the previous value of the channel
+
+written as zigzag varints, zlib compressed for the columnar.zlib encoding, and base64
+encoded. The machine states and fsm reports are kept as they are.
+"""
+import base64
+import zlib
+from typing import List
+
+import numpy as np
+from gwproto.messages import ChannelReadings, Report
+
+from drivers.pipe_flow_sensor.ticklist_codec import zigzag_varint_decode, zigzag_varint_encode
+from named_types import CompactReport
+
+ENCODINGS = ("columnar", "columnar.zlib")
+
+
+def segment_starts(counts: np.ndarray) -> np.ndarray:
+    return np.cumsum(counts) - counts
+
+
+def segmented_delta(values: np.ndarray, counts: np.ndarray, first_from: np.ndarray) -> np.ndarray:
+    """Delta of each value from the previous one of its segment, and of the first one of a
+    segment from first_from (one per segment)"""
+    deltas = np.diff(values, prepend=0)
+    starts = segment_starts(counts)[counts > 0]
+    deltas[starts] = values[starts] - first_from[counts > 0]
+    return deltas
+
+
+def segmented_cumsum(deltas: np.ndarray, counts: np.ndarray, first_from: np.ndarray) -> np.ndarray:
+    """Inverse of segmented_delta"""
+    cumulative = np.cumsum(deltas, dtype=np.int64)
+    starts = segment_starts(counts)
+    before = np.zeros(len(counts), dtype=np.int64)
+    before[starts > 0] = cumulative[starts[starts > 0] - 1]
+    return cumulative + np.repeat(first_from - before, counts)
+
+
+def encode_report(report: Report, encoding: str = "columnar.zlib") -> CompactReport:
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown report encoding {encoding}, expected one of {ENCODINGS}")
+    readings = report.ChannelReadingList
+    counts = np.array([len(r.ValueList) for r in readings], dtype=np.int64)
+    for r in readings:
+        if len(r.ScadaReadTimeUnixMsList) != len(r.ValueList):
+            raise ValueError(f"{r.ChannelName} has {len(r.ValueList)} values but {len(r.ScadaReadTimeUnixMsList)} read times")
+    total = int(counts.sum())
+    times = np.fromiter((t for r in readings for t in r.ScadaReadTimeUnixMsList), dtype=np.int64, count=total)
+    values = np.fromiter((v for r in readings for v in r.ValueList), dtype=np.int64, count=total)
+    zeros = np.zeros(len(readings), dtype=np.int64)
+    time_deltas = segmented_delta(times, counts, np.full(len(readings), report.SlotStartUnixS * 1000))
+    data = zigzag_varint_encode(
+        np.concatenate([
+            counts,
+            segmented_delta(time_deltas, counts, zeros),
+            segmented_delta(values, counts, zeros),
+        ])
+    )
+    if encoding == "columnar.zlib":
+        data = zlib.compress(data)
+    return CompactReport(
+        FromGNodeAlias=report.FromGNodeAlias,
+        FromGNodeInstanceId=report.FromGNodeInstanceId,
+        AboutGNodeAlias=report.AboutGNodeAlias,
+        SlotStartUnixS=report.SlotStartUnixS,
+        SlotDurationS=report.SlotDurationS,
+        ChannelNameList=[r.ChannelName for r in readings],
+        StateList=report.StateList,
+        FsmReportList=report.FsmReportList,
+        MessageCreatedMs=report.MessageCreatedMs,
+        Id=report.Id,
+        Encoding=encoding,
+        EncodedReadings=base64.b64encode(data).decode(),
+    )
+
+
+def decode_report(compact: CompactReport) -> Report:
+    """The Report a CompactReport was encoded from"""
+    data = base64.b64decode(compact.EncodedReadings)
+    if compact.Encoding == "columnar.zlib":
+        data = zlib.decompress(data)
+    columns = zigzag_varint_decode(data)
+    n = len(compact.ChannelNameList)
+    counts = columns[:n]
+    total = int(counts.sum())
+    if len(counts) != n or len(columns) != n + 2 * total:
+        raise ValueError(f"Inconsistent CompactReport {compact.Id}: {len(columns)} values for {n} channels")
+    zeros = np.zeros(n, dtype=np.int64)
+    time_deltas = segmented_cumsum(columns[n:n + total], counts, zeros)
+    times = segmented_cumsum(time_deltas, counts, np.full(n, compact.SlotStartUnixS * 1000)).tolist()
+    values = segmented_cumsum(columns[n + total:], counts, zeros).tolist()
+    readings: List[ChannelReadings] = []
+    start = 0
+    for name, count in zip(compact.ChannelNameList, counts.tolist()):
+        readings.append(
+            ChannelReadings(
+                ChannelName=name,
+                ValueList=values[start:start + count],
+                ScadaReadTimeUnixMsList=times[start:start + count],
+            )
+        )
+        start += count
+    return Report(
+        FromGNodeAlias=compact.FromGNodeAlias,
+        FromGNodeInstanceId=compact.FromGNodeInstanceId,
+        AboutGNodeAlias=compact.AboutGNodeAlias,
+        SlotStartUnixS=compact.SlotStartUnixS,
+        SlotDurationS=compact.SlotDurationS,
+        ChannelReadingList=readings,
+        StateList=compact.StateList,
+        FsmReportList=compact.FsmReportList,
+        MessageCreatedMs=compact.MessageCreatedMs,
+        Id=compact.Id,
+    )
@@ -0,0 +1,178 @@
+"""Bounded store of the Reports sent by the Scada.
+
+The most recent reports are kept in memory, in least recently used order. Older ones are
+spilled to segment files on disk, one report per line as
+
+    SlotStartUnixS <tab> Id <tab> report json
+
+and found again through an index of (segment, offset, length) per report Id, so reading one
+back is a single seek. Segments hold up to reports_per_segment reports; beyond max_segments
+the oldest segment is deleted. The index is rebuilt from the line headers on start, without
+parsing the reports, so they survive a restart without being kept in memory. Spilling is
+off unless ReportStoreSettings.spill_to_disk is set (ScadaData then passes data_dir/reports).
+"""
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from gwproto.messages import Report
+
+from actors.config import ReportStoreSettings
+
+SEGMENT_PREFIX = "reports-"
+SEGMENT_SUFFIX = ".jsonl"
+SEGMENT_NAME = re.compile(rf"{SEGMENT_PREFIX}(\d+)-(\d+){re.escape(SEGMENT_SUFFIX)}")
+
+
+class SpilledReport(NamedTuple):
+    segment: Path
+    offset: int
+    length: int
+    slot_start_s: int
+
+
+@dataclass
+class ReportStoreStats:
+    reports_in_memory: int = 0
+    memory_bytes: int = 0  # json size of the reports in memory
+    reports_on_disk: int = 0
+    disk_bytes: int = 0
+    segments: int = 0
+    spilled: int = 0  # since start
+    dropped: int = 0  # removed with their segment, or evicted without a spill dir
+    disk_reads: int = 0
+
+
+class ReportStore:
+    def __init__(self, spill_dir: Optional[Path | str], settings: ReportStoreSettings = ReportStoreSettings()):
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.settings = settings
+        self._recent: OrderedDict[str, Report] = OrderedDict()
+        self._recent_bytes: Dict[str, int] = {}
+        self._by_slot: Dict[int, str] = {}
+        self._spilled: Dict[str, SpilledReport] = {}
+        self._segments: List[Path] = []  # oldest first
+        self._open_segment: Optional[Path] = None  # appended to, never one loaded on start
+        self._segment_counts: Dict[Path, int] = {}
+        self._stats = ReportStoreStats()
+        if self.spill_dir is not None and self.spill_dir.exists():
+            self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._recent) + len(self._spilled)
+
+    def __contains__(self, report_id: str) -> bool:
+        return report_id in self._recent or report_id in self._spilled
+
+    def add(self, report: Report) -> None:
+        self._recent[report.Id] = report
+        self._recent.move_to_end(report.Id)
+        self._recent_bytes[report.Id] = len(report.model_dump_json())
+        self._by_slot[report.SlotStartUnixS] = report.Id
+        while len(self._recent) > self.settings.max_in_memory:
+            self._evict()
+
+    def get(self, report_id: str) -> Optional[Report]:
+        """The report, from memory or from its segment"""
+        if report_id in self._recent:
+            self._recent.move_to_end(report_id)
+            return self._recent[report_id]
+        spilled = self._spilled.get(report_id)
+        if spilled is None:
+            return None
+        return self._read(spilled)
+
+    def get_by_slot(self, slot_start_s: int) -> Optional[Report]:
+        report_id = self._by_slot.get(slot_start_s)
+        return self.get(report_id) if report_id is not None else None
+
+    def stats(self) -> ReportStoreStats:
+        self._stats.reports_in_memory = len(self._recent)
+        self._stats.memory_bytes = sum(self._recent_bytes.values())
+        self._stats.reports_on_disk = len(self._spilled)
+        self._stats.segments = len(self._segments)
+        self._stats.disk_bytes = sum(segment.stat().st_size for segment in self._segments if segment.exists())
+        return ReportStoreStats(**vars(self._stats))
+
+    def _evict(self) -> None:
+        report_id, report = self._recent.popitem(last=False)
+        self._recent_bytes.pop(report_id)
+        if self.spill_dir is None:
+            self._forget(report_id, report.SlotStartUnixS)
+            self._stats.dropped += 1
+            return
+        segment = self._current_segment(report.SlotStartUnixS)
+        header = f"{report.SlotStartUnixS}\t{report_id}\t".encode()
+        data = report.model_dump_json().encode()
+        with segment.open("ab") as f:
+            offset = f.tell() + len(header)
+            f.write(header + data + b"\n")
+        self._spilled[report_id] = SpilledReport(segment, offset, len(data), report.SlotStartUnixS)
+        self._segment_counts[segment] += 1
+        self._stats.spilled += 1
+
+    def _current_segment(self, slot_start_s: int) -> Path:
+        segment = self._open_segment
+        if segment is not None and self._segment_counts[segment] < self.settings.reports_per_segment:
+            return segment
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        segment = self.spill_dir / f"{SEGMENT_PREFIX}{slot_start_s}-{time.time_ns()}{SEGMENT_SUFFIX}"
+        self._open_segment = segment
+        self._segments.append(segment)
+        self._segment_counts[segment] = 0
+        while len(self._segments) > self.settings.max_segments:
+            self._drop_segment(self._segments[0])
+        return segment
+
+    def _drop_segment(self, segment: Path) -> None:
+        self._segments.remove(segment)
+        self._segment_counts.pop(segment)
+        if segment == self._open_segment:
+            self._open_segment = None
+        for report_id, spilled in list(self._spilled.items()):
+            if spilled.segment == segment:
+                del self._spilled[report_id]
+                self._forget(report_id, spilled.slot_start_s)
+                self._stats.dropped += 1
+        segment.unlink(missing_ok=True)
+
+    def _forget(self, report_id: str, slot_start_s: int) -> None:
+        if self._by_slot.get(slot_start_s) == report_id:
+            del self._by_slot[slot_start_s]
+
+    def _read(self, spilled: SpilledReport) -> Report:
+        with spilled.segment.open("rb") as f:
+            f.seek(spilled.offset)
+            line = f.read(spilled.length)
+        self._stats.disk_reads += 1
+        return Report.model_validate_json(line)
+
+    def _load_index(self) -> None:
+        # Named by the slot of their first report, then their creation time
+        names = [SEGMENT_NAME.fullmatch(path.name) for path in self.spill_dir.iterdir()]
+        segments = [
+            self.spill_dir / match.group(0)
+            for match in sorted(filter(None, names), key=lambda m: (int(m.group(1)), int(m.group(2))))
+        ]
+        for segment in segments:
+            self._segments.append(segment)
+            self._segment_counts[segment] = 0
+            offset = 0
+            with segment.open("rb") as f:
+                for line in f:
+                    fields = line.split(b"\t", 2)
+                    # Skip a line cut short, e.g. by a power loss
+                    if len(fields) == 3 and line.endswith(b"\n") and fields[0].isdigit():
+                        slot_start_s, report_id = int(fields[0]), fields[1].decode()
+                        header_length = len(fields[0]) + len(fields[1]) + 2
+                        self._spilled[report_id] = SpilledReport(
+                            segment, offset + header_length, len(line) - header_length - 1, slot_start_s
+                        )
+                        self._by_slot[slot_start_s] = report_id
+                        self._segment_counts[segment] += 1
+                    offset += len(line)
+        while len(self._segments) > self.settings.max_segments:
+            self._drop_segment(self._segments[0])
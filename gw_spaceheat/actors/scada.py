@@ -7,7 +7,8 @@ import uuid
 import threading
 import time
 import pytz
-from typing import Any, List, Optional, cast
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 import dotenv
 from transitions import Machine
@@ -35,7 +36,10 @@ from result import Ok
 from result import Result
 
 from gwproactor import ActorInterface
-from actors.scada_data import ScadaData
+from gwproactor import CommunicatorInterface
+from actors.report_codec import encode_report
+from actors.scada_data import ChannelBuffer, ScadaData
+from actors.snapshot_delta import DEFAULT_THRESHOLD_BY_TELEMETRY, SnapshotDeltaTracker
 from actors.scada_interface import ScadaInterface
 from actors.config import ScadaSettings
 from gwproto.data_classes.sh_node import ShNode
@@ -55,8 +59,8 @@ from enums import (AtomicAllyState, ContractStatus, HomeAloneTopState, MainAutoE
                     TopState)
 from named_types import (
     AdminDispatch, AdminKeepAlive, AdminReleaseControl, AllyGivesUp, ChannelFlatlined,
-    Glitch, GoDormant, LayoutLite, NewCommandTree, NoNewContractWarning,
-    ScadaParams, SendLayout, SingleMachineState,
+    CompactReportEvent, Glitch, GoDormant, LayoutLite, NewCommandTree, NoNewContractWarning,
+    ReportEncoding, ScadaParams, SendLayout, SingleMachineState,
     SlowContractHeartbeat, SuitUp, WakeUp,
 )
 
@@ -150,12 +154,29 @@ class ScadaCmdDiagnostic(enum.Enum):
     IGNORING_ATN_DISPATCH = "IgnoringAtnDispatch"
 
 
+class ScadaRouteKind(enum.Enum):
+    SELF = "Self"
+    COMMUNICATOR = "Communicator"
+    ADMIN = "Admin"
+    ATN = "Atn"
+    LOCAL_MQTT = "LocalMqtt"
+
+
+@dataclass
+class ScadaRoute:
+    kind: ScadaRouteKind
+    node: ShNode
+    communicator: Optional[CommunicatorInterface] = None
+    sent: int = 0
+
+
 class Scada(ScadaInterface, Proactor):
     ASYNC_POWER_REPORT_THRESHOLD = 0.05
     DEFAULT_ACTORS_MODULE = "actors"
     ATN_MQTT = "gridworks"
     LOCAL_MQTT = "local"
     ADMIN_MQTT = "admin"
+    MAX_SYNCED_READINGS_LAYOUTS = 256
 
     _data: ScadaData
     _last_report_second: int
@@ -193,6 +214,18 @@ class Scada(ScadaInterface, Proactor):
         self.is_simulated = False
         self._layout: House0Layout = hardware_layout
         self._data = ScadaData(settings, hardware_layout)
+        # node name -> route, built on first use and again after add_communicator
+        self._routes: Optional[Dict[str, ScadaRoute]] = None
+        # call_later handle of the delivery of rate limited channel notifications
+        self._channel_notify_handle: Optional[asyncio.TimerHandle] = None
+        # channel idx of the data channels each node is allowed to send readings for
+        self._channel_idx_by_sender: Dict[str, Dict[str, int]] = {}
+        for ch in self._layout.data_channels.values():
+            self._channel_idx_by_sender.setdefault(ch.captured_by_node.Name, {})[ch.Name] = (
+                self._data.channel_idx[ch.Name]
+            )
+        # SyncedReadings ChannelNameList -> (channel idxs, recent buffers)
+        self._synced_readings_idx: Dict[Tuple[str, ...], Tuple[List[int], List[ChannelBuffer]]] = {}
         super().__init__(name=name, settings=settings, hardware_layout=hardware_layout)
         scada2_gnode_name = (
             f"{hardware_layout.scada_g_node_alias}.{H0N.secondary_scada}"
@@ -242,6 +275,17 @@ class Scada(ScadaInterface, Proactor):
         self._channels_reported = False
         self._last_report_second = int(now - (now % self.settings.seconds_per_report))
         self._last_snap_s = int(now - (now % self.settings.seconds_per_snapshot))
+        # json until the atn asks for a compact encoding (see process_report_encoding)
+        self.report_encoding = "json"
+        self.snapshot_tracker: Optional[SnapshotDeltaTracker] = None
+        if self.settings.snapshot_keyframe_every > 0:
+            thresholds = {
+                ch.Name: DEFAULT_THRESHOLD_BY_TELEMETRY[ch.TelemetryName]
+                for ch in self._data.my_data_channels
+                if ch.TelemetryName in DEFAULT_THRESHOLD_BY_TELEMETRY
+            }
+            thresholds.update(self.settings.snapshot_delta_thresholds)
+            self.snapshot_tracker = SnapshotDeltaTracker(self.settings.snapshot_keyframe_every, thresholds)
         self.pending_dispatch: Optional[AnalogDispatch] = None
 
         self.set_home_alone_command_tree()
@@ -369,6 +413,11 @@ class Scada(ScadaInterface, Proactor):
                     self.process_power_watts(from_node, payload)
                 except Exception as e:
                     self.log(f"Trouble with process_power_watts: \n {e}")
+            case ReportEncoding():
+                try:
+                    self.process_report_encoding(from_node, payload)
+                except Exception as e:
+                    self.log(f"Trouble with process_report_encoding: \n {e}")
             case ScadaParams():
                 try:
                     self.process_scada_params(from_node, payload)
@@ -382,7 +431,12 @@ class Scada(ScadaInterface, Proactor):
                     self.log(f"Trouble with SendLayout: {e}")
             case SendSnap():
                 try:
-                    self._send_to(from_node, self._data.make_snapshot())
+                    if self.snapshot_tracker is not None and from_node in [self.atn, self.admin]:
+                        # Asked for after a missed delta: both get the keyframe
+                        self.snapshot_tracker.request_keyframe()
+                        self.send_snap()
+                    else:
+                        self._send_to(from_node, self._data.make_snapshot())
                 except Exception as e:
                     self.log(f"Trouble with SendSnap: {e}")
             case SingleMachineState():
@@ -412,6 +466,7 @@ class Scada(ScadaInterface, Proactor):
                     self.log(f"Trouble with process_synced_reading: \n {e}")
             case _:
                 raise ValueError(f"Scada does not expect to receive[{type(payload)}!]")
+        self.notify_channel_subscribers()
 
     #####################################################################
     # Process Messages
@@ -514,23 +569,24 @@ class Scada(ScadaInterface, Proactor):
     def process_channel_readings(
         self, from_node: ShNode, payload: ChannelReadings
     ) -> None:
-        if payload.ChannelName not in self._layout.data_channels:
-            raise ValueError(
-                f"Name {payload.ChannelName} in ChannelReadings not a recognized Data Channel!"
-            )
-        ch = self._layout.data_channels[payload.ChannelName]
-        if from_node != ch.captured_by_node:
+        allowed = self._channel_idx_by_sender.get(from_node.Name) if from_node else None
+        idx = allowed.get(payload.ChannelName) if allowed else None
+        if idx is None:
+            if payload.ChannelName not in self._layout.data_channels:
+                raise ValueError(
+                    f"Name {payload.ChannelName} in ChannelReadings not a recognized Data Channel!"
+                )
+            ch = self._layout.data_channels[payload.ChannelName]
             raise ValueError(
                 f"{payload.ChannelName} shoudl be read by {ch.captured_by_node}, not {from_node}!"
             )
-        self._data.recent_channel_values[ch.Name] += payload.ValueList
-
-        self._data.recent_channel_unix_ms[ch.Name] += payload.ScadaReadTimeUnixMsList
+        self._data.recent_buffers[idx].extend(
+            payload.ValueList, payload.ScadaReadTimeUnixMsList
+        )
         if len(payload.ValueList) > 0:
-            self._data.latest_channel_values[ch.Name] = payload.ValueList[-1]
-            self._data.latest_channel_unix_ms[
-                ch.Name
-            ] = payload.ScadaReadTimeUnixMsList[-1]
+            self._data.update_latest_idx(
+                idx, payload.ValueList[-1], payload.ScadaReadTimeUnixMsList[-1]
+            )
 
     def process_fsm_full_report(
         self, from_node: ShNode, payload: FsmFullReport
@@ -578,6 +634,17 @@ class Scada(ScadaInterface, Proactor):
         if self.contract_handler.latest_scada_hb:
             self.contract_handler.update_energy_usage(payload.Watts)
 
+    def process_report_encoding(self, from_node: ShNode, payload: ReportEncoding) -> None:
+        if from_node != self.atn:
+            self.log(f"ReportEncoding from {from_node.Name}; expect Atn!")
+            return
+        if payload.Encoding != "json" and not self.settings.compact_reports:
+            self.log(f"Atn asked for {payload.Encoding} reports; staying with json since compact_reports is off")
+            return
+        if payload.Encoding != self.report_encoding:
+            self.log(f"Sending {payload.Encoding} reports")
+        self.report_encoding = payload.Encoding
+
     def process_scada_params(
         self, from_node: ShNode, payload: ScadaParams, testing: bool = False
     ) -> None:
@@ -681,19 +748,35 @@ class Scada(ScadaInterface, Proactor):
                     self.log(f"Subscriber {subscription.subscriber_name} not found for state change from {from_node.Name}")
 
 
+    def notify_channel_subscribers(self) -> None:
+        """Call back the channel subscribers with the channels that changed, and schedule
+        the delivery of the changes held back by their rate limits"""
+        next_due = self._data.channel_bus.flush(
+            time.monotonic(),
+            on_error=lambda view, e: self.log(f"Trouble with channel callback of {view.subscriber_name}: {e}"),
+        )
+        if next_due is None or self._channel_notify_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # delivered with the next ingested message
+        self._channel_notify_handle = loop.call_later(
+            max(next_due - time.monotonic(), 0), self._deliver_held_channel_notifications
+        )
+
+    def _deliver_held_channel_notifications(self) -> None:
+        self._channel_notify_handle = None
+        self.notify_channel_subscribers()
+
     def process_single_reading(
         self, from_node: ShNode, payload: SingleReading
     ) -> None:
-        if payload.ChannelName in self._layout.data_channels:
-            ch = self._layout.data_channels[payload.ChannelName]
-        elif payload.ChannelName in self._layout.synth_channels:
-            ch = self._layout.synth_channels[payload.ChannelName]
-        else:
+        idx = self._data.channel_idx.get(payload.ChannelName)
+        if idx is None:
             raise Exception(f"Missing channel name {payload.ChannelName}!")
-        self._data.recent_channel_values[ch.Name].append(payload.Value)
-        self._data.recent_channel_unix_ms[ch.Name].append(payload.ScadaReadTimeUnixMs)
-        self._data.latest_channel_values[ch.Name] = payload.Value
-        self._data.latest_channel_unix_ms[ch.Name] = payload.ScadaReadTimeUnixMs
+        self._data.recent_buffers[idx].append(payload.Value, payload.ScadaReadTimeUnixMs)
+        self._data.update_latest_idx(idx, payload.Value, payload.ScadaReadTimeUnixMs)
         self._forward_single_reading(payload)
 
     def process_suit_up(self, from_node: ShNode, payload: SuitUp) -> None:
@@ -713,20 +796,24 @@ class Scada(ScadaInterface, Proactor):
             from_node.Name,
             len(payload.ChannelNameList),
         )
-        path_dbg = 0
-        for idx, channel_name in enumerate(payload.ChannelNameList):
-            path_dbg |= 0x00000001
-            if channel_name not in self._layout.data_channels:
-                raise ValueError(
-                    f"Name {channel_name} in payload.SyncedReadings not a recognized Data Channel!"
-                )
-            ch = self._layout.data_channels[channel_name]
-            self._data.recent_channel_values[ch.Name].append(payload.ValueList[idx])
-            self._data.recent_channel_unix_ms[ch.Name].append(
-                payload.ScadaReadTimeUnixMs
+        channel_names = tuple(payload.ChannelNameList)
+        synced_idx = self._synced_readings_idx.get(channel_names)
+        if synced_idx is None:
+            for channel_name in channel_names:
+                if channel_name not in self._layout.data_channels:
+                    raise ValueError(
+                        f"Name {channel_name} in payload.SyncedReadings not a recognized Data Channel!"
+                    )
+            idxs = [self._data.channel_idx[channel_name] for channel_name in channel_names]
+            synced_idx = (idxs, [self._data.recent_buffers[idx] for idx in idxs])
+            if len(self._synced_readings_idx) >= self.MAX_SYNCED_READINGS_LAYOUTS:
+                self._synced_readings_idx.clear()
+            self._synced_readings_idx[channel_names] = synced_idx
+        if len(payload.ValueList) != len(channel_names):
+            raise ValueError(
+                f"SyncedReadings has {len(channel_names)} channels but {len(payload.ValueList)} values!"
             )
-            self._data.latest_channel_values[ch.Name] = payload.ValueList[idx]
-            self._data.latest_channel_unix_ms[ch.Name] = payload.ScadaReadTimeUnixMs
+        self._data.add_synced_readings(*synced_idx, payload.ValueList, payload.ScadaReadTimeUnixMs)
 
     #####################################################################
     # State Machine related
@@ -1257,12 +1344,17 @@ class Scada(ScadaInterface, Proactor):
 
     def send_report(self):
         report = self._data.make_report(self._last_report_second)
-        self._data.reports_to_store[report.Id] = report
-        self.generate_event(ReportEvent(Report=report))  # noqa
+        self._data.reports_to_store.add(report)
+        if self.report_encoding == "json":
+            self.generate_event(ReportEvent(Report=report))  # noqa
+        else:
+            self.generate_event(CompactReportEvent(Report=encode_report(report, self.report_encoding)))  # noqa
         self._data.flush_recent_readings()
 
     def send_snap(self):
         snapshot = self._data.make_snapshot()
+        if self.snapshot_tracker is not None:
+            snapshot = self.snapshot_tracker.next(snapshot)
         self._send_to(self.atn, snapshot)
         if self.settings.admin.enabled:
             self._send_to(self.admin, snapshot)
@@ -1291,28 +1383,68 @@ class Scada(ScadaInterface, Proactor):
     # Basic plumbing - mostly about messages
     #####################################################################
 
+    def add_communicator(self, communicator: CommunicatorInterface) -> None:
+        super().add_communicator(communicator)
+        self._routes = None
+
+    @property
+    def routes(self) -> Dict[str, ScadaRoute]:
+        if self._routes is None:
+            self._routes = {node.Name: self._make_route(node) for node in self._layout.nodes.values()}
+        return self._routes
+
+    def route_counts(self) -> Dict[str, int]:
+        """Messages sent by _send_to, per destination node"""
+        return {name: route.sent for name, route in self.routes.items() if route.sent}
+
+    def _make_route(self, node: ShNode) -> ScadaRoute:
+        # HACK FOR nodes whose 'actors' are handled by their parent's communicator
+        communicator_name = H0N.home_alone if node.Name == H0N.home_alone_normal else node.Name
+        communicator = self._communicators.get(communicator_name)
+        if node.Name == self.name:
+            return ScadaRoute(ScadaRouteKind.SELF, node)
+        if communicator is not None:
+            return ScadaRoute(ScadaRouteKind.COMMUNICATOR, node, communicator)
+        if node.Name == H0N.admin:
+            return ScadaRoute(ScadaRouteKind.ADMIN, node)
+        if node.Name == H0N.atn:
+            return ScadaRoute(ScadaRouteKind.ATN, node)
+        return ScadaRoute(ScadaRouteKind.LOCAL_MQTT, node)
+
+    @staticmethod
+    def _local_message(src: str, dst: str, payload: Any) -> Message:
+        """Message(Src=src, Dst=dst, Payload=payload) for a communicator of this process,
+        without validating the payload again"""
+        type_name = getattr(payload, "TypeName", None)
+        if not isinstance(type_name, str):
+            return Message(Src=src, Dst=dst, Payload=payload)
+        return Message.model_construct(
+            Header=Header.model_construct(Src=src, Dst=dst, MessageType=type_name),
+            Payload=payload,
+        )
+
     def _send_to(self, to_node: ShNode, payload: Any, from_node: ShNode = None) -> None:
         """Use this for primary_scada to send messages"""
         if to_node is None:
             return
         if from_node is None:
             from_node = self.node
+        route = self.routes.get(to_node.Name)
+        if route is None:
+            route = self._make_route(to_node)
+        route.sent += 1
 
-        # HACK FOR nodes whose 'actors' are handled by their parent's communicator
-        communicator_by_name = {to_node.Name: to_node.Name}
-        communicator_by_name[H0N.home_alone_normal] = H0N.home_alone
-    
         # if the message is meant for primary_scada, process here
-        if to_node.name == self.name:
+        if route.kind == ScadaRouteKind.SELF:
             self.process_scada_message(from_node, payload)
         
         # if its meant for an actor spawned by primary_scada (aka communicator)
         # call its process_message
-        elif communicator_by_name[to_node.Name] in set(self._communicators.keys()):
-            self.get_communicator(communicator_by_name[to_node.Name]).process_message(
-                Message(Src=from_node.Name, Dst=to_node.Name, Payload=payload)
+        elif route.kind == ScadaRouteKind.COMMUNICATOR:
+            route.communicator.process_message(
+                self._local_message(from_node.Name, to_node.Name, payload)
             )
-        elif to_node.Name == H0N.admin:
+        elif route.kind == ScadaRouteKind.ADMIN:
             self._links.publish_message(
                 link_name=self.ADMIN_MQTT,
                 message=Message(
@@ -1320,7 +1452,7 @@ class Scada(ScadaInterface, Proactor):
                 ),
                 qos=QOS.AtMostOnce,
             )
-        elif to_node.Name == H0N.atn:
+        elif route.kind == ScadaRouteKind.ATN:
             #self._links.publish_upstream(payload)
             self._links.publish_message(
                 link_name=self.ATN_MQTT,
@@ -1343,10 +1475,13 @@ class Scada(ScadaInterface, Proactor):
         Replaces proactor _derived_process_message. Either routes to the appropriate
         node or - if message is intended for primary scada - sends on to _process_my_message
         """
-        from_node = self._layout.node(message.Header.Src, None)
-        to_node = self._layout.node(message.Header.Dst, None)
+        routes = self.routes
+        from_route = routes.get(message.Header.Src)
+        to_route = routes.get(message.Header.Dst)
+        from_node = from_route.node if from_route is not None else None
+        to_node = to_route.node if to_route is not None else None
 
-        if to_node is not None and to_node != self.node:
+        if to_node is not None and to_route.kind != ScadaRouteKind.SELF:
             try:
                 self._send_to(to_node, message.Payload, from_node)
             except Exception as e:
@@ -1,7 +1,8 @@
 import time
 import uuid
-from typing import Any, Dict, List, Optional, cast
+from typing import Any, Dict, List, Optional, Sequence, cast
 import pytz
+from actors.channel_bus import ChannelCallback, ChannelView
 from actors.scada_data import ScadaData
 from data_classes.house_0_layout import House0Layout
 from data_classes.house_0_names import H0N, House0RelayIdx
@@ -49,6 +50,17 @@ class ScadaActor(Actor):
     def data(self) -> ScadaData:
         return self._services.data
 
+    def subscribe_channels(
+        self,
+        channel_names: Sequence[str],
+        callback: Optional[ChannelCallback] = None,
+        min_interval_s: float = 0,
+    ) -> ChannelView:
+        """The latest values of channel_names, pushed by the Scada as they are ingested.
+        callback, if any, gets the names of the channels that changed, at most once
+        every min_interval_s."""
+        return self.data.subscribe_channels(self.name, channel_names, callback, min_interval_s)
+
     @property
     def atn(self) -> ShNode:
         return self.layout.node(H0N.atn)
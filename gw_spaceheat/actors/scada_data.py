@@ -1,11 +1,17 @@
 """Container for data Scada uses in building status and snapshot messages, separated from Scada for clarity,
 not necessarily re-use. """
 
+import heapq
+import math
 import time
 import uuid
-from typing import Dict, List, Optional, Union
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, Union
 
+from actors.channel_bus import ChannelBus, ChannelCallback, ChannelView
 from actors.config import ScadaSettings
+from actors.report_store import ReportStore
 from gwproto.data_classes.data_channel import DataChannel
 from gwproto.data_classes.synth_channel import SynthChannel
 from gwproto.data_classes.hardware_layout import HardwareLayout
@@ -18,22 +24,130 @@ from gwproto.messages import (
 )
 
 from named_types import Ha1Params, SingleMachineState, SnapshotSpaceheat
+
+
+class ChannelBuffer:
+    """Readings of one channel for the current report slot.
+
+    Values and read times are kept in preallocated int64 arrays. Appending writes in
+    place and doubles the capacity when full; clear() only resets the length, so the
+    memory is reused from one report to the next instead of becoming garbage.
+    """
+    __slots__ = ("values", "unix_ms", "size", "total", "grows")
+    INITIAL_CAPACITY = 16
+    ITEM_SIZE = array("q").itemsize
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.values = array("q", bytes(capacity * self.ITEM_SIZE))
+        self.unix_ms = array("q", bytes(capacity * self.ITEM_SIZE))
+        self.size = 0
+        self.total = 0
+        self.grows = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def capacity(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        return 2 * self.capacity * self.ITEM_SIZE
+
+    def _reserve(self, size: int) -> None:
+        capacity = self.capacity
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        padding = bytes((capacity - self.capacity) * self.ITEM_SIZE)
+        self.values.frombytes(padding)
+        self.unix_ms.frombytes(padding)
+        self.grows += 1
+
+    def append(self, value: int, unix_ms: int) -> None:
+        if self.size == len(self.values):
+            self._reserve(self.size + 1)
+        self.values[self.size] = value
+        self.unix_ms[self.size] = unix_ms
+        self.size += 1
+        self.total += 1
+
+    def extend(self, values: List[int], unix_ms: List[int]) -> None:
+        n = len(values)
+        if n != len(unix_ms):
+            raise ValueError(f"Got {n} values but {len(unix_ms)} read times")
+        end = self.size + n
+        if end > len(self.values):
+            self._reserve(end)
+        self.values[self.size:end] = array("q", values)
+        self.unix_ms[self.size:end] = array("q", unix_ms)
+        self.size = end
+        self.total += n
+
+    def clear(self) -> None:
+        self.size = 0
+
+    def value_list(self) -> List[int]:
+        with memoryview(self.values) as m:
+            return m[:self.size].tolist()
+
+    def unix_ms_list(self) -> List[int]:
+        with memoryview(self.unix_ms) as m:
+            return m[:self.size].tolist()
+
+
+class ChannelValuesView(Mapping):
+    """Read-only channel name -> value view of a store indexed by channel idx.
+
+    Behaves like the dict it replaces: every channel is a key, and channels without
+    a reading map to None.
+    """
+    __slots__ = ("_idx", "_values")
+
+    def __init__(self, channel_idx: Dict[str, int], values: List[Optional[int]]):
+        self._idx = channel_idx
+        self._values = values
+
+    def __getitem__(self, channel_name: str) -> Optional[int]:
+        return self._values[self._idx[channel_name]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._idx)
+
+    def __len__(self) -> int:
+        return len(self._idx)
+
+
+@dataclass
+class ChannelBufferStats:
+    readings_in_slot: int = 0
+    readings_total: int = 0
+    readings_per_second: float = 0.0  # over the last flushed slot
+    allocated_bytes: int = 0
+    max_capacity: int = 0
+    grows: int = 0
+
+
 class ScadaData:
-    reports_to_store: Dict[str, Report]
+    NYQUIST = 2.1  # https://en.wikipedia.org/wiki/Nyquist_frequency
+    reports_to_store: ReportStore
     recent_machine_states: Dict[str, MachineStates] # key is machine handle
     latest_machine_state: Dict[str, SingleMachineState] # key is the node name
-    latest_channel_unix_ms: Dict[str, int]
-    latest_channel_values: Dict[str, int]
-    recent_channel_values: Dict[str, List]
-    recent_channel_unix_ms: Dict[str, List]
+    latest_channel_unix_ms: "ChannelValuesView"
+    latest_channel_values: "ChannelValuesView"
+    recent_readings: Dict[str, ChannelBuffer]
     recent_fsm_reports: Dict[str, FsmFullReport]
     settings: ScadaSettings
     layout: HardwareLayout
     ha1_params: Ha1Params
 
     def __init__(self, settings: ScadaSettings, hardware_layout: HardwareLayout):
-        self.reports_to_store: Dict[str:Report] = {}
-        self.seconds_by_channel: Dict[str:int] = {}
+        self.reports_to_store = ReportStore(
+            settings.paths.data_dir / "reports" if settings.report_store.spill_to_disk else None,
+            settings.report_store,
+        )
 
         self.settings = settings
         self.layout = hardware_layout
@@ -57,19 +171,42 @@ class ScadaData:
         self.my_channels: Union[DataChannel, SynthChannel] = self.my_data_channels + self.my_synth_channels
         self.recent_machine_states = {}
         self.latest_machine_state = {}
-        self.latest_channel_values: Dict[str, int] = {  # noqa
-            ch.Name: None for ch in self.my_channels
-        }
-        self.latest_channel_unix_ms: Dict[str, int] = {  # noqa
-            ch.Name: None for ch in self.my_channels
-        }
-        self.recent_channel_values: Dict[str, List] = {
-            ch.Name: [] for ch in self.my_channels
-        }
-        self.recent_channel_unix_ms: Dict[str, List] = {
-            ch.Name: [] for ch in self.my_channels
+        # Channels are addressed by their index in my_channels; name lookups go
+        # through channel_idx once, when a message or layout is first seen.
+        self.channel_idx: Dict[str, int] = {ch.Name: i for i, ch in enumerate(self.my_channels)}
+        num_channels = len(self.my_channels)
+        self._latest_value: List[Optional[int]] = [None] * num_channels
+        self._latest_unix_ms: List[Optional[int]] = [None] * num_channels
+        self.latest_channel_values = ChannelValuesView(self.channel_idx, self._latest_value)
+        self.latest_channel_unix_ms = ChannelValuesView(self.channel_idx, self._latest_unix_ms)
+        self.channel_bus = ChannelBus(self.channel_idx)
+        self.recent_readings: Dict[str, ChannelBuffer] = {
+            ch.Name: ChannelBuffer() for ch in self.my_channels
         }
+        self.recent_buffers: List[ChannelBuffer] = list(self.recent_readings.values())
+        self.seconds_by_channel: Dict[str, int] = self.get_seconds_by_channel()
+        # Snapshot state, maintained incrementally as readings arrive:
+        #   _flatline_seconds: seconds after a reading at which the channel flatlines
+        #       (inf when there is no capture period)
+        #   _flatline_deadline: unix s after which the channel is flatlined, nan if none
+        #   _flatline_heap: (deadline, channel idx), at most one pending entry per channel,
+        #       re-pushed with the current deadline when popped early
+        #   _pending_deadline: deadline of the pending heap entry of each channel, nan if none
+        #   _changed: channels whose latest value changed since the last snapshot
+        #   _snapshot_readings: the latest live reading of each channel, in my_channels order
+        self._flatline_seconds: List[float] = [
+            self.seconds_by_channel.get(ch.Name, math.inf) * self.NYQUIST for ch in self.my_channels
+        ]
+        self._flatline_deadline: List[float] = [math.nan] * num_channels
+        self._pending_deadline: List[float] = [math.nan] * num_channels
+        self._flatline_heap: List[Tuple[float, int]] = []
+        self._changed: Set[int] = set()
+        self._snapshot_readings: List[Optional[SingleReading]] = [None] * num_channels
+        self._latest_reading_list: List[SingleReading] = []
+        self._latest_reading_list_idx: Dict[int, int] = {}
         self.recent_fsm_reports = {}
+        self._slot_start_s = time.time()
+        self._last_slot_readings_per_second = 0.0
         self.flush_recent_readings()
 
     def get_my_data_channels(self) -> List[DataChannel]:
@@ -78,33 +215,124 @@ class ScadaData:
     def get_my_synth_channels(self) -> List[SynthChannel]:
         return list(self.layout.synth_channels.values())
 
+    def get_seconds_by_channel(self) -> Dict[str, int]:
+        seconds_by_channel = {}
+        for c in self.layout.components.values():
+            for config in c.gt.ConfigList:
+                seconds_by_channel[config.ChannelName] = config.CapturePeriodS
+        for s in self.my_synth_channels:
+            seconds_by_channel[s.Name] = s.SyncReportMinutes * 60
+        return seconds_by_channel
+
+    def _push_deadline(self, idx: int, deadline: float) -> None:
+        self._pending_deadline[idx] = deadline
+        heapq.heappush(self._flatline_heap, (deadline, idx))
+
+    def subscribe_channels(
+        self,
+        subscriber_name: str,
+        channel_names: Sequence[str],
+        callback: Optional[ChannelCallback] = None,
+        min_interval_s: float = 0,
+    ) -> ChannelView:
+        """A view of the latest values of channel_names, kept up to date as readings arrive"""
+        return self.channel_bus.subscribe(
+            ChannelView(subscriber_name, channel_names, callback, min_interval_s),
+            self._latest_value,
+            self._latest_unix_ms,
+        )
+
+    def update_latest(self, channel_name: str, value: int, unix_ms: int) -> None:
+        self.update_latest_idx(self.channel_idx[channel_name], value, unix_ms)
+
+    def update_latest_idx(self, idx: int, value: int, unix_ms: int) -> None:
+        """Record the latest reading of a channel and push its new flatline deadline"""
+        self._latest_value[idx] = value
+        self._latest_unix_ms[idx] = unix_ms
+        self.channel_bus.publish(idx, value, unix_ms)
+        self._changed.add(idx)
+        deadline = unix_ms / 1000 + self._flatline_seconds[idx]
+        self._flatline_deadline[idx] = deadline
+        if not self._pending_deadline[idx] <= deadline:
+            self._push_deadline(idx, deadline)
+
+    def add_synced_readings(
+            self, idxs: List[int], buffers: List[ChannelBuffer], values: List[int], unix_ms: int
+    ) -> None:
+        """Record readings taken at the same time for the channels idxs (whose recent buffers are buffers)"""
+        latest_value = self._latest_value
+        latest_unix_ms = self._latest_unix_ms
+        flatline_seconds = self._flatline_seconds
+        flatline_deadline = self._flatline_deadline
+        pending_deadline = self._pending_deadline
+        publish = self.channel_bus.publish
+        read_s = unix_ms / 1000
+        for idx, buffer, value in zip(idxs, buffers, values):
+            buffer.append(value, unix_ms)
+            latest_value[idx] = value
+            latest_unix_ms[idx] = unix_ms
+            publish(idx, value, unix_ms)
+            deadline = read_s + flatline_seconds[idx]
+            flatline_deadline[idx] = deadline
+            if not pending_deadline[idx] <= deadline:
+                self._push_deadline(idx, deadline)
+        self._changed.update(idxs)
+
     def flush_channel_from_latest(self, channel_name: str) -> None:
         """
-        A data channel has flatlined; set its dict value to None
+        A data channel has flatlined; set its value to None
         """
-        if channel_name in self.latest_channel_values and self.latest_channel_values[channel_name] is not None:
+        idx = self.channel_idx.get(channel_name)
+        if idx is None:
+            return
+        if self._latest_value[idx] is not None:
             print(f"Channel {channel_name} flatlined - removing from snapshots!")
-        self.latest_channel_values[channel_name] = None
-        self.latest_channel_unix_ms[channel_name] = None
+        self._latest_value[idx] = None
+        self._latest_unix_ms[idx] = None
+        self.channel_bus.publish(idx, None, None)
+        self._flatline_deadline[idx] = math.nan
+        self._changed.add(idx)
+
+    @property
+    def recent_channel_values(self) -> Dict[str, List[int]]:
+        return {name: buffer.value_list() for name, buffer in self.recent_readings.items()}
+
+    @property
+    def recent_channel_unix_ms(self) -> Dict[str, List[int]]:
+        return {name: buffer.unix_ms_list() for name, buffer in self.recent_readings.items()}
 
     def flush_recent_readings(self):
-        self.recent_channel_values = {ch.Name: [] for ch in self.my_channels}
-        self.recent_channel_unix_ms = {ch.Name: [] for ch in self.my_channels}
+        now = time.time()
+        elapsed = now - self._slot_start_s
+        if elapsed > 0:
+            readings = sum(len(buffer) for buffer in self.recent_readings.values())
+            self._last_slot_readings_per_second = readings / elapsed
+        self._slot_start_s = now
+        for buffer in self.recent_readings.values():
+            buffer.clear()
         self.recent_fsm_reports = {}
         self.recent_machine_states = {}
 
+    def channel_buffer_stats(self) -> ChannelBufferStats:
+        stats = ChannelBufferStats(readings_per_second=self._last_slot_readings_per_second)
+        for buffer in self.recent_readings.values():
+            stats.readings_in_slot += len(buffer)
+            stats.readings_total += buffer.total
+            stats.allocated_bytes += buffer.nbytes
+            stats.max_capacity = max(stats.max_capacity, buffer.capacity)
+            stats.grows += buffer.grows
+        return stats
+
     def make_channel_readings(self, ch: DataChannel) -> Optional[ChannelReadings]:
-        if ch in self.my_channels:
-            if len(self.recent_channel_values[ch.Name]) == 0:
-                return None
-            return ChannelReadings(
-                ChannelName=ch.Name,
-                ChannelId=ch.Id,
-                ValueList=self.recent_channel_values[ch.Name],
-                ScadaReadTimeUnixMsList=self.recent_channel_unix_ms[ch.Name],
-            )
-        else:
+        buffer = self.recent_readings.get(ch.Name)
+        if not buffer:
             return None
+        return ChannelReadings(
+            ChannelName=ch.Name,
+            ChannelId=ch.Id,
+            ValueList=buffer.value_list(),
+            ScadaReadTimeUnixMsList=buffer.unix_ms_list(),
+        )
 
     def make_report(self, slot_start_seconds: int) -> Report:
         channel_reading_list = []
@@ -127,44 +355,71 @@ class ScadaData:
         )
 
     def capture_seconds(self, ch: Union[DataChannel, SynthChannel]) -> int:
-        if ch.Name not in self.seconds_by_channel:
-            self.seconds_by_channel = {}
-            components = [c.gt for c in self.layout.components.values()]
-            for c in components:
-                for config in c.ConfigList:
-                    self.seconds_by_channel[config.ChannelName] = config.CapturePeriodS
-            for s in self.my_synth_channels:
-                self.seconds_by_channel[s.Name] = s.SyncReportMinutes * 60
         return self.seconds_by_channel[ch.Name]
 
     def flatlined(self, ch: Union[DataChannel, SynthChannel]) -> bool:
         if self.latest_channel_unix_ms[ch.Name] is None:
             return True
-        # nyquist
-        nyquist = 2.1  # https://en.wikipedia.org/wiki/Nyquist_frequency
         if (
             time.time() - (self.latest_channel_unix_ms[ch.Name] / 1000)
-            > self.capture_seconds(ch) * nyquist
+            > self.capture_seconds(ch) * self.NYQUIST
         ):
             return True
         return False
 
-    def make_snapshot(self) -> SnapshotSpaceheat:
-        latest_reading_list = []
+    def _set_snapshot_reading(self, idx: int, reading: Optional[SingleReading]) -> None:
+        was_live = self._snapshot_readings[idx] is not None
+        self._snapshot_readings[idx] = reading
+        if reading is not None and was_live:
+            self._latest_reading_list[self._latest_reading_list_idx[idx]] = reading
+        elif reading is not None or was_live:
+            # membership changed: rebuild the list and positions (rare)
+            live = [i for i, r in enumerate(self._snapshot_readings) if r is not None]
+            self._latest_reading_list = [self._snapshot_readings[i] for i in live]
+            self._latest_reading_list_idx = {i: pos for pos, i in enumerate(live)}
 
-        for ch in self.my_channels:
-            if not self.flatlined(ch):
-                latest_reading_list.append(
+    def latest_reading_list(self) -> List[SingleReading]:
+        """Latest readings of the channels that are not flatlined.
+
+        Only the channels whose deadline passed or that got a new reading since the last
+        call are touched.
+        """
+        now = time.time()
+        heap = self._flatline_heap
+        while heap and heap[0][0] < now:
+            deadline, idx = heapq.heappop(heap)
+            if self._pending_deadline[idx] != deadline:
+                continue
+            self._pending_deadline[idx] = math.nan
+            current = self._flatline_deadline[idx]
+            if math.isnan(current):
+                continue
+            if current < now:
+                self._flatline_deadline[idx] = math.nan
+                self._changed.discard(idx)
+                self._set_snapshot_reading(idx, None)
+            else:
+                self._push_deadline(idx, current)
+        for idx in self._changed:
+            if not self._flatline_deadline[idx] >= now:
+                self._set_snapshot_reading(idx, None)
+            else:
+                self._set_snapshot_reading(
+                    idx,
                     SingleReading(
-                        ChannelName=ch.Name,
-                        Value=self.latest_channel_values[ch.Name],
-                        ScadaReadTimeUnixMs=self.latest_channel_unix_ms[ch.Name],
+                        ChannelName=self.my_channels[idx].Name,
+                        Value=self._latest_value[idx],
+                        ScadaReadTimeUnixMs=self._latest_unix_ms[idx],
                     )
                 )
+        self._changed.clear()
+        return self._latest_reading_list
+
+    def make_snapshot(self) -> SnapshotSpaceheat:
         return SnapshotSpaceheat(
             FromGNodeAlias=self.layout.scada_g_node_alias,
             FromGNodeInstanceId=self.layout.scada_g_node_id,
             SnapshotTimeUnixMs=int(time.time() * 1000),
-            LatestReadingList=latest_reading_list,
+            LatestReadingList=self.latest_reading_list(),
             LatestStateList=list(self.latest_machine_state.values()),
         )
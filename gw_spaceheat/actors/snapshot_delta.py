@@ -0,0 +1,118 @@
+"""Delta snapshots between periodic keyframes.
+
+With snapshot_keyframe_every set, the Scada sends a full SnapshotSpaceheat (a keyframe) every
+snapshot_keyframe_every snapshots, and a SnapshotDelta in between: SnapshotDeltaTracker
+compares each snapshot with what was last sent. SnapshotAssembler rebuilds the full snapshot
+on the receiving side (the Atn and the admin client), and asks for a keyframe when a delta
+does not follow the snapshot it holds.
+"""
+from typing import Callable, Dict, List, Optional, Union
+
+from gwproto.enums import TelemetryName
+from gwproto.named_types.single_reading import SingleReading
+
+from named_types import SingleMachineState, SnapshotDelta, SnapshotSpaceheat
+
+# Changes of at most this much are not sent between keyframes, unless set per channel
+# in snapshot_delta_thresholds
+DEFAULT_THRESHOLD_BY_TELEMETRY: Dict[TelemetryName, int] = {
+    TelemetryName.WaterTempCTimes1000: 50,
+    TelemetryName.AirTempCTimes1000: 50,
+    TelemetryName.WaterTempFTimes1000: 90,
+    TelemetryName.AirTempFTimes1000: 90,
+}
+
+
+class SnapshotDeltaTracker:
+    def __init__(self, keyframe_every: int, thresholds: Optional[Dict[str, int]] = None):
+        self.keyframe_every = keyframe_every
+        self.thresholds = thresholds or {}
+        self.sent_readings: Dict[str, SingleReading] = {}
+        self.sent_states: Dict[str, SingleMachineState] = {}
+        self.keyframe_time_ms: Optional[int] = None
+        self.sequence = 0
+
+    def request_keyframe(self) -> None:
+        self.keyframe_time_ms = None
+
+    def next(self, snapshot: SnapshotSpaceheat) -> Union[SnapshotSpaceheat, SnapshotDelta]:
+        """The snapshot itself if a keyframe is due, otherwise its changes since the
+        previous one"""
+        if self.keyframe_time_ms is None or self.sequence + 1 >= self.keyframe_every:
+            self.sent_readings = {r.ChannelName: r for r in snapshot.LatestReadingList}
+            self.sent_states = {s.MachineHandle: s for s in snapshot.LatestStateList}
+            self.keyframe_time_ms = snapshot.SnapshotTimeUnixMs
+            self.sequence = 0
+            return snapshot
+        changed: List[SingleReading] = []
+        live = set()
+        for reading in snapshot.LatestReadingList:
+            live.add(reading.ChannelName)
+            sent = self.sent_readings.get(reading.ChannelName)
+            if sent is None or abs(reading.Value - sent.Value) > self.thresholds.get(reading.ChannelName, 0):
+                changed.append(reading)
+                self.sent_readings[reading.ChannelName] = reading
+        flatlined = [name for name in self.sent_readings if name not in live]
+        for name in flatlined:
+            del self.sent_readings[name]
+        changed_states = [
+            state for state in snapshot.LatestStateList if self.sent_states.get(state.MachineHandle) != state
+        ]
+        for state in changed_states:
+            self.sent_states[state.MachineHandle] = state
+        self.sequence += 1
+        return SnapshotDelta(
+            FromGNodeAlias=snapshot.FromGNodeAlias,
+            FromGNodeInstanceId=snapshot.FromGNodeInstanceId,
+            SnapshotTimeUnixMs=snapshot.SnapshotTimeUnixMs,
+            KeyframeTimeUnixMs=self.keyframe_time_ms,
+            Sequence=self.sequence,
+            ChangedReadingList=changed,
+            FlatlinedChannelList=flatlined,
+            ChangedStateList=changed_states,
+        )
+
+
+class SnapshotAssembler:
+    def __init__(self, request_keyframe: Callable[[], None]):
+        self.request_keyframe = request_keyframe
+        self.snapshot: Optional[SnapshotSpaceheat] = None
+        self.readings: Dict[str, SingleReading] = {}
+        self.states: Dict[str, SingleMachineState] = {}
+        self.keyframe_time_ms: Optional[int] = None
+        self.sequence = 0
+        self.awaiting_keyframe = False
+        self.gaps = 0
+
+    def process(self, snap: Union[SnapshotSpaceheat, SnapshotDelta]) -> Optional[SnapshotSpaceheat]:
+        """The full snapshot after snap, or None if snap is a delta that does not follow
+        the snapshot held (a keyframe is then requested, once)"""
+        if isinstance(snap, SnapshotSpaceheat):
+            self.readings = {r.ChannelName: r for r in snap.LatestReadingList}
+            self.states = {s.MachineHandle: s for s in snap.LatestStateList}
+            self.keyframe_time_ms = snap.SnapshotTimeUnixMs
+            self.sequence = 0
+            self.awaiting_keyframe = False
+            self.snapshot = snap
+            return snap
+        if snap.KeyframeTimeUnixMs != self.keyframe_time_ms or snap.Sequence != self.sequence + 1:
+            self.gaps += 1
+            if not self.awaiting_keyframe:
+                self.awaiting_keyframe = True
+                self.request_keyframe()
+            return None
+        for reading in snap.ChangedReadingList:
+            self.readings[reading.ChannelName] = reading
+        for name in snap.FlatlinedChannelList:
+            self.readings.pop(name, None)
+        for state in snap.ChangedStateList:
+            self.states[state.MachineHandle] = state
+        self.sequence = snap.Sequence
+        self.snapshot = SnapshotSpaceheat(
+            FromGNodeAlias=snap.FromGNodeAlias,
+            FromGNodeInstanceId=snap.FromGNodeInstanceId,
+            SnapshotTimeUnixMs=snap.SnapshotTimeUnixMs,
+            LatestReadingList=list(self.readings.values()),
+            LatestStateList=list(self.states.values()),
+        )
+        return self.snapshot
@@ -93,6 +93,9 @@ class StratBoss(ScadaActor):
             send_event=False
         )
         
+        self.hp_channels = self.subscribe_channels(
+            [H0CN.hp_ewt, H0CN.hp_lwt, H0CN.hp_odu_pwr, H0CN.hp_idu_pwr]
+        )
         self.idu_w_readings = deque(maxlen=15)
         self.odu_w_readings = deque(maxlen=15)
         self.hp_power_w: float = 0
@@ -488,24 +491,20 @@ class StratBoss(ScadaActor):
             return False
         assert ewt_channel.TelemetryName == TelemetryName.WaterTempCTimes1000
         assert lwt_channel.TelemetryName == TelemetryName.WaterTempCTimes1000
-        if ewt_channel.Name not in self.data.latest_channel_values:
+        if ewt_channel.Name not in self.hp_channels:
             return False
-        if lwt_channel.Name not in self.data.latest_channel_values:
+        if lwt_channel.Name not in self.hp_channels:
             return False
-        self.ewt_f = c_to_f(self.data.latest_channel_values[ewt_channel.Name] / 1000)
-        self.lwt_f = c_to_f(self.data.latest_channel_values[lwt_channel.Name] / 1000)
+        self.ewt_f = c_to_f(self.hp_channels[ewt_channel.Name] / 1000)
+        self.lwt_f = c_to_f(self.hp_channels[lwt_channel.Name] / 1000)
         return True
 
     def update_power_readings(self) -> bool:
         odu_pwr_channel = self.layout.channel(H0CN.hp_odu_pwr)
         idu_pwr_channel = self.layout.channel(H0CN.hp_idu_pwr)
         assert odu_pwr_channel.TelemetryName == TelemetryName.PowerW
-        if odu_pwr_channel.Name not in self.data.latest_channel_values:
-            return False
-        if idu_pwr_channel.Name not in self.data.latest_channel_values:
-            return False
-        odu_pwr = self.data.latest_channel_values[odu_pwr_channel.Name]
-        idu_pwr = self.data.latest_channel_values[idu_pwr_channel.Name]
+        odu_pwr = self.hp_channels.get(odu_pwr_channel.Name)
+        idu_pwr = self.hp_channels.get(idu_pwr_channel.Name)
         if (odu_pwr is None) or (idu_pwr is None):
             return False 
         self.hp_power_w = odu_pwr + idu_pwr
@@ -0,0 +1,142 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+SUPER_GRAPH_FILE = "super_graph.bin"
+SUPER_GRAPH_JSON_FILE = "super_graph.json"
+
+
+class SuperGraph():
+    """Node table and transition matrix of the storage super graph.
+
+    The binary file is laid out as (little-endian):
+        header          4s magic, uint32 version, uint32 num_store_heat_in, uint32 num_nodes
+        store_heat_in   float64[num_store_heat_in]
+        transitions     int32[num_store_heat_in, num_nodes], index of the next node
+        nodes           int16[num_nodes, 5], (top, thermocline1, middle, thermocline2, bottom)
+
+    Files are opened with np.memmap so only the rows that are used get paged in.
+    """
+    MAGIC = b"GWSG"
+    VERSION = 1
+    HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u4"), ("num_store_heat_in", "<u4"), ("num_nodes", "<u4")])
+    STORE_HEAT_IN_DTYPE = np.dtype("<f8")
+    TRANSITIONS_DTYPE = np.dtype("<i4")
+    NODES_DTYPE = np.dtype("<i2")
+
+    def __init__(self, store_heat_in: np.ndarray, transitions: np.ndarray, nodes: np.ndarray):
+        if transitions.shape != (len(store_heat_in), len(nodes)):
+            raise ValueError(
+                f"Transitions shape {transitions.shape} does not match "
+                f"{len(store_heat_in)} store_heat_in steps and {len(nodes)} nodes"
+            )
+        self.store_heat_in = store_heat_in
+        self.transitions = transitions
+        self.nodes = nodes
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.nodes)
+
+    def store_heat_in_idx(self, store_heat_in: np.ndarray) -> np.ndarray:
+        """Index of the closest store_heat_in step, for an array of store_heat_in values.
+
+        The steps are evenly spaced, so the closest step is found in O(1) with
+        round((x - x0)/step). The neighbouring steps are then compared as well, so that
+        float rounding and ties resolve exactly like argmin(abs(steps - x)).
+        """
+        steps = self.store_heat_in
+        last = len(steps) - 1
+        if last == 0:
+            return np.zeros(len(store_heat_in), dtype=np.intp)
+        x0 = float(steps[0])
+        step = (float(steps[-1]) - x0) / last
+        guess = np.clip(np.rint((store_heat_in - x0) / step).astype(np.intp), 0, last)
+        candidates = np.clip(guess[:, None] + np.array([-1, 0, 1]), 0, last)
+        distances = np.abs(np.asarray(steps)[candidates] - store_heat_in[:, None])
+        return candidates[np.arange(len(candidates)), distances.argmin(axis=1)]
+
+    def node_tuples(self) -> List[Tuple[int, int, int, int, int]]:
+        """(top, thermocline1, middle, thermocline2, bottom) for each node, as python ints"""
+        return [tuple(x) for x in self.nodes.tolist()]
+
+    def node_str(self, idx: int) -> str:
+        t, th1, m, th2, b = self.nodes[idx].tolist()
+        return f"{t}({th1}){m}({th2}){b}"
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = SUPER_GRAPH_FILE) -> "SuperGraph":
+        header = np.fromfile(path, dtype=cls.HEADER_DTYPE, count=1)
+        if len(header) != 1 or header["magic"][0] != cls.MAGIC:
+            raise ValueError(f"{path} is not a super graph file")
+        if header["version"][0] != cls.VERSION:
+            raise ValueError(f"Unsupported super graph version {header['version'][0]} in {path}")
+        num_store_heat_in = int(header["num_store_heat_in"][0])
+        num_nodes = int(header["num_nodes"][0])
+        offset = cls.HEADER_DTYPE.itemsize
+        store_heat_in = np.memmap(
+            path, dtype=cls.STORE_HEAT_IN_DTYPE, mode="r", offset=offset, shape=(num_store_heat_in,)
+        )
+        offset += store_heat_in.nbytes
+        transitions = np.memmap(
+            path, dtype=cls.TRANSITIONS_DTYPE, mode="r", offset=offset, shape=(num_store_heat_in, num_nodes)
+        )
+        offset += transitions.nbytes
+        nodes = np.memmap(
+            path, dtype=cls.NODES_DTYPE, mode="r", offset=offset, shape=(num_nodes, 5)
+        )
+        return cls(store_heat_in, transitions, nodes)
+
+    def save(self, path: Union[str, Path] = SUPER_GRAPH_FILE) -> None:
+        header = np.array(
+            [(self.MAGIC, self.VERSION, len(self.store_heat_in), self.num_nodes)], dtype=self.HEADER_DTYPE
+        )
+        with open(path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(np.ascontiguousarray(self.store_heat_in, dtype=self.STORE_HEAT_IN_DTYPE).tobytes())
+            f.write(np.ascontiguousarray(self.transitions, dtype=self.TRANSITIONS_DTYPE).tobytes())
+            f.write(np.ascontiguousarray(self.nodes, dtype=self.NODES_DTYPE).tobytes())
+
+    @classmethod
+    def from_json(cls, path: Union[str, Path] = SUPER_GRAPH_JSON_FILE) -> "SuperGraph":
+        with open(path, "r") as f:
+            super_graph: Dict[str, Dict[str, str]] = json.load(f)
+        return cls.from_dict(super_graph)
+
+    @classmethod
+    def from_dict(cls, super_graph: Dict[str, Dict[str, str]]) -> "SuperGraph":
+        """Convert the string-keyed super graph. The node order is that of the '0.0' entry."""
+        node_strs = list(super_graph["0.0"].keys())
+        node_idx = {node_str: i for i, node_str in enumerate(node_strs)}
+        store_heat_in = np.array([float(x) for x in super_graph.keys()], dtype=cls.STORE_HEAT_IN_DTYPE)
+        transitions = np.empty((len(store_heat_in), len(node_strs)), dtype=cls.TRANSITIONS_DTYPE)
+        for k, edges in enumerate(super_graph.values()):
+            transitions[k] = [node_idx[edges[node_str]] for node_str in node_strs]
+        nodes = np.array([read_node_str(x) for x in node_strs], dtype=cls.NODES_DTYPE)
+        return cls(store_heat_in, transitions, nodes)
+
+    def to_dict(self) -> Dict[str, Dict[str, str]]:
+        node_strs = [self.node_str(i) for i in range(self.num_nodes)]
+        return {
+            str(store_heat_in): {
+                node_strs[i]: node_strs[j] for i, j in enumerate(self.transitions[k].tolist())
+            }
+            for k, store_heat_in in enumerate(self.store_heat_in.tolist())
+        }
+
+
+def read_node_str(node_str: str) -> Tuple[int, int, int, int, int]:
+    parts = node_str.replace(')', '(').split('(')
+    top, thermocline1, middle, thermocline2, bottom = int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4])
+    return top, thermocline1, middle, thermocline2, bottom
+
+
+def convert_json_to_binary(
+        json_path: Union[str, Path] = SUPER_GRAPH_JSON_FILE,
+        binary_path: Union[str, Path] = SUPER_GRAPH_FILE
+) -> SuperGraph:
+    super_graph = SuperGraph.from_json(json_path)
+    super_graph.save(binary_path)
+    return super_graph
@@ -1,19 +1,41 @@
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+import contextlib
+import hashlib
+import io
 import json
+import multiprocessing
+import os
 import time
+from pathlib import Path
+import numpy as np
 from named_types import FloParamsHouse0
-from dijkstra_types import DParams, DNode, to_kelvin
+from .dijkstra_types import DParams, DNode, to_kelvin
+from .super_graph import SuperGraph, SUPER_GRAPH_FILE, SUPER_GRAPH_JSON_FILE
+
+SUPER_GRAPH_CHUNK_DIR = "super_graph_chunks"
 
 
 class SuperGraphGenerator():
+    SHARD_SIZE = 10
+
     def __init__(self, flo_params: FloParamsHouse0):
         self.params = DParams(flo_params)
 
-    def generate(self):
+    def generate(self, processes: int = 1, chunk_dir: Optional[Path] = None):
+        """Generate the super graph and save it to SUPER_GRAPH_FILE.
+
+        With processes > 1, the store_heat_in range is split in shards of SHARD_SIZE steps
+        that are generated by a process pool. Each shard is saved in its own file in
+        chunk_dir (SUPER_GRAPH_CHUNK_DIR by default) as soon as it is done, so an
+        interrupted run picks up where it stopped when it is started again.
+        """
         start_time = time.time()
         self.create_nodes()
-        self.create_edges()
-        self.save_to_json()
+        if processes > 1 or chunk_dir is not None:
+            self.create_edges_parallel(processes, Path(chunk_dir or SUPER_GRAPH_CHUNK_DIR))
+        else:
+            self.create_edges()
+        self.save_to_binary()
         print(f"\nGenerating SuperGraph took {int(time.time()-start_time)} seconds.")
 
     def create_nodes(self):
@@ -65,8 +87,7 @@ class SuperGraphGenerator():
                 total_nodes += 1     
         print(f"=> Created a total of {total_nodes} nodes")
 
-    def create_edges(self):
-        print("\nCreating edges...")
+    def get_store_heat_in_range(self) -> List[float]:
         max_hp_out = self.params.max_hp_elec_in * self.params.COP(oat=50)
         max_load = max_hp_out
         store_heat_in_range = [x/10 for x in range(-int(max_load*10), int(max_hp_out*10)+1)]
@@ -74,31 +95,125 @@ class SuperGraphGenerator():
             f"The store can receive heat in the "
             f"[{store_heat_in_range[0]}, {store_heat_in_range[-1]}] kWh range, with a 0.1 kWh step."
             )
-        
+        return store_heat_in_range
+
+    def get_storage_model(self) -> "StorageModel":
         allowed_temperatures = {
             'top': self.top_temps,
             'middle': self.middle_temps,
             'bottom': self.bottom_temps
         }
-        storage_model = StorageModel(self.params.flo_params, self.nodes, self.nodes_by, allowed_temperatures)
-        self.super_graph: Dict[str, Dict[str, str]] = {}
+        return StorageModel(self.params.flo_params, self.nodes, self.nodes_by, allowed_temperatures)
 
-        for store_heat_in in store_heat_in_range:
+    def get_transitions(self, storage_model: "StorageModel", store_heat_in_range: List[float]) -> np.ndarray:
+        node_idx = {node: i for i, node in enumerate(self.nodes)}
+        transitions = np.empty((len(store_heat_in_range), len(self.nodes)), dtype=SuperGraph.TRANSITIONS_DTYPE)
+        for k, store_heat_in in enumerate(store_heat_in_range):
             print(f"Generating edges for store_heat_in = {store_heat_in} kWh")
-            self.super_graph[str(store_heat_in)] = {}
-            for node in self.nodes:
-                self.super_graph[str(store_heat_in)][node.to_string()] = (
-                    storage_model.next_node(node, store_heat_in).to_string()
-                )
-        
+            for i, node in enumerate(self.nodes):
+                transitions[k, i] = node_idx[storage_model.next_node(node, store_heat_in)]
+        return transitions
+
+    def create_edges(self):
+        print("\nCreating edges...")
+        store_heat_in_range = self.get_store_heat_in_range()
+        transitions = self.get_transitions(self.get_storage_model(), store_heat_in_range)
+        self.set_super_graph(store_heat_in_range, transitions)
+
+    def create_edges_parallel(self, processes: int, chunk_dir: Path):
+        print(f"\nCreating edges with {processes} processes...")
+        store_heat_in_range = self.get_store_heat_in_range()
+        self.set_super_graph(
+            store_heat_in_range,
+            np.empty((len(store_heat_in_range), len(self.nodes)), dtype=SuperGraph.TRANSITIONS_DTYPE)
+        )
+        self.prepare_chunk_dir(chunk_dir)
+        shards = [
+            (start, min(start + self.SHARD_SIZE, len(store_heat_in_range)))
+            for start in range(0, len(store_heat_in_range), self.SHARD_SIZE)
+        ]
+        missing = [
+            (start, stop, store_heat_in_range[start:stop], str(self.chunk_path(chunk_dir, start, stop)))
+            for start, stop in shards
+            if not self.chunk_path(chunk_dir, start, stop).exists()
+        ]
+        print(f"=> {len(shards)-len(missing)} of {len(shards)} shards already generated in {chunk_dir}")
+        if missing:
+            with multiprocessing.Pool(
+                processes, initializer=_init_chunk_worker, initargs=(self.params.flo_params,)
+            ) as pool:
+                for i, (start, stop) in enumerate(pool.imap_unordered(_generate_chunk, missing)):
+                    print(
+                        f"Generated edges for store_heat_in = "
+                        f"{store_heat_in_range[start]} to {store_heat_in_range[stop-1]} kWh "
+                        f"({i+1}/{len(missing)})"
+                    )
+        for start, stop in shards:
+            self.super_graph.transitions[start:stop] = np.load(self.chunk_path(chunk_dir, start, stop))
+
+    def prepare_chunk_dir(self, chunk_dir: Path):
+        """Remove chunks left by a run on a different node table or store_heat_in range"""
+        fingerprint = hashlib.sha256(
+            self.super_graph.nodes.tobytes()
+            + self.super_graph.store_heat_in.tobytes()
+            + str((self.params.storage_volume, self.params.num_layers, self.SHARD_SIZE)).encode()
+        ).hexdigest()
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+        fingerprint_path = chunk_dir / "fingerprint"
+        if not fingerprint_path.exists() or fingerprint_path.read_text() != fingerprint:
+            for chunk in chunk_dir.glob("transitions.*.npy"):
+                chunk.unlink()
+            fingerprint_path.write_text(fingerprint)
+
+    @classmethod
+    def chunk_path(cls, chunk_dir: Path, start: int, stop: int) -> Path:
+        return chunk_dir / f"transitions.{start:06d}-{stop:06d}.npy"
+
+    def set_super_graph(self, store_heat_in_range: List[float], transitions: np.ndarray):
+        self.super_graph = SuperGraph(
+            store_heat_in=np.array(store_heat_in_range, dtype=SuperGraph.STORE_HEAT_IN_DTYPE),
+            transitions=transitions,
+            nodes=np.array(
+                [[n.top_temp, n.thermocline1, n.middle_temp, n.thermocline2, n.bottom_temp] for n in self.nodes],
+                dtype=SuperGraph.NODES_DTYPE,
+            ),
+        )
+
+    def save_to_binary(self):
+        print(f"\nSaving SuperGraph to {SUPER_GRAPH_FILE}...")
+        self.super_graph.save(SUPER_GRAPH_FILE)
+        print("Done.")
+
     def save_to_json(self):
         print("\nSaving SuperGraph to JSON...")
-        json_file_path = "super_graph.json"
-        with open(json_file_path, 'w') as f:
-            json.dump(self.super_graph, f)
+        with open(SUPER_GRAPH_JSON_FILE, 'w') as f:
+            json.dump(self.super_graph.to_dict(), f)
         print("Done.")
 
 
+_chunk_generator: Optional[SuperGraphGenerator] = None
+_chunk_storage_model: Optional["StorageModel"] = None
+
+
+def _init_chunk_worker(flo_params: FloParamsHouse0):
+    global _chunk_generator, _chunk_storage_model
+    with contextlib.redirect_stdout(io.StringIO()):
+        _chunk_generator = SuperGraphGenerator(flo_params)
+        _chunk_generator.create_nodes()
+        _chunk_storage_model = _chunk_generator.get_storage_model()
+
+
+def _generate_chunk(shard: Tuple[int, int, List[float], str]) -> Tuple[int, int]:
+    start, stop, store_heat_in_range, path = shard
+    with contextlib.redirect_stdout(io.StringIO()):
+        transitions = _chunk_generator.get_transitions(_chunk_storage_model, store_heat_in_range)
+    # Write then rename, so that an interrupted run never leaves a partial chunk behind
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, transitions)
+    os.replace(tmp_path, path)
+    return start, stop
+
+
 class StorageModel():
     def __init__(self, flo_params: FloParamsHouse0, nodes: List, nodes_by: Dict, allowed_temperatures: Dict):
         self.params = DParams(flo_params)
@@ -107,6 +222,25 @@ class StorageModel():
         self.top_temps = allowed_temperatures['top']
         self.middle_temps = allowed_temperatures['middle']
         self.bottom_temps = allowed_temperatures['bottom']
+        self.min_energy_node = min(self.nodes, key=lambda x: x.energy)
+        # First node (in self.nodes order) by top, bottom and thermoclines, for the middle layer walk
+        self.first_node_by_top_bottom: Dict[Tuple, Dict[Tuple, DNode]] = {}
+        for node in self.nodes:
+            self.first_node_by_top_bottom.setdefault(
+                (node.top_temp, node.bottom_temp), {}
+            ).setdefault((node.thermocline1, node.thermocline2), node)
+
+    def nodes_with(self, tmb_filter: Callable[[Tuple], bool], th_filter: Callable[[Tuple], bool]) -> List[DNode]:
+        """Nodes matching both filters, in self.nodes order, found through the nodes_by index"""
+        return [
+            node
+            for tmb, nodes_by_th in self.nodes_by.items() if tmb_filter(tmb)
+            for th, node in nodes_by_th.items() if node is not None and th_filter(th)
+        ]
+
+    def node_with(self, tmb: Tuple, th: Tuple) -> List[DNode]:
+        node = self.nodes_by.get(tmb, {}).get(th)
+        return [node] if node is not None else []
 
     def next_node(self, node_now:DNode, store_heat_in:float, print_detail:bool=False) -> DNode:
         if store_heat_in > 0:
@@ -133,7 +267,7 @@ class StorageModel():
         # Node to discharge is a cold node
         if n.top_temp <= 100:
             if n.top_temp==80 and th1==0:
-                return min(self.nodes, key=lambda x: x.energy)
+                return self.min_energy_node
             # Go through the top being at 100 or at 80
             while th1>0:
                 if print_detail: print(f"Looking for {n.top_temp}({th1}){n.middle_temp}({th2}){n.bottom_temp}")
@@ -225,13 +359,7 @@ class StorageModel():
             th1 = th2
             while th1>0:
                 if print_detail: print(f"Looking for {top_temp}({th1})-({th2}){n.bottom_temp}")
-                node = [
-                    x for x in self.nodes
-                    if x.top_temp==top_temp
-                    and x.bottom_temp==n.bottom_temp
-                    and x.thermocline1==th1
-                    and x.thermocline2==th2
-                ][0]
+                node = self.first_node_by_top_bottom[(top_temp, n.bottom_temp)][(th1, th2)]
                 if print_detail: print(f"Energy: {round(node.energy,2)}")
                 th1 += -1
                 th2 += -1
@@ -373,14 +501,10 @@ class StorageModel():
 
         # Cold nodes
         if true_n.top_temp <= 100:
-            nodes_with_similar_temps = [
-                n for n in self.nodes if 
-                n.top_temp==true_n.top_temp and 
-                n.middle_temp==true_n.top_temp-20 and 
-                n.bottom_temp==true_n.top_temp-20 and
-                n.thermocline1==true_n.thermocline1 and
-                n.thermocline2==true_n.thermocline2
-            ]
+            nodes_with_similar_temps = self.node_with(
+                (true_n.top_temp, true_n.top_temp-20, true_n.top_temp-20),
+                (true_n.thermocline1, true_n.thermocline2),
+            )
             closest_node = min(nodes_with_similar_temps, key = lambda x: abs(x.energy-true_n.energy))
             return closest_node
 
@@ -401,75 +525,60 @@ class StorageModel():
 
         # Top temperature is impossible to reach
         if true_n.top_temp > max(self.top_temps):
-            nodes_with_similar_temps = [
-                n for n in self.nodes if 
-                n.top_temp == max(self.top_temps) and
-                n.middle_temp==closest_middle_temp and
-                n.bottom_temp==closest_bottom_temp and
-                n.thermocline2==true_n.thermocline2
-            ]
+            nodes_with_similar_temps = self.nodes_with(
+                lambda tmb: tmb == (max(self.top_temps), closest_middle_temp, closest_bottom_temp),
+                lambda th: th[1]==true_n.thermocline2,
+            )
             closest_node = min(nodes_with_similar_temps, key = lambda x: abs(x.energy-true_n.energy))
             return closest_node
 
         # Both top and middle were rounded above
         if closest_top_temp > true_n.top_temp and closest_middle_temp > true_n.middle_temp:
-            nodes_with_similar_temps = [
-                n for n in self.nodes if 
-                n.top_temp<=closest_top_temp and
-                n.top_temp>=closest_top_temp-10 and
-                n.middle_temp<=closest_middle_temp and
-                n.middle_temp>=closest_middle_temp-10 and
-                n.bottom_temp==closest_bottom_temp and
-                n.thermocline2==true_n.thermocline2
-            ]
+            nodes_with_similar_temps = self.nodes_with(
+                lambda tmb: (
+                    closest_top_temp-10 <= tmb[0] <= closest_top_temp and
+                    closest_middle_temp-10 <= tmb[1] <= closest_middle_temp and
+                    tmb[2]==closest_bottom_temp
+                ),
+                lambda th: th[1]==true_n.thermocline2,
+            )
             closest_node = min(nodes_with_similar_temps, key = lambda x: abs(x.energy-true_n.energy))
             return closest_node
         
         # Both top and middle were rounded below
         if closest_top_temp < true_n.top_temp and closest_bottom_temp < true_n.middle_temp:
-            nodes_with_similar_temps = [
-                n for n in self.nodes if 
-                n.top_temp<=closest_top_temp+10 and
-                n.top_temp>=closest_top_temp and
-                n.middle_temp<=closest_middle_temp+10 and
-                n.middle_temp>=closest_middle_temp and
-                n.bottom_temp==closest_bottom_temp and
-                n.thermocline2==true_n.thermocline2
-            ]
+            nodes_with_similar_temps = self.nodes_with(
+                lambda tmb: (
+                    closest_top_temp <= tmb[0] <= closest_top_temp+10 and
+                    closest_middle_temp <= tmb[1] <= closest_middle_temp+10 and
+                    tmb[2]==closest_bottom_temp
+                ),
+                lambda th: th[1]==true_n.thermocline2,
+            )
             closest_node = min(nodes_with_similar_temps, key = lambda x: abs(x.energy-true_n.energy))
             return closest_node
 
         # Top was rounded above but not middle: flexible th1
         if closest_top_temp > true_n.top_temp:
-            nodes_with_similar_temps = [
-                n for n in self.nodes if 
-                n.top_temp==closest_top_temp and
-                n.middle_temp==closest_middle_temp and
-                n.bottom_temp==closest_bottom_temp and
-                n.thermocline2==true_n.thermocline2
-            ]
+            nodes_with_similar_temps = self.nodes_with(
+                lambda tmb: tmb == (closest_top_temp, closest_middle_temp, closest_bottom_temp),
+                lambda th: th[1]==true_n.thermocline2,
+            )
             closest_node = min(nodes_with_similar_temps, key = lambda x: abs(x.energy-true_n.energy))
             return closest_node
 
         # Middle was rounded above but not top: flexible th2
         if closest_top_temp > true_n.top_temp:
-            nodes_with_similar_temps = [
-                n for n in self.nodes if 
-                n.top_temp==closest_top_temp and
-                n.middle_temp==closest_middle_temp and
-                n.bottom_temp==closest_bottom_temp and
-                n.thermocline1==true_n.thermocline1
-            ]
+            nodes_with_similar_temps = self.nodes_with(
+                lambda tmb: tmb == (closest_top_temp, closest_middle_temp, closest_bottom_temp),
+                lambda th: th[0]==true_n.thermocline1,
+            )
             closest_node = min(nodes_with_similar_temps, key = lambda x: abs(x.energy-true_n.energy))
             return closest_node
 
-        nodes_with_similar_temps = [
-            n for n in self.nodes if 
-            n.top_temp==closest_top_temp and 
-            n.middle_temp==closest_middle_temp and 
-            n.bottom_temp==closest_bottom_temp and
-            n.thermocline1==true_n.thermocline1 and
-            n.thermocline2==true_n.thermocline2
-        ]
+        nodes_with_similar_temps = self.node_with(
+            (closest_top_temp, closest_middle_temp, closest_bottom_temp),
+            (true_n.thermocline1, true_n.thermocline2),
+        )
         closest_node = min(nodes_with_similar_temps, key = lambda x: abs(x.energy-true_n.energy))
         return closest_node
\ No newline at end of file
@@ -35,6 +35,8 @@ class SynthGenerator(ScadaActor):
             H0CN.buffer_cold_pipe, H0CN.buffer_hot_pipe, H0CN.store_cold_pipe, H0CN.store_hot_pipe,
             *(depth for tank in self.cn.tank.values() for depth in [tank.depth1, tank.depth2, tank.depth3, tank.depth4])
         ]
+        self.buffer_channel_names = [x for x in self.temperature_channel_names if 'buffer-depth' in x]
+        self.temperature_channels = self.subscribe_channels(self.temperature_channel_names)
         self.elec_assigned_amount = None
         self.previous_time = None
         self.temperatures_available = False
@@ -156,13 +158,7 @@ class SynthGenerator(ScadaActor):
     # Receive latest temperatures
     def get_latest_temperatures(self):
         if not self.is_simulated:
-            temp = {
-                x: self.data.latest_channel_values[x] 
-                for x in self.temperature_channel_names
-                if x in self.data.latest_channel_values
-                and self.data.latest_channel_values[x] is not None
-                }
-            self.latest_temperatures = temp.copy()
+            self.latest_temperatures = self.temperature_channels.latest(self.temperature_channel_names)
         else:
             self.log("IN SIMULATION - set all temperatures to 60 degC")
             self.latest_temperatures = {}
@@ -172,9 +168,7 @@ class SynthGenerator(ScadaActor):
             self.temperatures_available = True
         else:
             self.temperatures_available = False
-            all_buffer = [x for x in self.temperature_channel_names if 'buffer-depth' in x]
-            available_buffer = [x for x in list(self.latest_temperatures.keys()) if 'buffer-depth' in x]
-            if all_buffer == available_buffer:
+            if all(x in self.latest_temperatures for x in self.buffer_channel_names):
                 self.fill_missing_store_temps()
                 self.temperatures_available = True
 
@@ -17,12 +17,13 @@ from paho.mqtt.client import MQTTMessageInfo
 from pydantic import BaseModel
 from result import Result
 
+from actors.snapshot_delta import SnapshotAssembler
 from admin.settings import AdminClientSettings
 from admin.watch.clients.constrained_mqtt_client import ConstrainedMQTTClient
 from admin.watch.clients.constrained_mqtt_client import MessageReceivedCallback
 from admin.watch.clients.constrained_mqtt_client import MQTTClientCallbacks
 from admin.watch.clients.constrained_mqtt_client import StateChangeCallback
-from named_types import LayoutLite, SendLayout, SnapshotSpaceheat, StratBossTrigger
+from named_types import LayoutLite, SendLayout, SnapshotDelta, SnapshotSpaceheat, StratBossTrigger
 
 module_logger = logging.getLogger(__name__)
 
@@ -87,6 +88,7 @@ class AdminClient:
     ) -> None:
         self._lock = threading.RLock()
         self._settings = settings.model_copy()
+        self._snapshot_assembler = SnapshotAssembler(request_keyframe=self._request_snapshot)
         self._callbacks = callbacks or AdminClientCallbacks()
         if subclients is None:
             self._subclients = []
@@ -213,7 +215,7 @@ class AdminClient:
         path_dbg = 0
         path_count = 0
         message = Message[SnapshotSpaceheat].model_validate_json(payload)
-        self._snap = message.Payload
+        self._snap = self._snapshot_assembler.process(message.Payload)
         for subclient in self.subclients():
             path_dbg |= 0x00000001
             path_count += 1
@@ -223,6 +225,14 @@ class AdminClient:
         #     path_dbg, path_count,
         # )
 
+    def _process_snapshot_delta(self, payload: bytes) -> None:
+        message = Message[SnapshotDelta].model_validate_json(payload)
+        snapshot = self._snapshot_assembler.process(message.Payload)
+        if snapshot is not None:
+            self._snap = snapshot
+            for subclient in self.subclients():
+                subclient.process_snapshot(self._snap)
+
     def _mqtt_message_received(self, topic: str, payload: bytes) -> None:
         path_dbg = 0
         # self._logger.debug("++AdminClient._mqtt_message_received  <%s>", topic)
@@ -234,6 +244,9 @@ class AdminClient:
             elif decoded_topic.message_type == type_name(SnapshotSpaceheat):
                 path_dbg |= 0x00000002
                 self._process_snapshot(payload)
+            elif decoded_topic.message_type == type_name(SnapshotDelta):
+                path_dbg |= 0x00000080
+                self._process_snapshot_delta(payload)
             elif decoded_topic.message_type == type_name(StratBossTrigger):
                 path_dbg |= 0x00000040
                 message = Message[StratBossTrigger].model_validate_json(payload)
@@ -11,6 +11,7 @@ from typer.main import get_group
 from admin.cli import app as admin_cli
 from actors.config import ScadaSettings
 from layout_gen.genlayout import app as layout_cli
+from flo_cli import app as flo_cli
 
 __version__: str = "0.2.0"
 
@@ -23,6 +24,7 @@ app = typer.Typer(
 
 app.add_typer(admin_cli, name="admin", help="Admin commands.")
 app.add_typer(layout_cli, name="layout", help="Layout commands")
+app.add_typer(flo_cli, name="flo", help="FLO commands.")
 
 @app.command()
 def config(env_file: str = ".env"):
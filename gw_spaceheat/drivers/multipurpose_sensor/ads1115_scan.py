@@ -0,0 +1,242 @@
+"""Pipelined single-shot reads of the ADS1115 chips of a TSnap.
+
+Reading a pin through AnalogIn starts a conversion and busy-polls the chip until it is done,
+so reading the 12 TSnap channels takes 12 conversion times, with the I2C bus mostly carrying
+status polls. The chips convert independently though: AdsScanner starts one conversion on
+every chip, waits once for the slowest of them, reads the results and starts the next pin of
+each chip. A scan takes the conversion times of the busiest chip rather than of all the pins,
+with one conversion in flight per chip.
+
+The chips are reached through the AdsChip protocol: AdafruitAdsChip drives an
+adafruit_ads1x15 ADS1115 at register level, and FakeAdsChip simulates one, with a FakeClock,
+to test and benchmark the scheduling without hardware. This module does not import the
+hardware libraries. Run the benchmark with
+
+    python -m drivers.multipurpose_sensor.ads1115_scan
+"""
+import time
+from typing import Callable, Dict, Optional, Protocol, Sequence, Tuple, Union
+
+# ADS1115 registers and config register fields (datasheet section 8.6)
+POINTER_CONVERSION = 0x00
+POINTER_CONFIG = 0x01
+CONFIG_OS_SINGLE = 0x8000
+CONFIG_MUX_OFFSET = 12
+CONFIG_MUX_SINGLE_ENDED = 0x04
+CONFIG_MODE_SINGLE = 0x0100
+CONFIG_COMP_QUE_DISABLE = 0x0003
+CONFIG_GAIN = {2 / 3: 0x0000, 1: 0x0200, 2: 0x0400, 4: 0x0600, 8: 0x0800, 16: 0x0A00}
+PGA_RANGE_VOLTS = {2 / 3: 6.144, 1: 4.096, 2: 2.048, 4: 1.024, 8: 0.512, 16: 0.256}
+CONFIG_DATA_RATE = {8: 0x0000, 16: 0x0020, 32: 0x0040, 64: 0x0060, 128: 0x0080, 250: 0x00A0, 475: 0x00C0, 860: 0x00E0}
+
+DEFAULT_DATA_RATE = 128
+FASTEST_DATA_RATE = 860
+# The internal oscillator is within 10% of nominal
+CONVERSION_MARGIN = 1.1
+POLL_SECONDS = 0.0002
+TIMEOUT_CONVERSIONS = 10
+
+ChipPin = Tuple[int, int]  # chip index, pin 0-3
+
+
+def conversion_seconds(data_rate: int) -> float:
+    return CONVERSION_MARGIN / data_rate
+
+
+class AdsChip(Protocol):
+    data_rate: int
+
+    def start_conversion(self, pin: int) -> None:
+        """Start a single-shot conversion of the single ended input pin"""
+
+    def conversion_ready(self) -> bool:
+        ...
+
+    def read_volts(self) -> float:
+        """The result of the last conversion"""
+
+
+class AdafruitAdsChip:
+    """An adafruit_ads1x15 ADS1115, driven through its register access so that starting a
+    conversion does not wait for it"""
+
+    def __init__(self, ads, data_rate: Optional[int] = None):
+        self.ads = ads
+        self.data_rate = data_rate or ads.data_rate
+        self.volts_per_count = PGA_RANGE_VOLTS[ads.gain] / 32767
+        self.config = (
+            CONFIG_OS_SINGLE
+            | CONFIG_GAIN[ads.gain]
+            | CONFIG_MODE_SINGLE
+            | CONFIG_DATA_RATE[self.data_rate]
+            | CONFIG_COMP_QUE_DISABLE
+        )
+
+    def start_conversion(self, pin: int) -> None:
+        mux = (pin + CONFIG_MUX_SINGLE_ENDED) << CONFIG_MUX_OFFSET
+        self.ads._write_register(POINTER_CONFIG, self.config | mux)
+
+    def conversion_ready(self) -> bool:
+        return bool(self.ads._read_register(POINTER_CONFIG) & CONFIG_OS_SINGLE)
+
+    def read_volts(self) -> float:
+        return self.ads._conversion_value(self.ads._read_register(POINTER_CONVERSION)) * self.volts_per_count
+
+
+class FakeClock:
+    """Simulated time: sleep advances it"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.sleeps = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps += 1
+        self.now += max(seconds, 0)
+
+
+class FakeAdsChip:
+    """Simulated ADS1115: a conversion completes 1 / data_rate after it starts, on the given
+    clock. volts maps each pin to its voltage, or to an OSError raised when starting its
+    conversion. transactions counts the I2C transactions, and restarts the conversions
+    started before the previous one was done."""
+
+    def __init__(
+        self,
+        volts: Dict[int, Union[float, OSError]],
+        data_rate: int = DEFAULT_DATA_RATE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.volts = volts
+        self.data_rate = data_rate
+        self.clock = clock
+        self.transactions = 0
+        self.conversions = 0
+        self.restarts = 0
+        self._pin: Optional[int] = None
+        self._done_at = 0.0
+
+    def start_conversion(self, pin: int) -> None:
+        self.transactions += 1
+        if isinstance(self.volts.get(pin), OSError):
+            raise self.volts[pin]
+        if self._pin is not None and self.clock() < self._done_at:
+            self.restarts += 1
+        self.conversions += 1
+        self._pin = pin
+        self._done_at = self.clock() + 1 / self.data_rate
+
+    def conversion_ready(self) -> bool:
+        self.transactions += 1
+        return self.clock() >= self._done_at
+
+    def read_volts(self) -> float:
+        self.transactions += 1
+        if self._pin is None:
+            raise OSError("No conversion started")
+        return self.volts[self._pin]
+
+
+class AdsScanner:
+    """Reads pins on several ADS1115 chips with one conversion in flight per chip"""
+
+    def __init__(
+        self,
+        chips: Dict[int, AdsChip],
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.chips = chips
+        self.clock = clock
+        self.sleep = sleep
+
+    def scan(self, pins_by_chip: Dict[int, Sequence[int]]) -> Dict[ChipPin, Union[float, OSError]]:
+        """Volts of each (chip, pin), or the OSError of a failed read. Each round starts the
+        next pin of every chip, then reads them all once converted."""
+        results: Dict[ChipPin, Union[float, OSError]] = {}
+        queues = {idx: list(pins) for idx, pins in pins_by_chip.items() if pins}
+        while queues:
+            in_flight: Dict[int, int] = {}
+            for idx in list(queues):
+                pin = queues[idx].pop(0)
+                if not queues[idx]:
+                    del queues[idx]
+                try:
+                    self.chips[idx].start_conversion(pin)
+                except OSError as e:
+                    results[(idx, pin)] = e
+                    continue
+                in_flight[idx] = pin
+            if not in_flight:
+                continue
+            started = self.clock()
+            wait_s = max(conversion_seconds(self.chips[idx].data_rate) for idx in in_flight)
+            self.sleep(wait_s)
+            for idx, pin in in_flight.items():
+                results[(idx, pin)] = self._read_when_ready(idx, started + wait_s * TIMEOUT_CONVERSIONS)
+        return results
+
+    def read_sequentially(self, pins_by_chip: Dict[int, Sequence[int]]) -> Dict[ChipPin, Union[float, OSError]]:
+        """One conversion at a time, polling until it is done, as AnalogIn does"""
+        results: Dict[ChipPin, Union[float, OSError]] = {}
+        for idx, pins in pins_by_chip.items():
+            for pin in pins:
+                try:
+                    self.chips[idx].start_conversion(pin)
+                except OSError as e:
+                    results[(idx, pin)] = e
+                    continue
+                deadline = self.clock() + conversion_seconds(self.chips[idx].data_rate) * TIMEOUT_CONVERSIONS
+                results[(idx, pin)] = self._read_when_ready(idx, deadline)
+        return results
+
+    def _read_when_ready(self, idx: int, deadline: float) -> Union[float, OSError]:
+        chip = self.chips[idx]
+        try:
+            while not chip.conversion_ready():
+                if self.clock() > deadline:
+                    return OSError(f"ADS1115 {idx} conversion timed out")
+                self.sleep(POLL_SECONDS)
+            return chip.read_volts()
+        except OSError as e:
+            return e
+
+
+def run_scan_benchmark(
+    num_chips: int = 3, pins_per_chip: int = 4, data_rate: int = DEFAULT_DATA_RATE, fast_data_rate: int = FASTEST_DATA_RATE
+) -> Dict[str, float]:
+    """Simulated seconds and I2C transactions to read all the pins: sequentially at
+    data_rate (the AnalogIn reads), then pipelined at data_rate and at fast_data_rate"""
+    results: Dict[str, float] = {}
+    pins_by_chip = {idx: list(range(pins_per_chip)) for idx in range(num_chips)}
+    for name, rate, pipelined in [
+        ("sequential", data_rate, False),
+        ("pipelined", data_rate, True),
+        ("pipelined_fast", fast_data_rate, True),
+    ]:
+        clock = FakeClock()
+        chips = {
+            idx: FakeAdsChip({pin: 1.0 + pin / 10 for pin in range(pins_per_chip)}, data_rate=rate, clock=clock)
+            for idx in range(num_chips)
+        }
+        scanner = AdsScanner(chips, clock=clock, sleep=clock.sleep)
+        (scanner.scan if pipelined else scanner.read_sequentially)(pins_by_chip)
+        results[f"{name}_s"] = clock.now
+        results[f"{name}_transactions"] = sum(chip.transactions for chip in chips.values())
+    return results
+
+
+def main() -> None:
+    results = run_scan_benchmark()
+    for name in ["sequential", "pipelined", "pipelined_fast"]:
+        print(
+            f"{name:>15}: {results[f'{name}_s'] * 1000:6.1f} ms, "
+            f"{results[f'{name}_transactions']:4.0f} I2C transactions"
+        )
+
+
+if __name__ == "__main__":
+    main()
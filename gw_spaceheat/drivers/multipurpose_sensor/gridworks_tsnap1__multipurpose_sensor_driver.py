@@ -1,6 +1,7 @@
 import math
 import time
-from typing import Dict, List, Optional
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 
 # noinspection PyUnresolvedReferences
 import adafruit_ads1x15.ads1115 as ADS
@@ -12,11 +13,18 @@ from actors.config import ScadaSettings
 # noinspection PyUnresolvedReferences
 from adafruit_ads1x15.analog_in import AnalogIn
 from drivers.driver_result import DriverOutcome
+from drivers.multipurpose_sensor.ads1115_scan import (
+    FASTEST_DATA_RATE,
+    AdafruitAdsChip,
+    AdsScanner,
+)
 from drivers.multipurpose_sensor.multipurpose_sensor_driver import \
     MultipurposeSensorDriver
+from drivers.thermistor import PullUpThermistor, pull_up_thermistor
 from enums import LogLevel
 from gwproto.data_classes.components.ads111x_based_component import \
     Ads111xBasedComponent
+from gwproto.named_types import AdsChannelConfig
 from gwproto.data_classes.data_channel import DataChannel
 from gwproto.enums import MakeModel, TelemetryName
 from gwproto.enums import ThermistorDataMethod
@@ -51,6 +59,8 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
     ads: dict[int, ADS]
     i2c: busio.I2C
     initialization_failed: Dict[int, bool]
+    analog_in: Dict[Tuple[int, int], AnalogIn]
+    scanner: Optional[AdsScanner]
 
     def __init__(self, component: Ads111xBasedComponent, settings: ScadaSettings):
         """
@@ -89,12 +99,26 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
             )
         c = component.gt
         self.terminal_block_idx_list = [tc.TerminalBlockIdx for tc in c.ConfigList]
+        # Channel configs and their (ads index, pin), indexed once
+        self.config_by_channel: Dict[str, AdsChannelConfig] = {
+            cfg.ChannelName: cfg for cfg in c.ConfigList
+        }
+        self.ads_idx_and_pin: Dict[str, Tuple[int, int]] = {
+            cfg.ChannelName: (
+                (cfg.TerminalBlockIdx - 1) // 4,
+                [ADS.P0, ADS.P1, ADS.P2, ADS.P3][(cfg.TerminalBlockIdx - 1) % 4],
+            )
+            for cfg in c.ConfigList
+        }
+        self.thermistor: PullUpThermistor = self.converter()
         self.telemetry_name_list = component.cac.TelemetryNameList
 
         self.ads_address = {
             i: address for i, address in enumerate(component.cac.AdsI2cAddressList)
         }
         self.ads = {}
+        self.analog_in = {}
+        self.scanner = None
         self.initialization_failed = {}
         self._curr_connect_delay = 0
         # Track last warning time per channel
@@ -135,6 +159,8 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
             try:
                 ads1115 = ADS.ADS1115(address=addr, i2c=self.i2c)
                 ads1115.gain = self.ADS_GAIN
+                if self.settings.tsnap_pipelined_reads:
+                    ads1115.data_rate = FASTEST_DATA_RATE
             except BaseException as e:
                 driver_init_outcome.add_comment(
                     level=LogLevel.Critical,
@@ -145,6 +171,11 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
                 continue  # skip to next iteration
             self.ads[idx] = ads1115
 
+        if self.settings.tsnap_pipelined_reads:
+            # One conversion in flight per chip, at the fastest data rate
+            self.scanner = AdsScanner(
+                {idx: AdafruitAdsChip(ads1115) for idx, ads1115 in self.ads.items()}
+            )
         return Ok(driver_init_outcome)
 
     def _should_skip_for_backoff(self, channel_name: str, now: float) -> bool:
@@ -188,38 +219,74 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         A None value with comments indicates reading was attempted but failed.
         A float value indicates successful reading, though there may still be comments.
         """
-        output = DriverOutcome[float](None)
         now = time.time()
+        not_read = self._not_read(ch, now)
+        if not_read is not None:
+            return Ok(not_read)
+        try:
+            voltage = self._analog_in(*self.ads_idx_and_pin[ch.Name]).voltage
+        except OSError as e:
+            return Ok(self._read_failed(ch, e, now))
+        return Ok(self._process_voltage(ch, voltage, now))
 
-        if self._should_skip_for_backoff(ch.Name, now):
-            return Ok(output)
+    def read_voltages(self, data_channels: List[DataChannel]) -> Dict[str, DriverOutcome[float]]:
+        """read_voltage for all the channels, with the conversions of the chips pipelined
+        by the scanner"""
+        now = time.time()
+        outcomes: Dict[str, DriverOutcome[float]] = {}
+        pins_by_chip: Dict[int, List[int]] = defaultdict(list)
+        for ch in data_channels:
+            not_read = self._not_read(ch, now)
+            if not_read is not None:
+                outcomes[ch.Name] = not_read
+                continue
+            i, pin = self.ads_idx_and_pin[ch.Name]
+            pins_by_chip[i].append(pin)
+        volts = self.scanner.scan(pins_by_chip)
+        for ch in data_channels:
+            if ch.Name in outcomes:
+                continue
+            voltage = volts[self.ads_idx_and_pin[ch.Name]]
+            if isinstance(voltage, OSError):
+                outcomes[ch.Name] = self._read_failed(ch, voltage, now)
+            else:
+                outcomes[ch.Name] = self._process_voltage(ch, voltage, now)
+        return outcomes
 
-        cfg = next(
-            (cfg for cfg in self.component.gt.ConfigList if cfg.ChannelName == ch.Name),
-            None,
-        )
-        i = int((cfg.TerminalBlockIdx - 1) / 4)
+    def _analog_in(self, i: int, pin: int) -> AnalogIn:
+        if (i, pin) not in self.analog_in:
+            self.analog_in[(i, pin)] = AnalogIn(self.ads[i], pin)
+        return self.analog_in[(i, pin)]
 
+    def _not_read(self, ch: DataChannel, now: float) -> Optional[DriverOutcome[float]]:
+        """The outcome of a channel that is not read: in backoff, or on a missing chip"""
+        if self._should_skip_for_backoff(ch.Name, now):
+            return DriverOutcome[float](None)
+        i, _ = self.ads_idx_and_pin[ch.Name]
         if self.initialization_failed[i]:
+            output = DriverOutcome[float](None)
             self._warning_delays[ch.Name] = self.ERROR_BACKOFF_SECONDS
             output.add_comment(
                 level=LogLevel.Warning,
-                msg=f"Missing i2c addr {self.ads_address[i]} | Channel {ch.Name} | Terminal {cfg.TerminalBlockIdx}",
+                msg=f"Missing i2c addr {self.ads_address[i]} | Channel {ch.Name} | Terminal {self.config_by_channel[ch.Name].TerminalBlockIdx}",
             )
-            return Ok(output)
+            return output
+        return None
+
+    def _read_failed(self, ch: DataChannel, e: OSError, now: float) -> DriverOutcome[float]:
+        output = DriverOutcome[float](None)
+        output.add_comment(
+            level=LogLevel.Warning,
+            msg=f"I2C read failed | Channel {ch.Name} | Terminal {self.config_by_channel[ch.Name].TerminalBlockIdx} | Error: {str(e)}",
+        )
+        self._handle_read_failure(ch.Name, now)
+        return output
 
-        pin = [ADS.P0, ADS.P1, ADS.P2, ADS.P3][(cfg.TerminalBlockIdx - 1) % 4]
+    def _process_voltage(self, ch: DataChannel, voltage: float, now: float) -> DriverOutcome[float]:
+        """Open and short detection, averaging, and the last valid reading"""
+        output = DriverOutcome[float](None)
+        cfg = self.config_by_channel[ch.Name]
         use_stale = False
-        try:
-            channel = AnalogIn(self.ads[i], pin)
-            voltage = channel.voltage
-        except OSError as e:
-            output.add_comment(
-                level=LogLevel.Warning,
-                msg=f"I2C read failed | Channel {ch.Name} | Terminal {cfg.TerminalBlockIdx} | Error: {str(e)}",
-            )
-            self._handle_read_failure(ch.Name, now)
-            return Ok(output)
 
         if voltage >= PI_VOLTAGE - 0.1: # sometimes it'll be be high from random noise
             output.add_comment(
@@ -265,7 +332,7 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
                     msg=f"Data too stale for {ch.Name} - last valid reading {(now - self._last_valid_reading_time[ch.Name])/60:.1f} minutes ago"
                 )
 
-        return Ok(output)
+        return output
 
     def _handle_read_failure(self, channel_name: str, now: float) -> None:
         """Update warning tracking when a read fails"""
@@ -290,8 +357,12 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
 
         outcome = DriverOutcome[Dict[str,Optional[int]]]({})
 
+        # Read all the channels, then convert all the voltages at once
+        read_channels: List[DataChannel] = []
+        voltages: List[float] = []
+        scanned = self.read_voltages(data_channels) if self.scanner is not None else {}
         for ch in data_channels:
-            read_result = self.read_voltage(ch)
+            read_result = Ok(scanned[ch.Name]) if self.scanner is not None else self.read_voltage(ch)
             if read_result.is_ok():
                 read_outcome = read_result.value
                 # Pass through any comments from voltage reading
@@ -309,30 +380,38 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
                             msg=f"Unrecognized TelemetryName {ch.TelemetryName} for {ch.Name}!",
                         )
                         continue  # go onto the next channel
-                    if ch.TelemetryName in {
-                        TelemetryName.AirTempCTimes1000,
-                        TelemetryName.WaterTempCTimes1000,
-                    }:
-                        convert_voltage_result = self.voltage_to_c(read_outcome.value)
-                    elif ch.TelemetryName in {
-                        TelemetryName.AirTempFTimes1000,
-                        TelemetryName.WaterTempFTimes1000,
-                    }:
-                        convert_voltage_result = self.voltage_to_f(read_outcome.value)
-                    if convert_voltage_result.is_ok():
-                        outcome.value[ch.Name] = int(
-                            convert_voltage_result.value * 1000
-                        )
-                    else:
-                        outcome.add_comment(
-                            level=LogLevel.Warning,
-                            msg=f"Temperature conversion failed | Channel {ch.Name} | Voltage {read_outcome.value:.3f}V | Error: {convert_voltage_result.err()}",
-                        )
+                    read_channels.append(ch)
+                    voltages.append(read_outcome.value)
                 else:
                     outcome.value[ch.Name] = None
 
+        temps_c = self.thermistor.temp_c(voltages)
+        for ch, voltage, temp_c in zip(read_channels, voltages, temps_c.tolist()):
+            if math.isnan(temp_c):
+                outcome.add_comment(
+                    level=LogLevel.Warning,
+                    msg=f"Temperature conversion failed | Channel {ch.Name} | Voltage {voltage:.3f}V | Error: resistance not positive",
+                )
+                continue
+            if ch.TelemetryName in {
+                TelemetryName.AirTempFTimes1000,
+                TelemetryName.WaterTempFTimes1000,
+            }:
+                temp_c = 32 + temp_c * 9 / 5
+            outcome.value[ch.Name] = int(temp_c * 1000)
+
         return Ok(outcome)
 
+    @classmethod
+    def converter(cls) -> PullUpThermistor:
+        """Volts to temperature for the TSnap thermistors, built once"""
+        return pull_up_thermistor(
+            beta=THERMISTOR_BETA,
+            r0_ohms=THERMISTOR_R0_OHMS,
+            pull_up_ohms=VOLTAGE_DIVIDER_R_OHMS,
+            supply_volts=PI_VOLTAGE,
+        )
+
     @classmethod
     def voltage_to_f(cls, voltage: float) -> Result[float, Exception]:
         """Calculate resistance from Beta function
@@ -344,7 +423,7 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         """
         temp_c = cls.voltage_to_c(voltage)
         if temp_c.is_ok():
-            temp_f = 32 + 8 * temp_c / 5
+            temp_f = 32 + 9 * temp_c.value / 5
             return Ok(temp_f)
         else:
             return temp_c
@@ -362,21 +441,7 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         https://www.newport.com/medias/sys_master/images/images/hdb/hac/8797291479070/TN-STEIN-1-Thermistor-Constant-Conversions-Beta-to-Steinhart-Hart.pdf
 
         """
-        rd: int = int(VOLTAGE_DIVIDER_R_OHMS)
-        r0: int = int(THERMISTOR_R0_OHMS)
-        beta: int = int(THERMISTOR_BETA)
-        t0: int = int(THERMISTOR_T0_DEGREES_KELVIN)
-        # Calculate the resistance of the thermistor
-        try:
-            rt = rd * voltage / (PI_VOLTAGE - voltage)
-        except Exception as e:
-            return Err(Exception(f"Didn't get to therm resistance! {str(e)}"))
-
-        # Calculate the temperature in degrees Celsius. Note that 273 is
-        # 0 degrees Celcius as measured in Kelvin.
-
-        try:
-            temp_c = 1 / ((1 / t0) + (math.log(rt / r0) / beta)) - 273
-            return Ok(temp_c)
-        except Exception as e:
-            return Err(Exception(f"Got to therm resistance={rt}: {str(e)}"))
+        temp_c = float(cls.converter().temp_c(voltage))
+        if math.isnan(temp_c):
+            return Err(Exception(f"No therm resistance for {voltage} V!"))
+        return Ok(temp_c)
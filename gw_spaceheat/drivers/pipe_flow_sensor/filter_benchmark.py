@@ -0,0 +1,143 @@
+"""Benchmark of the Butterworth smoothing of ApiFlowModule on recorded ticklists:
+simple_linear_filter against direct_form_filter, and butter_lowpass against lowpass_design.
+
+Ticklists are json files holding a TicklistHall or TicklistReed, or the TicklistHallReport or
+TicklistReedReport sent to the atn when SendTickLists is set, or a list of those. Run with
+
+    python -m drivers.pipe_flow_sensor.filter_benchmark [FILES]...
+
+Without files, synthetic hall ticklists are used.
+"""
+import json
+import time
+from pathlib import Path
+from typing import Annotated, Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import rich
+import typer
+
+from drivers.pipe_flow_sensor.signal_processing import (
+    butter_lowpass,
+    filtering,
+    lowpass_design,
+    padded_forward_backward,
+    simple_linear_filter,
+)
+
+MAX_HZ = 500
+
+
+def ticklist_nano_timestamps(ticklist: Dict[str, Any]) -> np.ndarray:
+    ticklist = ticklist.get("Ticklist", ticklist)
+    first = ticklist["FirstTickTimestampNanoSecond"] or 0
+    if "RelativeMicrosecondList" in ticklist:
+        return first + np.asarray(ticklist["RelativeMicrosecondList"], dtype=np.float64) * 1e3
+    return first + np.asarray(ticklist["RelativeMillisecondList"], dtype=np.float64) * 1e6
+
+
+def load_ticklists(paths: Sequence[Path]) -> List[np.ndarray]:
+    ticklists = []
+    for path in paths:
+        data = json.loads(Path(path).read_text())
+        for ticklist in data if isinstance(data, list) else [data]:
+            ticklists.append(ticklist_nano_timestamps(ticklist))
+    return ticklists
+
+
+def synthetic_ticklists(num_ticklists: int = 10, seconds: float = 30, mean_hz: float = 60, seed: int = 0) -> List[np.ndarray]:
+    """Hall meter ticks for a flow ramping up and down around mean_hz, with jitter"""
+    rng = np.random.default_rng(seed)
+    ticklists = []
+    start_ns = 1.7e18
+    for i in range(num_ticklists):
+        num_ticks = int(seconds * mean_hz)
+        hz = mean_hz * (1 + 0.3 * np.sin(np.linspace(0, np.pi, num_ticks) + i)) + rng.normal(0, 1, num_ticks)
+        ticks = start_ns + np.cumsum(1e9 / np.clip(hz, 1, None))
+        ticklists.append(ticks)
+        start_ns = ticks[-1] + 1e8
+    return ticklists
+
+
+def resampled_frequencies(nano_timestamps: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Frequencies resampled at 5 times the maximum frequency, as in ApiFlowModule"""
+    timestamps = np.unique(nano_timestamps)
+    frequencies = 1e9 / np.diff(timestamps)
+    frequencies = np.r_[frequencies, frequencies[-1]]
+    keep = (frequencies >= 0) & (frequencies < MAX_HZ)
+    timestamps, frequencies = timestamps[keep], frequencies[keep]
+    f_s = 5 * frequencies.max()
+    sampled_timestamps = np.linspace(
+        timestamps.min(), timestamps.max(), int((timestamps.max() - timestamps.min()) / 1e9 * f_s)
+    )
+    return np.interp(sampled_timestamps, timestamps, frequencies), f_s
+
+
+def best_time(fn, repeat: int) -> Tuple[float, Any]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        st = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - st)
+    return best, result
+
+
+def run_filter_benchmark(ticklists: Sequence[np.ndarray], cutoff_frequency: float = 2, repeat: int = 3) -> Dict[str, Any]:
+    runs = []
+    for nano_timestamps in ticklists:
+        if len(np.unique(nano_timestamps)) <= 20:
+            continue
+        sampled_frequencies, f_s = resampled_frequencies(nano_timestamps)
+        lowpass_design.cache_clear()
+        old_s, old = best_time(
+            lambda: padded_forward_backward(
+                *butter_lowpass(N=5, Wn=cutoff_frequency, fs=f_s), sampled_frequencies, linear_filter=simple_linear_filter
+            ),
+            repeat,
+        )
+        new_s, new = best_time(lambda: filtering(*lowpass_design(cutoff_frequency, f_s)[:2], sampled_frequencies), repeat)
+        runs.append({
+            "num_ticks": len(nano_timestamps),
+            "num_samples": len(sampled_frequencies),
+            "fs": f_s,
+            "old_s": old_s,
+            "new_s": new_s,
+            "identical": bool(np.array_equal(old, new)),
+        })
+    old_total = sum(run["old_s"] for run in runs)
+    new_total = sum(run["new_s"] for run in runs)
+    return {
+        "cutoff_frequency": cutoff_frequency,
+        "repeat": repeat,
+        "old_s": old_total,
+        "new_s": new_total,
+        "speedup": old_total / new_total if new_total else None,
+        "identical": all(run["identical"] for run in runs),
+        "runs": runs,
+    }
+
+
+def main(
+    files: Annotated[Optional[List[Path]], typer.Argument(help="Recorded ticklist json files.")] = None,
+    cutoff_frequency: float = 2,
+    repeat: int = 3,
+    output: Annotated[Optional[Path], typer.Option("--output", "-o", help="Write the results as json.")] = None,
+) -> None:
+    ticklists = load_ticklists(files) if files else synthetic_ticklists()
+    results = run_filter_benchmark(ticklists, cutoff_frequency=cutoff_frequency, repeat=repeat)
+    for run in results["runs"]:
+        rich.print(
+            f"{run['num_ticks']:>6} ticks {run['num_samples']:>7} samples at {run['fs']:7.1f} Hz: "
+            f"{run['old_s'] * 1000:9.1f} ms -> {run['new_s'] * 1000:7.2f} ms"
+            f"{'' if run['identical'] else '  [red]output differs[/red]'}"
+        )
+    rich.print(
+        f"Total {results['old_s']:.3f} s -> {results['new_s']:.3f} s "
+        f"(x{results['speedup']:.0f}), identical output: {results['identical']}"
+    )
+    if output:
+        output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,139 @@
+"""Streaming estimation of the tick frequency of a flow meter, one ticklist at a time.
+
+The filter state is kept from one ticklist to the next, so every tick is processed once,
+with NumPy, and there is no edge padding or restart at ticklist boundaries. Unlike
+filtering() (forward-backward, zero phase), the Butterworth filter is causal: the output
+lags the flow by the group delay of the low-pass filter.
+"""
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+from drivers.pipe_flow_sensor.signal_processing import direct_form_filter, lowpass_design, steady_state
+
+MAX_HZ = 500
+NO_FLOW_HZ = 0.001
+NO_FLOW_STEP_NS = 20 * 1e6
+BUTTERWORTH_ORDER = 5
+# Resampling rate as a multiple of the flow frequency, rounded up to a power of two
+# so that the filter is only redesigned when the flow changes a lot
+SAMPLES_PER_HZ = 5
+
+
+class StreamingHzEstimator:
+    """Smoothed frequencies from tick timestamps, with either an exponential weighted
+    average (exp_alpha) or a Butterworth low-pass filter (cutoff_frequency).
+
+    The frequency of a tick is measured from the previous tick, outliers above MAX_HZ
+    are dropped and gaps longer than no_flow_ms are filled with NO_FLOW_HZ every 20 ms.
+    When the gap since the previous ticklist is longer than no_flow_ms the flow had
+    stopped, and the estimator starts over.
+    """
+    def __init__(
+            self,
+            no_flow_ms: float,
+            exp_alpha: Optional[float] = None,
+            cutoff_frequency: Optional[float] = None,
+    ):
+        if (exp_alpha is None) == (cutoff_frequency is None):
+            raise ValueError("StreamingHzEstimator needs exactly one of exp_alpha and cutoff_frequency")
+        self.no_flow_ns = no_flow_ms * 1e6
+        self.exp_alpha = exp_alpha
+        self.cutoff_frequency = cutoff_frequency
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the flow history, e.g. once the flow is known to have stopped"""
+        self.last_tick_ns: Optional[float] = None
+        # Last input sample, to interpolate across ticklists
+        self.last_sample_ns: Optional[float] = None
+        self.last_sample_hz: float = 0
+        # Filter state
+        self.last_output_ns: Optional[float] = None
+        self.last_output_hz: Optional[float] = None
+        self.filter_state: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self.fs: Optional[float] = None
+        self.b: Optional[np.ndarray] = None
+        self.a: Optional[np.ndarray] = None
+
+    def update(self, nano_timestamps) -> Tuple[np.ndarray, np.ndarray]:
+        """Process the ticks of one ticklist. Returns the times (ns) and the smoothed
+        frequencies (Hz) of the new output samples, which may be empty."""
+        ticks = np.unique(np.asarray(nano_timestamps, dtype=np.float64))
+        if self.last_tick_ns is not None:
+            ticks = ticks[ticks > self.last_tick_ns]
+            if len(ticks) and ticks[0] - self.last_tick_ns > self.no_flow_ns:
+                self.reset()
+        if self.last_tick_ns is None:
+            if not len(ticks):
+                return np.empty(0), np.empty(0)
+            self.last_tick_ns = ticks[0]
+            ticks = ticks[1:]
+        if not len(ticks):
+            return np.empty(0), np.empty(0)
+
+        hz = 1e9 / np.diff(ticks, prepend=self.last_tick_ns)
+        self.last_tick_ns = float(ticks[-1])
+        keep = hz < MAX_HZ
+        ticks, hz = ticks[keep], hz[keep]
+        if not len(ticks):
+            return np.empty(0), np.empty(0)
+        ticks, hz = self.add_no_flow(ticks, hz)
+
+        if self.exp_alpha is not None:
+            times, smoothed = ticks, self.exp_weighted_avg(hz)
+        else:
+            times, smoothed = self.butterworth(ticks, hz)
+        self.last_sample_ns, self.last_sample_hz = float(ticks[-1]), float(hz[-1])
+        if len(smoothed):
+            self.last_output_ns, self.last_output_hz = float(times[-1]), float(smoothed[-1])
+        return times, smoothed
+
+    def add_no_flow(self, ticks: np.ndarray, hz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        previous = np.empty_like(ticks)
+        previous[1:] = ticks[:-1]
+        previous[0] = self.last_sample_ns if self.last_sample_ns is not None else ticks[0]
+        gaps = ticks - previous
+        # Points at previous + k*20ms for every k with k*20ms < gap
+        counts = np.where(gaps > self.no_flow_ns, np.ceil(gaps / NO_FLOW_STEP_NS) - 1, 0).astype(np.int64)
+        num_added = int(counts.sum())
+        if num_added == 0:
+            return ticks, hz
+        where = np.repeat(np.arange(len(ticks)), counts)
+        k = np.arange(num_added) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+        added = previous[where] + k * NO_FLOW_STEP_NS
+        return np.insert(ticks, where, added), np.insert(hz, where, NO_FLOW_HZ)
+
+    def exp_weighted_avg(self, hz: np.ndarray) -> np.ndarray:
+        # y[t] = (1-alpha)*y[t-1] + alpha*x[t]
+        b, a = [self.exp_alpha], [1, self.exp_alpha - 1]
+        if self.last_output_hz is None:
+            # The first frequency is its own average
+            smoothed, _ = direct_form_filter(b, a, hz[1:], steady_state(b, a, hz[0]))
+            return np.r_[hz[0], smoothed]
+        smoothed, _ = direct_form_filter(b, a, hz, steady_state(b, a, self.last_output_hz))
+        return smoothed
+
+    def butterworth(self, ticks: np.ndarray, hz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        fs = 2 ** math.ceil(math.log2(max(SAMPLES_PER_HZ * hz.max(), 4 * self.cutoff_frequency)))
+        if fs != self.fs:
+            self.fs = fs
+            self.b, self.a, _ = lowpass_design(self.cutoff_frequency, fs, BUTTERWORTH_ORDER)
+            # Start from the steady state of the last output, or of the first sample
+            steady_hz = self.last_output_hz if self.last_output_hz is not None else hz[0]
+            self.filter_state = steady_state(self.b, self.a, steady_hz)
+
+        if self.last_sample_ns is not None:
+            ticks = np.r_[self.last_sample_ns, ticks]
+            hz = np.r_[self.last_sample_hz, hz]
+        period_ns = 1e9 / fs
+        first_ns = ticks[0] if self.last_output_ns is None else self.last_output_ns + period_ns
+        num_samples = int(np.floor((ticks[-1] - first_ns) / period_ns)) + 1
+        if num_samples <= 0:
+            return np.empty(0), np.empty(0)
+        times = first_ns + np.arange(num_samples) * period_ns
+        smoothed, self.filter_state = direct_form_filter(
+            self.b, self.a, np.interp(times, ticks, hz), self.filter_state
+        )
+        return times, smoothed
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Tuple
+
 import numpy as np
 
 def butter_lowpass(N=5, Wn=2, fs=250):
@@ -47,12 +50,11 @@ def lfilter_zi(b, a):
         a = np.r_[a, np.zeros(n - len(a), dtype=a.dtype)]
     elif len(b) < n:
         b = np.r_[b, np.zeros(n - len(b), dtype=b.dtype)]
-    # Construct the companion matrix: I - A^-1 (where A^-1 is represented in a column form)
-    companion_matrix = np.eye(n - 1, dtype=np.result_type(a, b))
-    # Create the last column as a column vector
-    last_column = np.zeros((n - 1, 1)) 
-    last_column[:] = (-a[1:] / a[0]).reshape(-1, 1)
-    IminusA = companion_matrix - last_column.T 
+    # Transposed companion matrix A of the denominator: first column -a[1:], ones above the diagonal
+    A = np.zeros((n - 1, n - 1), dtype=np.result_type(a, b))
+    A[:, 0] = -a[1:] / a[0]
+    A[:-1, 1:] += np.eye(n - 2)
+    IminusA = np.eye(n - 1) - A
     # Vector B, adjusting the first element of b
     B = b[1:] - a[1:] * b[0]
     # Solve the linear system
@@ -91,6 +93,65 @@ def simple_linear_filter(b, a, x, axis=-1, initial=None):
     return y, z
 
 
+def direct_form_filter(b, a, x, state=None):
+    # Direct form I filter of a 1-D signal, with the arithmetic of simple_linear_filter: from
+    # rest (state None) the output is bit-identical. state is (previous inputs, previous outputs),
+    # len(b)-1 and len(a)-1 values, most recent last; the final state is returned with the
+    # output to continue with the next block.
+    # The feed-forward sum is vectorized over the whole signal, only the feedback runs per sample.
+    b = np.asarray(b, dtype=float)
+    a = np.asarray(a, dtype=float)
+    x = np.asarray(x, dtype=float)
+    nb, na = len(b) - 1, len(a) - 1
+    if state is None:
+        x_before, y_before = np.zeros(nb), np.zeros(na)
+    else:
+        x_before, y_before = np.asarray(state[0], dtype=float), np.asarray(state[1], dtype=float)
+    x_ext = np.r_[x_before, x]
+    n = len(x)
+    output = b[0] * x
+    for j in range(1, nb + 1):
+        output = output + b[j] * x_ext[nb - j:nb - j + n]
+    y = y_before.tolist() + output.tolist()
+    if na == 5:
+        feedback_order_5(a.tolist(), y)
+    else:
+        a_list = a.tolist()
+        for i in range(na, na + n):
+            out = y[i]
+            for k in range(1, na + 1):
+                out -= a_list[k] * y[i - k]
+            y[i] = out
+    return np.array(y[na:]), (x_ext[len(x_ext) - nb:], np.array(y[len(y) - na:]))
+
+
+def feedback_order_5(a, y):
+    # The feedback loop of direct_form_filter unrolled for the 5th order Butterworth filters,
+    # in place on y (the 5 previous outputs, then the feed-forward sums)
+    _, a1, a2, a3, a4, a5 = a
+    y5, y4, y3, y2, y1 = y[:5]
+    for i in range(5, len(y)):
+        out = y[i] - a1 * y1 - a2 * y2 - a3 * y3 - a4 * y4 - a5 * y5
+        y[i] = out
+        y5, y4, y3, y2, y1 = y4, y3, y2, y1, out
+
+
+def steady_state(b, a, value: float):
+    # direct_form_filter state of a constant signal at value (the filter has unit DC gain)
+    return np.full(len(b) - 1, float(value)), np.full(len(a) - 1, float(value))
+
+
+@lru_cache(maxsize=64)
+def lowpass_design(cutoff_frequency: float, fs: float, order: int = 5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """butter_lowpass coefficients b, a and lfilter_zi(b, a), computed once per (cutoff_frequency, fs).
+    The arrays are shared, and read-only."""
+    b, a = butter_lowpass(N=order, Wn=cutoff_frequency, fs=fs)
+    zi = lfilter_zi(b, a)
+    for array in (b, a, zi):
+        array.flags.writeable = False
+    return b, a, zi
+
+
 def odd_ext(x, n, axis=-1):
     if n < 1:
         return x
@@ -107,6 +168,16 @@ def odd_ext(x, n, axis=-1):
 
 def filtering(b, a, x, axis=-1, padtype='odd', padlen=None, method='pad',
              irlen=None):
+    return padded_forward_backward(b, a, x, axis=axis, linear_filter=fast_linear_filter)
+
+
+def fast_linear_filter(b, a, x, axis=-1, initial=None):
+    # Drop-in for simple_linear_filter, which starts at rest whatever the initial state
+    y, state = direct_form_filter(b, a, x)
+    return y, state[1][::-1]
+
+
+def padded_forward_backward(b, a, x, axis=-1, linear_filter=simple_linear_filter):
     b = np.atleast_1d(b)
     a = np.atleast_1d(a)
     x = np.asarray(x)
@@ -122,14 +193,16 @@ def filtering(b, a, x, axis=-1, padtype='odd', padlen=None, method='pad',
     zi = np.reshape(zi, zi_shape)
     x0 = axis_slice(ext, stop=1, axis=axis)
     # Forward filter.
-    (y, zf) = simple_linear_filter(b, a, ext, axis=axis, initial=zi * x0)
+    # The linear filters start at rest whatever the initial state: the padding absorbs
+    # the start-up transient.
+    (y, zf) = linear_filter(b, a, ext, initial=zi * x0)
     # Backward filter.
     # Create y0 so zi*y0 broadcasts appropriately.
     y0 = axis_slice(y, start=-1, axis=axis)
-    (y, zf) = simple_linear_filter(b, a, axis_slice(y, step=-1, axis=axis), axis=axis, initial=zi * y0)
+    (y, zf) = linear_filter(b, a, axis_slice(y, step=-1, axis=axis), initial=zi * y0)
     # Reverse y.
     y = axis_slice(y, step=-1, axis=axis)
     if edge > 0:
         # Slice the actual signal from the extended signal.
         y = axis_slice(y, start=edge, stop=-edge, axis=axis)
-    return y
\ No newline at end of file
+    return y
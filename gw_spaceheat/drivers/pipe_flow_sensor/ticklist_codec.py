@@ -0,0 +1,247 @@
+"""Compact encoding of the ticklists forwarded to the atn.
+
+A TicklistBatch carries the TicklistHallReport or TicklistReedReport messages of one flow
+module over a batching window. The ticklists are stored as integer columns:
+
+    tick counts, first tick flags (1 if FirstTickTimestampNanoSecond is set),
+    FirstTickTimestampNanoSecond (only the ticklists that have one),
+    PicoBeforePostTimestampNanoSecond, ScadaReceivedUnixMs,
+    relative tick times (all the ticklists, one after the other)
+
+The timestamp columns are delta-encoded from one ticklist to the next, and the relative tick
+times from one tick to the next within their ticklist. The columns are then written as zigzag
+varints, compressed with zlib and base64 encoded.
+"""
+import base64
+import time
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from gwproto.named_types import TicklistHall, TicklistHallReport, TicklistReed, TicklistReedReport
+
+from named_types import TicklistBatch
+
+TicklistReport = Union[TicklistHallReport, TicklistReedReport]
+
+MAX_VARINT_BYTES = 10
+
+
+def zigzag_varint_encode(values) -> bytes:
+    """Signed 64 bit integers as zigzag LEB128 varints, as in protobuf sint64"""
+    v = np.asarray(values, dtype=np.int64)
+    u = ((v << 1) ^ (v >> 63)).view(np.uint64)
+    num_bytes = np.ones(len(u), dtype=np.int64)
+    for k in range(1, MAX_VARINT_BYTES):
+        num_bytes += u >= np.uint64(1 << (7 * k))
+    k = np.arange(MAX_VARINT_BYTES)
+    groups = ((u[:, None] >> (7 * k).astype(np.uint64)) & np.uint64(0x7F)).astype(np.uint8)
+    groups[k < num_bytes[:, None] - 1] |= 0x80
+    return groups[k < num_bytes[:, None]].tobytes()
+
+
+def zigzag_varint_decode(data: bytes) -> np.ndarray:
+    """Inverse of zigzag_varint_encode"""
+    b = np.frombuffer(data, dtype=np.uint8)
+    if not len(b):
+        return np.empty(0, dtype=np.int64)
+    if b[-1] & 0x80:
+        raise ValueError("Truncated varint data")
+    ends = np.flatnonzero((b & 0x80) == 0)
+    starts = np.r_[0, ends[:-1] + 1]
+    position = np.arange(len(b)) - np.repeat(starts, ends - starts + 1)
+    if position.max() >= MAX_VARINT_BYTES:
+        raise ValueError(f"Varint longer than {MAX_VARINT_BYTES} bytes")
+    parts = (b & 0x7F).astype(np.uint64) << (7 * position).astype(np.uint64)
+    u = np.bitwise_or.reduceat(parts, starts)
+    return (u >> np.uint64(1)).astype(np.int64) ^ -(u & np.uint64(1)).astype(np.int64)
+
+
+def delta_encode(values) -> np.ndarray:
+    return np.diff(np.asarray(values, dtype=np.int64), prepend=0)
+
+
+def delta_decode(deltas) -> np.ndarray:
+    return np.cumsum(deltas, dtype=np.int64)
+
+
+def relative_ticks(report: TicklistReport) -> List[int]:
+    if isinstance(report, TicklistHallReport):
+        return report.Ticklist.RelativeMicrosecondList
+    return report.Ticklist.RelativeMillisecondList
+
+
+def batch_key(report: TicklistReport) -> Tuple[type, str, str, str]:
+    """Reports with the same key can go in the same TicklistBatch"""
+    return type(report), report.ChannelName, report.Ticklist.HwUid, report.TerminalAssetAlias
+
+
+def encode_ticklist_batch(reports: Sequence[TicklistReport]) -> TicklistBatch:
+    """Encode the reports of one flow module, in the order they were received"""
+    if not reports:
+        raise ValueError("encode_ticklist_batch needs at least one report")
+    first = reports[0]
+    key = batch_key(first)
+    for report in reports:
+        if batch_key(report) != key:
+            raise ValueError("A TicklistBatch holds the reports of one channel and one pico")
+    tick_lists = [relative_ticks(report) for report in reports]
+    counts = np.array([len(ticks) for ticks in tick_lists], dtype=np.int64)
+    first_ticks = [report.Ticklist.FirstTickTimestampNanoSecond for report in reports]
+    has_first = np.array([tick is not None for tick in first_ticks], dtype=np.int64)
+    ticks = np.fromiter(
+        (tick for tick_list in tick_lists for tick in tick_list), dtype=np.int64, count=int(counts.sum())
+    )
+    tick_deltas = np.diff(ticks, prepend=0)
+    starts = np.cumsum(counts) - counts
+    nonempty = counts > 0
+    tick_deltas[starts[nonempty]] = ticks[starts[nonempty]]
+    columns = np.concatenate([
+        counts,
+        has_first,
+        delta_encode([tick for tick in first_ticks if tick is not None]),
+        delta_encode([report.Ticklist.PicoBeforePostTimestampNanoSecond for report in reports]),
+        delta_encode([report.ScadaReceivedUnixMs for report in reports]),
+        tick_deltas,
+    ])
+    return TicklistBatch(
+        TerminalAssetAlias=first.TerminalAssetAlias,
+        ChannelName=first.ChannelName,
+        HwUid=first.Ticklist.HwUid,
+        TicklistTypeName=first.Ticklist.TypeName,
+        TicklistCount=len(reports),
+        TickCount=int(counts.sum()),
+        FirstScadaReceivedUnixMs=first.ScadaReceivedUnixMs,
+        EncodedTicklists=base64.b64encode(zlib.compress(zigzag_varint_encode(columns))).decode(),
+    )
+
+
+def decode_ticklist_batch(batch: TicklistBatch) -> List[TicklistReport]:
+    """The TicklistHallReport or TicklistReedReport messages of a TicklistBatch"""
+    columns = zigzag_varint_decode(zlib.decompress(base64.b64decode(batch.EncodedTicklists)))
+    n = batch.TicklistCount
+    counts, has_first = columns[:n], columns[n:2 * n].astype(bool)
+    num_first = int(has_first.sum())
+    first_ticks = delta_decode(columns[2 * n:2 * n + num_first])
+    pico_before_post = delta_decode(columns[2 * n + num_first:3 * n + num_first])
+    received_ms = delta_decode(columns[3 * n + num_first:4 * n + num_first])
+    tick_deltas = columns[4 * n + num_first:]
+    if len(counts) != n or counts.sum() != len(tick_deltas) or counts.sum() != batch.TickCount:
+        raise ValueError(
+            f"Inconsistent TicklistBatch: {len(columns)} values for {n} ticklists of {batch.TickCount} ticks"
+        )
+    cumulative = np.cumsum(tick_deltas, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    before = np.zeros(n, dtype=np.int64)
+    before[starts > 0] = cumulative[starts[starts > 0] - 1]
+    ticks = cumulative - np.repeat(before, counts)
+
+    first_tick_list: List[Optional[int]] = [None] * n
+    for i, tick in zip(np.flatnonzero(has_first).tolist(), first_ticks.tolist()):
+        first_tick_list[i] = tick
+    reports: List[TicklistReport] = []
+    for i, (start, count) in enumerate(zip(starts.tolist(), counts.tolist())):
+        relative = ticks[start:start + count].tolist()
+        if batch.TicklistTypeName == "ticklist.hall":
+            reports.append(
+                TicklistHallReport(
+                    TerminalAssetAlias=batch.TerminalAssetAlias,
+                    ChannelName=batch.ChannelName,
+                    ScadaReceivedUnixMs=int(received_ms[i]),
+                    Ticklist=TicklistHall(
+                        HwUid=batch.HwUid,
+                        FirstTickTimestampNanoSecond=first_tick_list[i],
+                        RelativeMicrosecondList=relative,
+                        PicoBeforePostTimestampNanoSecond=int(pico_before_post[i]),
+                    ),
+                )
+            )
+        else:
+            reports.append(
+                TicklistReedReport(
+                    TerminalAssetAlias=batch.TerminalAssetAlias,
+                    ChannelName=batch.ChannelName,
+                    ScadaReceivedUnixMs=int(received_ms[i]),
+                    Ticklist=TicklistReed(
+                        HwUid=batch.HwUid,
+                        FirstTickTimestampNanoSecond=first_tick_list[i],
+                        RelativeMillisecondList=relative,
+                        PicoBeforePostTimestampNanoSecond=int(pico_before_post[i]),
+                    ),
+                )
+            )
+    return reports
+
+
+@dataclass
+class TicklistByteCounter:
+    """Bytes sent for the forwarded ticks: raw_bytes is the json of the individual reports
+    (what is sent without batching), encoded_bytes the json of the batches"""
+    ticklists: int = 0
+    ticks: int = 0
+    batches: int = 0
+    raw_bytes: int = 0
+    encoded_bytes: int = 0
+
+    @property
+    def raw_bytes_per_tick(self) -> Optional[float]:
+        return self.raw_bytes / self.ticks if self.ticks else None
+
+    @property
+    def encoded_bytes_per_tick(self) -> Optional[float]:
+        return self.encoded_bytes / self.ticks if self.ticks else None
+
+    @property
+    def compression_ratio(self) -> Optional[float]:
+        return self.raw_bytes / self.encoded_bytes if self.encoded_bytes else None
+
+    def add_report(self, report: TicklistReport) -> None:
+        self.ticklists += 1
+        self.ticks += len(relative_ticks(report))
+        self.raw_bytes += len(report.model_dump_json())
+
+    def add_batch(self, batch: TicklistBatch) -> None:
+        self.batches += 1
+        self.encoded_bytes += len(batch.model_dump_json())
+
+
+class TicklistBatcher:
+    """Collects the ticklist reports of one flow module and encodes them in a TicklistBatch
+    once window_s has elapsed since the first one"""
+    def __init__(self, window_s: float):
+        self.window_s = window_s
+        self.reports: List[TicklistReport] = []
+        self.counter = TicklistByteCounter()
+
+    def add(self, report: TicklistReport) -> Optional[TicklistBatch]:
+        """Add a report, and return the batch if the window has elapsed, or the batch of
+        the previous reports if they are from another channel or pico (e.g. a swapped pico)"""
+        if self.reports and batch_key(report) != batch_key(self.reports[0]):
+            batch = self.flush()
+            self.reports.append(report)
+            self.counter.add_report(report)
+            return batch
+        self.reports.append(report)
+        self.counter.add_report(report)
+        if self.due():
+            return self.flush()
+        return None
+
+    def due(self, now_ms: Optional[int] = None) -> bool:
+        if not self.reports:
+            return False
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        return now_ms - self.reports[0].ScadaReceivedUnixMs >= self.window_s * 1000
+
+    def flush(self) -> Optional[TicklistBatch]:
+        """The batch of the reports collected so far, if any"""
+        if not self.reports:
+            return None
+        try:
+            batch = encode_ticklist_batch(self.reports)
+        finally:
+            self.reports = []
+        self.counter.add_batch(batch)
+        return batch
@@ -3,6 +3,7 @@ import struct
 from pathlib import Path
 from typing import Any
 from typing import Callable
+from typing import Iterable
 from typing import Optional
 from typing import Tuple
 
@@ -12,6 +13,9 @@ from rich.table import Table
 from drivers.power_meter.egauge.settings import EGaugeRegister
 from drivers.power_meter.egauge.settings import RegisterType
 
+# Modbus limit on the registers of one read
+MAX_READ_REGISTERS = 125
+
 
 def repack(response: list[int], pack_format:str, unpack_format:str) -> Tuple[bytes, Any]:
     packed = struct.pack(pack_format, *response)
@@ -38,6 +42,32 @@ def readS64(c: ModbusClient, addr: int) -> Tuple[list[int], bytes, int]:
 def readT16(c: ModbusClient, addr: int) -> Tuple[list[int], bytes, bytes]:
     return read(c, addr, 8, ">HHHHHHHH", ">16s")
 
+def coalesce_registers(
+        addresses: Iterable[int],
+        num_registers: int,
+        max_block_registers: int = MAX_READ_REGISTERS,
+) -> list[Tuple[int, int]]:
+    """(start, count) blocks covering the values of num_registers registers at each address.
+    Values that follow each other without a gap share a block, up to max_block_registers."""
+    blocks: list[list[int]] = []
+    for address in sorted(set(addresses)):
+        if (
+            blocks
+            and address == blocks[-1][0] + blocks[-1][1]
+            and blocks[-1][1] + num_registers <= max_block_registers
+        ):
+            blocks[-1][1] += num_registers
+        else:
+            blocks.append([address, num_registers])
+    return [(start, count) for start, count in blocks]
+
+def readF32Block(c: ModbusClient, addr: int, num_regs: int) -> Tuple[list[int], Optional[Tuple[float, ...]]]:
+    """Consecutive f32 values in one read_input_registers call, decoded with one unpack"""
+    regs = c.read_input_registers(addr, num_regs)
+    if not regs or len(regs) != num_regs:
+        return regs, None
+    return regs, struct.unpack(f">{num_regs // 2}f", struct.pack(f">{num_regs}H", *regs))
+
 def read_function(type_: RegisterType) -> Callable:
     match type_:
         case RegisterType.f32:
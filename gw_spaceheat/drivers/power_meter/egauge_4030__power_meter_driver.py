@@ -5,6 +5,7 @@ import time
 import struct
 from typing import Any
 from typing import Optional
+from typing import Sequence
 
 from gwproactor.logger import LoggerOrAdapter
 from gwproto.named_types import ElectricMeterChannelConfig
@@ -14,12 +15,15 @@ from result import Result
 
 from actors.config import ScadaSettings
 from gwproto.data_classes.data_channel import DataChannel
+from gwproto.enums import TelemetryName
 from gwproto.data_classes.components.electric_meter_component import ElectricMeterComponent
 from drivers.driver_result import DriverResult
 from drivers.exceptions import DriverWarning
 from drivers.power_meter.egauge import ModbusClientSettings
 from drivers.power_meter.egauge import RegisterType
+from drivers.power_meter.egauge.registers import coalesce_registers
 from drivers.power_meter.egauge.registers import readF32
+from drivers.power_meter.egauge.registers import readF32Block
 from drivers.power_meter.egauge.registers import readT16
 from drivers.power_meter.power_meter_driver import PowerMeterDriver
 
@@ -127,6 +131,9 @@ class EGuage4030_PowerMeterDriver(PowerMeterDriver):
     _client_settings: ModbusClientSettings
     _curr_connect_delay = 0.5
     _last_connect_time: float = 0.0
+    _power_address: dict[str, int]
+    _power_blocks: list[tuple[int, int]]
+    _power_block_offset: dict[str, tuple[int, int]]
 
 
     def __init__(self, component: ElectricMeterComponent, settings: ScadaSettings, logger: LoggerOrAdapter):
@@ -135,6 +142,19 @@ class EGuage4030_PowerMeterDriver(PowerMeterDriver):
             port=self.component.gt.ModbusPort,
             timeout=self.CLIENT_TIMEOUT
         )
+        # Register address of each power channel, and the blocks of contiguous f32 registers
+        # read together by read_telemetry_values: channel name -> (block index, value index)
+        self._power_address = {
+            cfg.ChannelName: cfg.EgaugeRegisterConfig.Address
+            for cfg in self.component.gt.ConfigList
+            if cfg.EgaugeRegisterConfig is not None
+        }
+        self._power_blocks = coalesce_registers(self._power_address.values(), num_registers=2)
+        self._power_block_offset = {}
+        for channel_name, address in self._power_address.items():
+            for block_idx, (start, count) in enumerate(self._power_blocks):
+                if start <= address < start + count:
+                    self._power_block_offset[channel_name] = (block_idx, (address - start) // 2)
 
     def clean_client(self):
         if self._modbus_client is not None:
@@ -245,21 +265,15 @@ class EGuage4030_PowerMeterDriver(PowerMeterDriver):
             return connect_result
 
     def read_power_w(self, channel: DataChannel) -> Result[DriverResult[int | None], Exception]:
-        egauge_config = next(
-            (
-                cfg for cfg in self.component.gt.ConfigList
-                if cfg.ChannelName == channel.Name
-            ),
-            None
-        ).EgaugeRegisterConfig
+        address = self._power_address[channel.Name]
         connect_result = self.try_connect()
         if connect_result.is_ok() and connect_result.value.connected:
-            _, _, power = readF32(self._modbus_client, egauge_config.Address)
+            _, _, power = readF32(self._modbus_client, address)
             driver_result: DriverResult[int | None] = DriverResult(None, connect_result.value.warnings)
             if power is None:
                 driver_result.warnings.append(
                     EGaugeReadFailed(
-                        offset=egauge_config.Address,
+                        offset=address,
                         num_registers=2,
                         register_type=RegisterType.f32,
                         value=None,
@@ -267,25 +281,68 @@ class EGuage4030_PowerMeterDriver(PowerMeterDriver):
                     )
                 )
             else:
-                driver_result.value = int(power)
-                if not is_short_integer(driver_result.value):
-                    unclipped_int_power = driver_result.value
-                    MIN_POWER = -2**15
-                    MAX_POWER = 2**15 - 1
-                    driver_result.value = max(MIN_POWER, min(int(driver_result.value), MAX_POWER))
+                driver_result.value = self._clipped_power(address, power, driver_result.warnings)
+            return Ok(driver_result)
+        else:
+            return connect_result
+
+    def read_telemetry_values(
+        self,
+        channels: Sequence[DataChannel]
+    ) -> Result[DriverResult[dict[str, int | None] | None], Exception]:
+        """Reads the power channels with one read_input_registers call per block of
+        contiguous registers, instead of one call per channel"""
+        power_channels = [
+            channel for channel in channels
+            if channel.TelemetryName == TelemetryName.PowerW and channel.Name in self._power_block_offset
+        ]
+        if len(power_channels) < len(channels):
+            return super().read_telemetry_values(channels)
+        connect_result = self.try_connect()
+        if not (connect_result.is_ok() and connect_result.value.connected):
+            return connect_result
+        driver_result: DriverResult[dict[str, int | None] | None] = DriverResult({}, connect_result.value.warnings)
+        block_values: dict[int, Optional[tuple[float, ...]]] = {}
+        for channel in power_channels:
+            block_idx, value_idx = self._power_block_offset[channel.Name]
+            if block_idx not in block_values:
+                start, count = self._power_blocks[block_idx]
+                _, block_values[block_idx] = readF32Block(self._modbus_client, start, count)
+                if block_values[block_idx] is None:
                     driver_result.warnings.append(
-                        EGaugeReadOutOfRange(
-                            offset=egauge_config.Address,
-                            num_registers=2,
+                        EGaugeReadFailed(
+                            offset=start,
+                            num_registers=count,
                             register_type=RegisterType.f32,
-                            value=unclipped_int_power,
+                            value=None,
                             client=self._modbus_client,
-                            msg=rf"Power value {unclipped_int_power} clipped to \[{MIN_POWER}, {MAX_POWER}] result: {driver_result.value}",
                         )
                     )
-            return Ok(driver_result)
-        else:
-            return connect_result
+            values = block_values[block_idx]
+            driver_result.value[channel.Name] = (
+                None if values is None
+                else self._clipped_power(self._power_address[channel.Name], values[value_idx], driver_result.warnings)
+            )
+        return Ok(driver_result)
+
+    def _clipped_power(self, address: int, power: float, warnings: list[Exception]) -> int:
+        int_power = int(power)
+        if is_short_integer(int_power):
+            return int_power
+        MIN_POWER = -2**15
+        MAX_POWER = 2**15 - 1
+        clipped_power = max(MIN_POWER, min(int_power, MAX_POWER))
+        warnings.append(
+            EGaugeReadOutOfRange(
+                offset=address,
+                num_registers=2,
+                register_type=RegisterType.f32,
+                value=int_power,
+                client=self._modbus_client,
+                msg=rf"Power value {int_power} clipped to \[{MIN_POWER}, {MAX_POWER}] result: {clipped_power}",
+            )
+        )
+        return clipped_power
 
     def read_current_rms_micro_amps(self, channel: DataChannel) -> Result[DriverResult[int | None], Exception]:
         raise NotImplementedError
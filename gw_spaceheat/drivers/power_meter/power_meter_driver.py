@@ -1,6 +1,6 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Optional, Sequence
 
 from gwproactor.logger import LoggerOrAdapter
 from gwproto.named_types import ElectricMeterChannelConfig
@@ -59,5 +59,20 @@ class PowerMeterDriver(ABC):
         else:
             return Err(ValueError(f"Driver {self} not set up to read {channel.TelemetryName}"))
 
+    def read_telemetry_values(
+        self,
+        channels: Sequence[DataChannel]
+    ) -> Result[DriverResult[dict[str, int | None] | None], Exception]:
+        """Reads the channels of one poll, keyed by channel name, with the warnings of all
+        the reads. Drivers that can read several channels at once override this."""
+        result: DriverResult[dict[str, int | None] | None] = DriverResult({})
+        for channel in channels:
+            read = self.read_telemetry_value(channel)
+            if read.is_err():
+                return read
+            result.warnings.extend(read.value.warnings)
+            result.value[channel.Name] = read.value.value
+        return Ok(result)
+
     def validate_config(self, config: ElectricMeterChannelConfig) -> None:
         ...
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""Volts to temperature conversion for the NTC thermistors read through a voltage divider,
+by the pico tank modules (ApiTankModule) and the TSnap (GridworksTsnap1_MultipurposeSensorDriver).
+
+The temperature comes from the beta formula. A converter is built once per set of
+parameters (see pico_tank_thermistor and pull_up_thermistor, which are cached) and converts
+NumPy arrays of volts at once. Readings of a disconnected or shorted thermistor convert to NaN.
+
+With table_size, the converter also holds a dense interpolation table over the volts of
+TABLE_MIN_C to TABLE_MAX_C, and a conversion is a lookup instead of a log per reading. The
+largest difference to the beta formula on the table is table_error_c, and readings outside
+of the table go through the beta formula. With NumPy's vectorized log the formula is as fast
+as the lookup, so the cached converters do not use a table.
+"""
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+
+THERMISTOR_T0_KELVIN = 298  # i.e. 25 degrees
+ZERO_C_KELVIN = 273
+TABLE_MIN_C = -40
+TABLE_MAX_C = 150
+TABLE_SIZE = 8192
+
+# Pico tank modules
+PICO_SUPPLY_VOLTS = 3.3
+PICO_R_FIXED_KOHMS = 5.65  # The voltage divider resistors in the TankModule
+PICO_THERMISTOR_R0_KOHMS = 10  # The R0 of the NTC thermistor - an industry standard
+
+
+def beta_temp_c(r_therm, r0: float, beta: float, t0: float = THERMISTOR_T0_KELVIN) -> np.ndarray:
+    """Temperature in degrees C of a thermistor of resistance r_therm (same unit as r0)"""
+    return 1 / ((1 / t0) + (np.log(np.asarray(r_therm, dtype=float) / r0) / beta)) - ZERO_C_KELVIN
+
+
+def beta_resistance(temp_c, r0: float, beta: float, t0: float = THERMISTOR_T0_KELVIN) -> np.ndarray:
+    """Inverse of beta_temp_c"""
+    return r0 * np.exp(beta * (1 / (np.asarray(temp_c, dtype=float) + ZERO_C_KELVIN) - 1 / t0))
+
+
+def c_to_f(temp_c):
+    return 32 + temp_c * 9 / 5
+
+
+class ThermistorConverter(ABC):
+    """Volts to degrees C for a thermistor of nominal resistance r0 and the given beta.
+    Subclasses give the voltage divider: resistance(volts) and its inverse volts(r_therm)."""
+
+    def __init__(self, r0: float, beta: float, table_size: int = 0):
+        self.r0 = r0
+        self.beta = beta
+        self.table_size = table_size
+        self.table_volts = np.empty(0)
+        self.table_c = np.empty(0)
+        self.table_slope = np.empty(0)
+        self.inverse_step = 0.0
+        self.table_error_c = 0.0
+        if table_size:
+            self.build_table(table_size)
+
+    @abstractmethod
+    def resistance(self, volts: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    @abstractmethod
+    def volts(self, r_therm: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def exact_temp_c(self, volts) -> np.ndarray:
+        """Beta formula, NaN where the resistance is not positive and finite"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r_therm = self.resistance(np.asarray(volts, dtype=float))
+            return beta_temp_c(np.where((r_therm > 0) & (r_therm < np.inf), r_therm, np.nan), self.r0, self.beta)
+
+    def temp_c(self, volts) -> np.ndarray:
+        volts = np.asarray(volts, dtype=float)
+        if not self.table_size:
+            return self.exact_temp_c(volts)
+        # Uniform table: the index is arithmetic, no search
+        position = np.atleast_1d((volts - self.table_volts[0]) * self.inverse_step)
+        outside = ~((position >= 0) & (position <= self.table_size - 1))
+        i = np.minimum(np.where(outside, 0, position).astype(np.intp), self.table_size - 2)
+        temp_c = self.table_c[i] + (position - i) * self.table_slope[i]
+        if outside.any():
+            temp_c[outside] = self.exact_temp_c(np.atleast_1d(volts)[outside])
+        return temp_c.reshape(volts.shape)
+
+    def temp_f(self, volts) -> np.ndarray:
+        return c_to_f(self.temp_c(volts))
+
+    def build_table(self, table_size: int) -> None:
+        ends = self.volts(beta_resistance([TABLE_MIN_C, TABLE_MAX_C], self.r0, self.beta))
+        self.table_volts = np.linspace(ends.min(), ends.max(), table_size)
+        self.table_c = self.exact_temp_c(self.table_volts)
+        self.table_slope = np.diff(self.table_c)
+        self.inverse_step = (table_size - 1) / (self.table_volts[-1] - self.table_volts[0])
+        # Linear interpolation is the furthest from the curve about halfway between points
+        midpoints = (self.table_volts[1:] + self.table_volts[:-1]) / 2
+        self.table_error_c = float(
+            np.abs(np.interp(midpoints, self.table_volts, self.table_c) - self.exact_temp_c(midpoints)).max()
+        )
+
+
+class PicoTankThermistor(ThermistorConverter):
+    """Pico tank module: the thermistor is in parallel with the pico input (pico_kohms),
+    behind r_fixed_kohms, on a 3.3 V supply"""
+
+    def __init__(
+        self,
+        beta: float,
+        pico_kohms: float,
+        r_fixed_kohms: float = PICO_R_FIXED_KOHMS,
+        table_size: int = 0,
+    ):
+        self.pico_kohms = pico_kohms
+        self.r_fixed_kohms = r_fixed_kohms
+        super().__init__(r0=PICO_THERMISTOR_R0_KOHMS, beta=beta, table_size=table_size)
+
+    def resistance(self, volts: np.ndarray) -> np.ndarray:
+        return 1 / ((PICO_SUPPLY_VOLTS / volts - 1) / self.r_fixed_kohms - 1 / self.pico_kohms)
+
+    def volts(self, r_therm: np.ndarray) -> np.ndarray:
+        return PICO_SUPPLY_VOLTS / (1 + self.r_fixed_kohms * (1 / r_therm + 1 / self.pico_kohms))
+
+
+class PullUpThermistor(ThermistorConverter):
+    """Thermistor to ground with a pull-up resistor to supply_volts, as on the TSnap"""
+
+    def __init__(
+        self,
+        beta: float,
+        r0_ohms: float,
+        pull_up_ohms: float,
+        supply_volts: float,
+        table_size: int = 0,
+    ):
+        self.pull_up_ohms = pull_up_ohms
+        self.supply_volts = supply_volts
+        super().__init__(r0=r0_ohms, beta=beta, table_size=table_size)
+
+    def resistance(self, volts: np.ndarray) -> np.ndarray:
+        return self.pull_up_ohms * volts / (self.supply_volts - volts)
+
+    def volts(self, r_therm: np.ndarray) -> np.ndarray:
+        return self.supply_volts * r_therm / (self.pull_up_ohms + r_therm)
+
+
+@lru_cache(maxsize=32)
+def pico_tank_thermistor(beta: float, pico_kohms: float) -> PicoTankThermistor:
+    """The converter of the tank modules with these ThermistorBeta and PicoKOhms"""
+    return PicoTankThermistor(beta=beta, pico_kohms=pico_kohms)
+
+
+@lru_cache(maxsize=32)
+def pull_up_thermistor(beta: float, r0_ohms: float, pull_up_ohms: float, supply_volts: float) -> PullUpThermistor:
+    return PullUpThermistor(beta=beta, r0_ohms=r0_ohms, pull_up_ohms=pull_up_ohms, supply_volts=supply_volts)
@@ -0,0 +1,100 @@
+"""FLO (forward looking optimizer) command-line interface."""
+import json
+import os
+from pathlib import Path
+from typing import Annotated, List, Optional
+
+import rich
+import typer
+
+from actors.flo_benchmark import BENCHMARK_HORIZONS, BENCHMARK_NUM_LAYERS, DGRAPH_PHASES, run_benchmark
+from actors.super_graph import SUPER_GRAPH_FILE, SUPER_GRAPH_JSON_FILE, convert_json_to_binary
+from actors.super_graph_generator import SUPER_GRAPH_CHUNK_DIR, SuperGraphGenerator
+from named_types import FloParamsHouse0
+
+app = typer.Typer(
+    no_args_is_help=True,
+    pretty_exceptions_enable=False,
+    rich_markup_mode="rich",
+    help="GridWorks FLO tools.",
+)
+
+@app.command()
+def convert(
+    src: Path = Path(SUPER_GRAPH_JSON_FILE),
+    dst: Path = Path(SUPER_GRAPH_FILE),
+) -> None:
+    """Convert a super_graph.json into the binary super graph format."""
+    super_graph = convert_json_to_binary(src, dst)
+    rich.print(
+        f"Wrote {dst}: {super_graph.num_nodes} nodes, "
+        f"{len(super_graph.store_heat_in)} store_heat_in steps, "
+        f"{dst.stat().st_size / 1e6:.1f} MB (from {src.stat().st_size / 1e6:.1f} MB)"
+    )
+
+@app.command()
+def generate(
+    params: Annotated[
+        Path, typer.Argument(help="json file with the FloParamsHouse0 used for the tank and heat pump parameters.")
+    ],
+    processes: Annotated[
+        int, typer.Option("--processes", "-p", help="Number of worker processes.")
+    ] = os.cpu_count() or 1,
+    chunk_dir: Annotated[
+        Path, typer.Option(help="Directory for the generated shards. Rerun with the same directory to resume.")
+    ] = Path(SUPER_GRAPH_CHUNK_DIR),
+) -> None:
+    """Generate super_graph.bin in the current directory."""
+    flo_params = FloParamsHouse0.model_validate_json(params.read_text())
+    SuperGraphGenerator(flo_params).generate(processes=processes, chunk_dir=chunk_dir)
+
+@app.command()
+def benchmark(
+    horizon: Annotated[
+        Optional[List[int]], typer.Option(help="Horizon hours to benchmark, repeatable.")
+    ] = None,
+    num_layers: Annotated[
+        Optional[List[int]], typer.Option(help="Storage NumLayers to benchmark, repeatable.")
+    ] = None,
+    vectorized_solver: Annotated[
+        bool, typer.Option(help="Use DGraph's vectorized Dijkstra solver.")
+    ] = False,
+    repeat: Annotated[
+        int, typer.Option(help="Untraced runs per benchmark, the fastest is reported.")
+    ] = 1,
+    trace_allocations: Annotated[
+        bool, typer.Option(help="Add a tracemalloc run for the allocation columns.")
+    ] = True,
+    output: Annotated[
+        Optional[Path], typer.Option("--output", "-o", help="Write the JSON results here instead of stdout.")
+    ] = None,
+) -> None:
+    """Benchmark super graph generation and the FLO phases on synthetic parameters."""
+    results = run_benchmark(
+        horizons=horizon or BENCHMARK_HORIZONS,
+        num_layers=num_layers or BENCHMARK_NUM_LAYERS,
+        vectorized_solver=vectorized_solver,
+        repeat=repeat,
+        trace_allocations=trace_allocations,
+    )
+    text = json.dumps(results, indent=2)
+    if output is None:
+        print(text)
+        return
+    output.write_text(text)
+    for run in results["runs"]:
+        phases = ", ".join(
+            f"{name} {run['phases'][name]['wall_s']:.2f}s" for name in DGRAPH_PHASES
+        )
+        rich.print(f"NumLayers {run['num_layers']}, {run['horizon']}h: {phases}")
+    rich.print(f"Wrote {output}")
+
+@app.callback()
+def _main() -> None: ...
+
+
+# For sphinx:
+typer_click_object = typer.main.get_command(app)
+
+if __name__ == "__main__":
+    app()
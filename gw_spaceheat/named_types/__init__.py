@@ -6,10 +6,11 @@ from named_types.admin_release_control import AdminReleaseControl
 from named_types.ally_gives_up import AllyGivesUp
 from named_types.atn_bid import AtnBid
 from named_types.channel_flatlined import ChannelFlatlined
+from named_types.compact_report import CompactReport
 from named_types.dispatch_contract_go_dormant import DispatchContractGoDormant
 from named_types.dispatch_contract_go_live import DispatchContractGoLive
 from named_types.energy_instruction import EnergyInstruction
-from named_types.events import RemainingElecEvent
+from named_types.events import CompactReportEvent, RemainingElecEvent
 from named_types.flo_params import FloParams
 from named_types.flo_params_house0 import FloParamsHouse0
 from named_types.fsm_event import FsmEvent
@@ -27,19 +28,23 @@ from named_types.no_new_contract_warning import NoNewContractWarning
 from named_types.pico_missing import PicoMissing
 from named_types.price_quantity_unitless import PriceQuantityUnitless
 from named_types.remaining_elec import RemainingElec
+from named_types.report_encoding import ReportEncoding
 from named_types.slow_dispatch_contract import SlowDispatchContract
 from named_types.scada_params import ScadaParams
 from named_types.send_layout import SendLayout
 from named_types.single_machine_state import SingleMachineState
 from named_types.slow_contract_heartbeat import SlowContractHeartbeat
+from named_types.snapshot_delta import SnapshotDelta
 from named_types.snapshot_spaceheat import SnapshotSpaceheat
 from named_types.strat_boss_ready import StratBossReady
 from named_types.strat_boss_trigger import StratBossTrigger
 from named_types.suit_up import SuitUp
+from named_types.ticklist_batch import TicklistBatch
 from named_types.wake_up import WakeUp
 from named_types.weather_forecast import WeatherForecast
 
 __all__ = [
+    "CompactReportEvent",
     "RemainingElecEvent",
     "AdminDispatch",
     "AdminKeepAlive",
@@ -47,6 +52,7 @@ __all__ = [
     "AllyGivesUp",
     "AtnBid",
     "ChannelFlatlined",
+    "CompactReport",
     "DispatchContractGoDormant",
     "DispatchContractGoLive",
     "EnergyInstruction",
@@ -67,15 +73,18 @@ __all__ = [
     "PicoMissing",
     "PriceQuantityUnitless",
     "RemainingElec",
+    "ReportEncoding",
     "SlowContractHeartbeat",
     "SlowDispatchContract",
     "ScadaParams",
     "SendLayout",
     "SingleMachineState",
+    "SnapshotDelta",
     "SnapshotSpaceheat",
     "SuitUp",
     "StratBossReady",
     "StratBossTrigger",
+    "TicklistBatch",
     "WakeUp",
     "WeatherForecast",
 ]
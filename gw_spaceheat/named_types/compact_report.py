@@ -0,0 +1,40 @@
+"""Type compact.report, version 000"""
+
+from typing import List, Literal
+
+from gwproto.messages import FsmFullReport, MachineStates
+from gwproto.property_format import (
+    LeftRightDotStr,
+    SpaceheatName,
+    UTCMilliseconds,
+    UTCSeconds,
+    UUID4Str,
+)
+from pydantic import BaseModel, PositiveInt
+
+
+class CompactReport(BaseModel):
+    """
+    A report.002 with its channel readings stored as columns, sent by the SCADA instead of
+    the Report once the AtomicTNode asked for it with a report.encoding message.
+
+    EncodedReadings is the base64 of the zigzag varint encoded columns (zlib compressed
+    for the columnar.zlib Encoding): the reading count of each channel of ChannelNameList,
+    then the read times, delta-of-delta encoded from the slot start, then the values,
+    delta encoded. See actors.report_codec.
+    """
+
+    FromGNodeAlias: LeftRightDotStr
+    FromGNodeInstanceId: UUID4Str
+    AboutGNodeAlias: LeftRightDotStr
+    SlotStartUnixS: UTCSeconds
+    SlotDurationS: PositiveInt
+    ChannelNameList: List[SpaceheatName]
+    StateList: List[MachineStates]
+    FsmReportList: List[FsmFullReport]
+    MessageCreatedMs: UTCMilliseconds
+    Id: UUID4Str
+    Encoding: Literal["columnar", "columnar.zlib"]
+    EncodedReadings: str
+    TypeName: Literal["compact.report"] = "compact.report"
+    Version: Literal["000"] = "000"
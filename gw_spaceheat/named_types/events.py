@@ -1,6 +1,7 @@
 from typing import Any, Literal
 
 from gwproto.messages.event import EventBase
+from named_types.compact_report import CompactReport
 from named_types.remaining_elec import RemainingElec
 
 
@@ -11,3 +12,14 @@ class RemainingElecEvent(EventBase):
 
     def __init__(self, **data: dict[str, Any]) -> None:
         super().__init__(**data)
+
+
+class CompactReportEvent(EventBase):
+    Report: CompactReport
+    TypeName: Literal["compact.report.event"] = "compact.report.event"
+    Version: Literal["000"] = "000"
+
+    def __init__(self, **data: dict[str, Any]) -> None:
+        super().__init__(**data)
+        self.MessageId = self.Report.Id
+        self.TimeCreatedMs = self.Report.MessageCreatedMs
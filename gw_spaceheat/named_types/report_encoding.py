@@ -0,0 +1,20 @@
+"""Type report.encoding, version 000"""
+
+from typing import Literal
+
+from gwproto.property_format import LeftRightDotStr, UTCMilliseconds
+from pydantic import BaseModel
+
+
+class ReportEncoding(BaseModel):
+    """
+    Sent by the AtomicTNode to its SCADA to ask for the encoding of the reports it sends.
+    The SCADA switches to compact.report only if its settings allow it, and otherwise keeps
+    sending report.002.
+    """
+
+    FromGNodeAlias: LeftRightDotStr
+    Encoding: Literal["json", "columnar", "columnar.zlib"]
+    UnixTimeMs: UTCMilliseconds
+    TypeName: Literal["report.encoding"] = "report.encoding"
+    Version: Literal["000"] = "000"
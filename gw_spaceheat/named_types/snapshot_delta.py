@@ -0,0 +1,37 @@
+"""Type snapshot.delta, version 000"""
+
+from typing import List, Literal
+
+from gwproto.named_types.single_reading import SingleReading
+from gwproto.property_format import (
+    LeftRightDotStr,
+    SpaceheatName,
+    UTCMilliseconds,
+    UUID4Str,
+)
+from pydantic import BaseModel, PositiveInt
+
+from named_types.single_machine_state import SingleMachineState
+
+
+class SnapshotDelta(BaseModel):
+    """
+    Changes since the previous snapshot.
+
+    Sent by the SCADA between two keyframes, which are full snapshot.spaceheat messages. It
+    holds the readings that changed beyond the threshold of their channel, the channels
+    that flatlined and the machine states that changed, since the previous snapshot.delta
+    (Sequence - 1) or the keyframe (Sequence 1). A receiver that missed one asks for a new
+    keyframe with send.snap.
+    """
+
+    FromGNodeAlias: LeftRightDotStr
+    FromGNodeInstanceId: UUID4Str
+    SnapshotTimeUnixMs: UTCMilliseconds
+    KeyframeTimeUnixMs: UTCMilliseconds
+    Sequence: PositiveInt
+    ChangedReadingList: List[SingleReading]
+    FlatlinedChannelList: List[SpaceheatName]
+    ChangedStateList: List[SingleMachineState]
+    TypeName: Literal["snapshot.delta"] = "snapshot.delta"
+    Version: Literal["000"] = "000"
@@ -0,0 +1,28 @@
+"""Type ticklist.batch, version 000"""
+
+from typing import Literal
+
+from gwproto.property_format import LeftRightDotStr, SpaceheatName, UTCMilliseconds
+from pydantic import BaseModel, PositiveInt, StrictInt
+
+
+class TicklistBatch(BaseModel):
+    """
+    Used by the SCADA to forward, in one message, the ticklist.hall or ticklist.reed messages
+    received from a pico flow module over a batching window.
+
+    EncodedTicklists is the base64 of the zlib compressed, zigzag varint encoded columns of
+    the ticklists, with the timestamps and the relative tick times delta-encoded. See
+    drivers.pipe_flow_sensor.ticklist_codec.
+    """
+
+    TerminalAssetAlias: LeftRightDotStr
+    ChannelName: SpaceheatName
+    HwUid: str
+    TicklistTypeName: Literal["ticklist.hall", "ticklist.reed"]
+    TicklistCount: PositiveInt
+    TickCount: StrictInt
+    FirstScadaReceivedUnixMs: UTCMilliseconds
+    EncodedTicklists: str
+    TypeName: Literal["ticklist.batch"] = "ticklist.batch"
+    Version: Literal["000"] = "000"
@@ -0,0 +1,95 @@
+"""Tests for the channel subscriptions of the actors run by the Scada (actors.channel_bus)"""
+import time
+
+from gwproactor_test.certs import copy_keys, uses_tls
+from gwproto.messages import ChannelReadings, SyncedReadings
+
+from actors import HomeAlone, Scada
+from actors.channel_bus import ChannelBus, ChannelView
+from actors.config import ScadaSettings
+from data_classes.house_0_layout import House0Layout
+from data_classes.house_0_names import H0CN, H0N
+
+
+def test_channel_bus():
+    bus = ChannelBus({"a": 0, "b": 1, "c": 2})
+    calls = []
+    view = bus.subscribe(
+        ChannelView("h", ["b", "a", "not-a-channel"], lambda v, changed: calls.append(changed), min_interval_s=10),
+        latest_values=[1, None, None],
+        latest_unix_ms=[1000, None, None],
+    )
+    quiet = bus.subscribe(ChannelView("s", ["c"]))
+    assert view.latest() == {"a": 1} and view.unix_ms("a") == 1000
+
+    # Coalesced into one call, in subscription order
+    bus.publish(1, 5, 2000)
+    bus.publish(0, 2, 2000)
+    bus.publish(2, 7, 2000)
+    assert bus.flush(now_s=100) is None
+    assert calls == [{"a", "b"}]
+    assert view.latest() == {"b": 5, "a": 2}
+    assert quiet.latest() == {"c": 7} and quiet.notifications == 0
+    assert not view.complete and "not-a-channel" not in view and view["not-a-channel"] is None
+
+    # Held back until min_interval_s has passed, then delivered together
+    bus.publish(0, 3, 3000)
+    assert bus.flush(now_s=105) == 110
+    bus.publish(1, None, None)  # flatlined
+    assert bus.flush(now_s=108) == 110
+    assert bus.flush(now_s=110) is None
+    assert calls == [{"a", "b"}, {"a", "b"}]
+    assert view.latest() == {"a": 3} and view.get("b", -1) == -1
+    assert view.notifications == 2
+
+
+def test_scada_channel_notifications(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    settings = ScadaSettings()
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    layout = House0Layout.load(settings.paths.hardware_layout)
+    scada = Scada(H0N.primary_scada, settings=settings, hardware_layout=layout)
+    home_alone = HomeAlone(H0N.home_alone, services=scada)
+    calls = []
+    view = scada.data.subscribe_channels("test", [H0CN.hp_odu_pwr, H0CN.hp_idu_pwr], lambda v, c: calls.append(c))
+
+    # One call per ingested message, with the subscribed channels that changed
+    now_ms = int(time.time() * 1000)
+    readings_by_node = {}
+    for name in home_alone.buffer_channel_names + [H0CN.hp_odu_pwr, H0CN.hp_idu_pwr, H0CN.store_pump_pwr]:
+        ch = layout.data_channels[name]
+        readings_by_node.setdefault(ch.captured_by_node, []).append(name)
+    for node, names in readings_by_node.items():
+        scada.process_scada_message(
+            node,
+            SyncedReadings(ChannelNameList=names, ValueList=[50_000] * len(names), ScadaReadTimeUnixMs=now_ms),
+        )
+    assert calls == [{H0CN.hp_odu_pwr, H0CN.hp_idu_pwr}]
+    assert view.latest() == {H0CN.hp_odu_pwr: 50_000, H0CN.hp_idu_pwr: 50_000}
+
+    # HomeAlone reads its view, and its main loop is woken once it has what it needs
+    assert home_alone.temperature_channels.latest(home_alone.temperature_channel_names) == {
+        name: 50_000 for name in home_alone.buffer_channel_names
+    }
+    assert not home_alone._wake_main_loop.is_set()
+    for name in [H0N.usable_energy, H0N.required_energy]:
+        scada.data.update_latest(name, 20_000, now_ms)
+    # held back by the rate limit of HomeAlone, notified of the buffer temperatures just now
+    scada.notify_channel_subscribers()
+    assert not home_alone._wake_main_loop.is_set()
+    scada.data.channel_bus.flush(time.monotonic() + HomeAlone.TEMPERATURES_CHANGED_MIN_INTERVAL_S)
+    assert home_alone._wake_main_loop.is_set()
+    home_alone.get_latest_temperatures()
+    assert home_alone.temperatures_available
+
+    # A flatlined channel drops out of the views
+    ch = layout.data_channels[H0CN.buffer.depth1]
+    scada.process_scada_message(
+        ch.captured_by_node,
+        ChannelReadings(ChannelName=ch.Name, ValueList=[51_000], ScadaReadTimeUnixMsList=[now_ms + 1]),
+    )
+    assert home_alone.temperature_channels[ch.Name] == 51_000
+    scada.data.flush_channel_from_latest(ch.Name)
+    assert ch.Name not in home_alone.temperature_channels
@@ -0,0 +1,390 @@
+"""Tests for the FLO graph (actors.flo) on a small generated super graph"""
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from actors.dijkstra_types import DEdge, DNode
+from actors.flo import DGraph
+from actors.flo_benchmark import DGRAPH_PHASES, PhaseRecorder, run_benchmark
+from actors.flo_process import FloProcess
+from actors.super_graph import SuperGraph, SUPER_GRAPH_FILE, SUPER_GRAPH_JSON_FILE, convert_json_to_binary
+from actors.super_graph_generator import SuperGraphGenerator, SUPER_GRAPH_CHUNK_DIR
+from named_types import FloParamsHouse0, PriceQuantityUnitless
+
+NUM_LAYERS = 6
+HP_MAX_ELEC_KW = 3
+
+
+def flo_params(horizon: int = 24, **kwargs) -> FloParamsHouse0:
+    d = dict(
+        GNodeAlias="d1.isone.ver.keene.holly",
+        StartUnixS=1734476700,
+        HorizonHours=horizon,
+        NumLayers=NUM_LAYERS,
+        HpMaxElecKw=HP_MAX_ELEC_KW,
+        InitialTopTempF=150,
+        InitialMiddleTempF=130,
+        InitialBottomTempF=100,
+        InitialThermocline1=3,
+        InitialThermocline2=5,
+        LmpForecast=[50 + 37 * ((i * 7) % 5) for i in range(72)],
+        DistPriceForecast=[40 + (i % 3) * 20 for i in range(72)],
+        RegPriceForecast=[10] * 72,
+        OatForecastF=[20 + (i * 5) % 17 for i in range(72)],
+        WindSpeedForecastMph=[5] * 72,
+        AlphaTimes10=120,
+        BetaTimes100=-22,
+        GammaEx6=0,
+        IntermediatePowerKw=1.5,
+        IntermediateRswtF=100,
+        DdPowerKw=5,
+        DdRswtF=160,
+        DdDeltaTF=20,
+        MaxEwtF=170,
+    )
+    d.update(kwargs)
+    return FloParamsHouse0(**d)
+
+
+@pytest.fixture(scope="session")
+def super_graph_dir(tmp_path_factory) -> Path:
+    """Generate a small super graph once, in both the binary and the json format"""
+    d = tmp_path_factory.mktemp("super_graph")
+    with pytest.MonkeyPatch.context() as m:
+        m.chdir(d)
+        generator = SuperGraphGenerator(flo_params())
+        generator.generate()
+        generator.save_to_json()
+    return d
+
+
+@pytest.fixture
+def flo_dir(super_graph_dir, tmp_path, monkeypatch) -> Path:
+    """Run in a directory containing the generated super graph"""
+    for name in [SUPER_GRAPH_FILE, SUPER_GRAPH_JSON_FILE]:
+        shutil.copyfile(super_graph_dir / name, tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def solved(g: DGraph):
+    return {
+        (h, n.to_string()): (n.pathcost, n.next_node.to_string())
+        for h in range(g.params.horizon)
+        for n in g.nodes[h]
+    }
+
+
+def test_super_graph_binary_round_trip(flo_dir):
+    from_json = SuperGraph.from_json(SUPER_GRAPH_JSON_FILE)
+    from_binary = SuperGraph.load(SUPER_GRAPH_FILE)
+    assert isinstance(from_binary.transitions, np.memmap)
+    assert np.array_equal(from_json.store_heat_in, from_binary.store_heat_in)
+    assert np.array_equal(from_json.transitions, from_binary.transitions)
+    assert np.array_equal(from_json.nodes, from_binary.nodes)
+    assert from_binary.to_dict() == from_json.to_dict()
+
+    converted = flo_dir / "converted.bin"
+    convert_json_to_binary(SUPER_GRAPH_JSON_FILE, converted)
+    assert converted.read_bytes() == (flo_dir / SUPER_GRAPH_FILE).read_bytes()
+
+    (flo_dir / "bogus.bin").write_bytes(b"not a super graph")
+    with pytest.raises(ValueError):
+        SuperGraph.load(flo_dir / "bogus.bin")
+
+
+def test_parallel_resumable_generator(super_graph_dir, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = SuperGraphGenerator(flo_params())
+    generator.generate(processes=2)
+    assert (tmp_path / SUPER_GRAPH_FILE).read_bytes() == (super_graph_dir / SUPER_GRAPH_FILE).read_bytes()
+
+    # Resume: only the missing shard is generated again
+    chunks = sorted((tmp_path / SUPER_GRAPH_CHUNK_DIR).glob("transitions.*.npy"))
+    assert len(chunks) > 2
+    (tmp_path / SUPER_GRAPH_FILE).unlink()
+    chunks[1].unlink()
+    mtimes = {chunk: chunk.stat().st_mtime_ns for chunk in chunks if chunk != chunks[1]}
+    SuperGraphGenerator(flo_params()).generate(processes=2)
+    assert chunks[1].exists()
+    assert all(chunk.stat().st_mtime_ns == mtime for chunk, mtime in mtimes.items())
+    assert (tmp_path / SUPER_GRAPH_FILE).read_bytes() == (super_graph_dir / SUPER_GRAPH_FILE).read_bytes()
+
+    # Chunks from different tank parameters are discarded
+    SuperGraphGenerator(flo_params(StorageVolumeGallons=240)).generate(processes=2)
+    assert (tmp_path / SUPER_GRAPH_FILE).read_bytes() != (super_graph_dir / SUPER_GRAPH_FILE).read_bytes()
+
+
+def test_store_heat_in_quantizer(flo_dir):
+    super_graph = SuperGraph.load(SUPER_GRAPH_FILE)
+    steps = np.asarray(super_graph.store_heat_in)
+    rng = np.random.default_rng(0)
+    store_heat_in = np.concatenate([
+        rng.uniform(steps[0] - 5, steps[-1] + 5, 10000),
+        # midpoints between steps and the steps themselves
+        (steps[:-1] + steps[1:]) / 2,
+        steps,
+    ])
+    expected = np.array([abs(steps - x).argmin() for x in store_heat_in])
+    assert np.array_equal(super_graph.store_heat_in_idx(store_heat_in), expected)
+
+
+def test_dgraph_json_fallback(flo_dir):
+    logger = logging.getLogger("flo")
+    params = flo_params()
+    g_binary = DGraph(params, logger)
+    g_binary.solve_dijkstra()
+    g_binary.generate_bid()
+
+    (flo_dir / SUPER_GRAPH_FILE).unlink()
+    g_json = DGraph(params, logger)
+    g_json.solve_dijkstra()
+    g_json.generate_bid()
+
+    assert solved(g_binary) == solved(g_json)
+    assert g_binary.pq_pairs == g_json.pq_pairs
+
+
+@pytest.mark.parametrize("params", [
+    flo_params(),
+    flo_params(48, HpIsOff=True),
+    flo_params(12, InitialTopTempF=170, InitialMiddleTempF=160, InitialThermocline1=5, InitialThermocline2=6),
+    flo_params(24, InitialTopTempF=100, InitialMiddleTempF=80, InitialBottomTempF=80, InitialThermocline2=3, BufferAvailableKwh=2),
+])
+def test_vectorized_solver(flo_dir, params):
+    logger = logging.getLogger("flo")
+    g = DGraph(params, logger)
+    g.solve_dijkstra()
+    g.generate_bid()
+
+    g_vectorized = DGraph(params, logger, vectorized_solver=True)
+    g_vectorized.solve_dijkstra()
+    g_vectorized.generate_bid()
+
+    assert solved(g_vectorized) == solved(g)
+    assert g_vectorized.pq_pairs == g.pq_pairs
+
+
+def test_node_and_edge_views(flo_dir):
+    g = DGraph(flo_params(), logging.getLogger("flo"), vectorized_solver=True)
+    g.solve_dijkstra()
+    table = g.node_table
+    assert len(g.nodes) == g.params.horizon + 1
+    assert all(len(layer) == table.num_nodes for layer in g.nodes)
+    # Node state is stored once, not per time slice
+    assert table.pathcost.shape == (g.params.horizon + 1, table.num_nodes)
+    assert table.next_node_idx.shape == (g.params.horizon, table.num_nodes)
+
+    node = g.nodes[3][5]
+    assert not hasattr(node, "__dict__")
+    assert node == g.nodes[3][5] and node != g.nodes[4][5]
+    assert node.energy == DNode(
+        parameters=g.params,
+        top_temp=node.top_temp,
+        middle_temp=node.middle_temp,
+        bottom_temp=node.bottom_temp,
+        thermocline1=node.thermocline1,
+        thermocline2=node.thermocline2,
+    ).energy
+    assert node.next_node.time_slice == 4
+    assert g.nodes[g.params.horizon][0].pathcost == 0
+    assert g.nodes[g.params.horizon][0].next_node is None
+
+    edges = g.edges[node]
+    assert 1 <= len(edges) <= DGraph.MAX_HP_HEAT_OUT_LEVELS
+    assert all(e.tail == node and e.head.time_slice == 4 for e in edges)
+    best_edge = min(edges, key=lambda e: e.head.pathcost + e.cost)
+    assert node.pathcost == best_edge.head.pathcost + best_edge.cost
+    assert node.next_node == best_edge.head
+
+
+def test_persistent_graph_refresh(flo_dir):
+    logger = logging.getLogger("flo")
+    g = DGraph(flo_params(), logger, vectorized_solver=True, persistent=True)
+    g.solve_dijkstra()
+    node_table = g.node_table
+
+    for params in [
+        flo_params(48, LmpForecast=[200 - i for i in range(72)], HpIsOff=True),
+        flo_params(12, InitialTopTempF=170, InitialMiddleTempF=160, InitialThermocline1=5, InitialThermocline2=6),
+    ]:
+        g.refresh(params)
+        assert g.node_table is node_table
+        g.solve_dijkstra()
+        g.generate_bid()
+        fresh = DGraph(params, logger, vectorized_solver=True)
+        fresh.solve_dijkstra()
+        fresh.generate_bid()
+        assert solved(g) == solved(fresh)
+        assert g.pq_pairs == fresh.pq_pairs
+
+    # Tank parameters changed: full rebuild
+    params = flo_params(StorageVolumeGallons=240)
+    g.refresh(params)
+    assert g.node_table is not node_table
+    g.solve_dijkstra()
+    fresh = DGraph(params, logger, vectorized_solver=True)
+    fresh.solve_dijkstra()
+    assert solved(g) == solved(fresh)
+
+
+def loop_pq_pairs(bid_edges, forecasted_cop, price_range_usd_mwh):
+    """The original per-price loop of DGraph.generate_bid"""
+    pq_pairs = []
+    edge_cost = {}
+    for price_usd_mwh in price_range_usd_mwh:
+        for edge in bid_edges:
+            edge_cost[edge] = edge.cost if edge.cost >= 1e4 else edge.hp_heat_out/forecasted_cop * price_usd_mwh/1000
+        best_edge = min(bid_edges, key=lambda e: e.head.pathcost + edge_cost[e])
+        best_quantity_kwh = max(0, best_edge.hp_heat_out/forecasted_cop)
+        if not pq_pairs or (pq_pairs[-1].QuantityTimes1000-int(best_quantity_kwh*1000)>10):
+            pq_pairs.append(
+                PriceQuantityUnitless(
+                    PriceTimes1000 = int(price_usd_mwh * 1000),
+                    QuantityTimes1000 = int(best_quantity_kwh * 1000))
+            )
+    return pq_pairs
+
+
+def test_vectorized_pq_pairs_match_loop():
+    rng = np.random.default_rng(1)
+    forecasted_cop = 2.3
+    price_range_usd_mwh = sorted(list(range(-100, 2000)) + [123.456])
+    for _ in range(50):
+        num_edges = int(rng.integers(1, 8))
+        bid_edges = [
+            DEdge(
+                tail=None,
+                head=SimpleNamespace(pathcost=float(rng.uniform(0, 50))),
+                cost=float(rng.choice([0, rng.uniform(0, 5), 1e5 + rng.uniform(0, 5)])),
+                hp_heat_out=float(rng.choice([0, rng.uniform(0, 30)])),
+            )
+            for _ in range(num_edges)
+        ]
+        expected = loop_pq_pairs(bid_edges, forecasted_cop, price_range_usd_mwh)
+        pq_pairs = DGraph.get_pq_pairs(bid_edges, forecasted_cop, np.array(price_range_usd_mwh))
+        assert pq_pairs == expected
+
+
+def test_generate_bid_price_grid(flo_dir):
+    g = DGraph(flo_params(LmpForecast=[150 + 100 * (i % 2) for i in range(72)]), logging.getLogger("flo"))
+    g.solve_dijkstra()
+    g.generate_bid()
+    forecasted_cop = g.params.COP(oat=g.params.oat_forecast[0])
+    price_range_usd_mwh = sorted(list(range(-100, 2000)) + [g.params.elec_price_forecast[0]*10])
+    assert g.pq_pairs == loop_pq_pairs(g.bid_edges[g.initial_node], forecasted_cop, price_range_usd_mwh)
+
+    g.generate_bid(min_price_usd_mwh=0, max_price_usd_mwh=500, price_step_usd_mwh=0.5)
+    price_range_usd_mwh = sorted([x/2 for x in range(0, 1000)] + [g.params.elec_price_forecast[0]*10])
+    assert g.pq_pairs == loop_pq_pairs(g.bid_edges[g.initial_node], forecasted_cop, price_range_usd_mwh)
+
+
+def test_scenarios(flo_dir):
+    logger = logging.getLogger("flo")
+    base = flo_params(48)
+    rng = np.random.default_rng(3)
+    scenarios = [base] + [
+        flo_params(
+            48,
+            LmpForecast=[round(max(0.0, x + rng.normal(0, 30)), 2) for x in base.LmpForecast],
+            OatForecastF=[round(x + rng.normal(0, 4), 1) for x in base.OatForecastF],
+            HpIsOff=bool(i % 2),
+            BufferAvailableKwh=i,
+        )
+        for i in range(4)
+    ]
+    g = DGraph(base, logger, vectorized_solver=True)
+    table = g.solve_scenarios(scenarios)
+    g.generate_scenario_bids()
+    assert table.pathcost.shape == (len(scenarios), 49, g.node_table.num_nodes)
+
+    for s, params in enumerate(scenarios):
+        fresh = DGraph(params, logger, vectorized_solver=True)
+        fresh.solve_dijkstra()
+        fresh.generate_bid()
+        assert np.array_equal(table.pathcost[s], fresh.node_table.pathcost)
+        assert np.array_equal(table.next_node_idx[s], fresh.node_table.next_node_idx)
+        assert g.scenario_pathcosts[s] == fresh.initial_node.pathcost
+        assert g.scenario_pq_pairs[s] == fresh.pq_pairs
+    assert any(pq_pairs != g.scenario_pq_pairs[0] for pq_pairs in g.scenario_pq_pairs[1:])
+
+    # The aggregated quantity is the weighted mean of the scenario quantities at every price
+    g.generate_scenario_bids(weights=[1] + [0] * (len(scenarios) - 1))
+    assert g.aggregated_pq_pairs == g.scenario_pq_pairs[0]
+    g.generate_scenario_bids()
+    quantities = [q.QuantityTimes1000 for q in g.aggregated_pq_pairs]
+    assert quantities == sorted(quantities, reverse=True)
+    assert min(pq[0].QuantityTimes1000 for pq in g.scenario_pq_pairs) <= quantities[0]
+    assert quantities[0] <= max(pq[0].QuantityTimes1000 for pq in g.scenario_pq_pairs)
+
+    with pytest.raises(ValueError):
+        g.solve_scenarios([flo_params(48, InitialTopTempF=170)])
+    with pytest.raises(ValueError):
+        g.generate_scenario_bids(weights=[1, 2])
+
+
+def test_flo_process(flo_dir):
+    params = flo_params()
+    g = DGraph(params, logging.getLogger("flo"), vectorized_solver=True)
+    g.solve_dijkstra()
+    g.generate_bid()
+    process = FloProcess(vectorized_solver=True)
+    try:
+        assert process.solve(params) > 0
+        assert process.generate_bid(params) == g.pq_pairs
+
+        # The worker's DGraph log lines come back with the result
+        class ListHandler(logging.Handler):
+            def __init__(self):
+                super().__init__()
+                self.messages = []
+
+            def emit(self, record):
+                self.messages.append(record.getMessage())
+
+        handler = ListHandler()
+        logger = logging.getLogger("flo_process_test")
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        try:
+            process.solve(params, logger=logger)
+            assert any(m.startswith("Solved Dijkstra") for m in handler.messages)
+            # Not persistent: the graph was dropped after the first bid, so it is rebuilt
+            assert process.generate_bid(params, logger=logger) == g.pq_pairs
+            assert process.generate_bid(params, logger=logger) == g.pq_pairs
+            assert any(m.startswith("Done (") for m in handler.messages)
+        finally:
+            logger.removeHandler(handler)
+        with pytest.raises(ValueError):
+            process.generate_bid()
+    finally:
+        process.shutdown()
+
+
+def test_flo_benchmark(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Tracing super graph generation is slow, the traced pass is checked on its own below
+    results = json.loads(json.dumps(
+        run_benchmark(horizons=[24, 48], num_layers=[6], repeat=2, trace_allocations=False)
+    ))
+    assert os.getcwd() == str(tmp_path)
+    assert [(r["num_layers"], r["horizon"]) for r in results["runs"]] == [(6, 24), (6, 48)]
+    [super_graph] = results["super_graphs"]
+    assert super_graph["num_nodes"] == results["runs"][0]["num_nodes"]
+    for phases in [super_graph["phases"]] + [r["phases"] for r in results["runs"]]:
+        for metrics in phases.values():
+            assert metrics["wall_s"] >= 0
+            assert metrics["peak_rss_mb"] > 0
+    assert all(list(r["phases"]) == list(DGRAPH_PHASES) for r in results["runs"])
+    assert all(r["num_pq_pairs"] > 1 for r in results["runs"])
+
+    recorder = PhaseRecorder(traced=True)
+    assert len(recorder.run("allocate", lambda: [object() for _ in range(10000)])) == 10000
+    assert recorder.phases["allocate"]["allocated_blocks"] >= 10000
+    assert recorder.phases["allocate"]["traced_net_mb"] > 0
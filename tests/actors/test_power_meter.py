@@ -1,9 +1,13 @@
 import argparse
 import asyncio
 import logging
+import struct
 import typing
+import uuid
 
-from gwproto.enums import ActorClass
+from gwproto.enums import ActorClass, MakeModel, TelemetryName
+from gwproto.named_types import ElectricMeterCacGt, ElectricMeterComponentGt
+from gwproto.type_helpers import CACS_BY_MAKE_MODEL
 from data_classes.house_0_layout import House0Layout
 from tests.utils.fragment_runner import AsyncFragmentRunner
 from tests.utils.fragment_runner import ProtocolFragment
@@ -16,14 +20,22 @@ import actors
 import pytest
 from gwproto.named_types import DataChannelGt
 from actors import Scada
+from actors.power_meter import AdaptivePollScheduler
 from actors.power_meter import DriverThreadSetupHelper
 from actors.power_meter import PowerMeter
 from actors.power_meter import PowerMeterDriverThread
 from actors.config import ScadaSettings
 from gwproto.data_classes.components.electric_meter_component import ElectricMeterComponent
+from drivers.power_meter.egauge.registers import coalesce_registers
+from drivers.power_meter.egauge_4030__power_meter_driver import (
+    EGaugeReadFailed,
+    EGaugeReadOutOfRange,
+    EGuage4030_PowerMeterDriver,
+)
 from drivers.power_meter.gridworks_sim_pm1__power_meter_driver import (
     GridworksSimPm1_PowerMeterDriver,
 )
+from layout_gen.egauge import EgaugeChannelConfig
 from gwproactor.config import LoggerLevels
 from gwproactor.config import LoggingSettings
 from gwproto.messages import PowerWatts
@@ -111,6 +123,145 @@ def test_power_meter_small():
     driver_thread.report_aggregated_power_w()
     assert driver_thread.latest_agg_power_w == 300
 
+def test_adaptive_poll_scheduler():
+    scheduler = AdaptivePollScheduler(fast_period_ms=1000, idle_period_ms=5000)
+    periods = [scheduler.update(active=False) for _ in range(AdaptivePollScheduler.QUIET_POLLS_BEFORE_BACKOFF + 3)]
+    assert periods[:AdaptivePollScheduler.QUIET_POLLS_BEFORE_BACKOFF - 1] == [1000] * 9
+    assert periods[-4:] == [2000, 4000, 5000, 5000]
+    assert scheduler.update(active=True) == 1000
+    assert scheduler.update(active=False) == 1000
+
+    # No idle period: always the fastest
+    scheduler = AdaptivePollScheduler(fast_period_ms=1000, idle_period_ms=0)
+    assert {scheduler.update(active=False) for _ in range(30)} == {1000}
+
+
+def test_power_meter_adaptive_polling():
+    settings = ScadaSettings(power_meter_idle_poll_period_ms=8000)
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    layout = House0Layout.load(settings.paths.hardware_layout)
+    scada = Scada(H0N.primary_scada, settings, layout)
+    meter = PowerMeter(H0N.primary_power_meter, services=scada)
+    driver_thread: PowerMeterDriverThread = meter._sync_thread
+    driver_thread.set_async_loop(asyncio.new_event_loop(), asyncio.Queue())
+    fast_s = driver_thread.poll_scheduler.fast_period_ms / 1000
+    capture_s = min(cfg.CapturePeriodS for cfg in driver_thread.eq_reporting_config.values())
+    assert capture_s > 8
+
+    # Stable power: back off to the idle period
+    sleeps = []
+    for _ in range(20):
+        driver_thread._iterate()
+        sleeps.append(driver_thread._iterate_sleep_seconds)
+    assert sleeps[0] == pytest.approx(fast_s, abs=0.05)
+    assert sleeps[-1] == pytest.approx(8, abs=0.05)
+
+    # Power changing: straight back to the fastest polling
+    driver_thread.driver.fake_power_w += 1000
+    driver_thread._iterate()
+    assert driver_thread._iterate_sleep_seconds == pytest.approx(fast_s, abs=0.05)
+
+    # Never past the next synced reading
+    for ch in driver_thread.my_channels:
+        driver_thread._last_sampled_s[ch] -= capture_s - 2
+    for _ in range(20):
+        driver_thread._iterate()
+    assert driver_thread._iterate_sleep_seconds <= 2
+
+
+class FakeModbusClient:
+    """Input registers holding f32 values, counting the read_input_registers calls"""
+
+    is_open = True
+    last_error = 0
+    last_error_as_txt = ""
+    last_except = 0
+    last_except_as_txt = ""
+    last_except_as_full_txt = ""
+
+    def __init__(self, values_by_address: dict[int, float]):
+        self.registers: dict[int, int] = {}
+        for address, value in values_by_address.items():
+            high, low = struct.unpack(">HH", struct.pack(">f", value))
+            self.registers[address] = high
+            self.registers[address + 1] = low
+        self.reads: list[tuple[int, int]] = []
+
+    def read_input_registers(self, address: int, count: int):
+        self.reads.append((address, count))
+        if any(a not in self.registers for a in range(address, address + count)):
+            return None
+        return [self.registers[a] for a in range(address, address + count)]
+
+    def close(self):
+        ...
+
+
+def test_coalesce_registers():
+    assert coalesce_registers([], num_registers=2) == []
+    assert coalesce_registers([504, 500, 502, 510, 512, 502], num_registers=2) == [(500, 6), (510, 4)]
+    assert coalesce_registers(range(0, 200, 2), num_registers=2) == [(0, 124), (124, 76)]
+
+
+def test_egauge_bulk_read():
+    settings = ScadaSettings()
+    settings.paths.mkdirs()
+    layout = House0Layout.load(settings.paths.hardware_layout)
+    meter_node = layout.node(H0N.primary_power_meter)
+    channels = [layout.data_channels[cfg.ChannelName] for cfg in meter_node.component.gt.ConfigList]
+    assert len(channels) == 3
+    # Contiguous registers, except the last channel
+    addresses = {ch.Name: 9000 + 2 * i for i, ch in enumerate(channels)}
+    addresses[channels[-1].Name] = 9100
+    component = ElectricMeterComponent(
+        gt=ElectricMeterComponentGt(
+            ComponentId=str(uuid.uuid4()),
+            ComponentAttributeClassId=CACS_BY_MAKE_MODEL[MakeModel.EGAUGE__4030],
+            ConfigList=[
+                EgaugeChannelConfig(AboutNodeName=ch.AboutNodeName, EGaugeAddress=addresses[ch.Name]).channel_config(
+                    ChannelName=ch.Name
+                )
+                for ch in channels
+            ],
+            ModbusHost="localhost",
+            ModbusPort=502,
+        ),
+        cac=ElectricMeterCacGt(
+            ComponentAttributeClassId=CACS_BY_MAKE_MODEL[MakeModel.EGAUGE__4030],
+            MakeModel=MakeModel.EGAUGE__4030,
+            MinPollPeriodMs=1000,
+            TelemetryNameList=[TelemetryName.PowerW],
+        ),
+    )
+    driver = EGuage4030_PowerMeterDriver(component, settings, logger=logging.getLogger("test"))
+    power = {ch.Name: 100.0 * i + 0.5 for i, ch in enumerate(channels)}
+    power[channels[1].Name] = 50_000.0
+    client = FakeModbusClient({addresses[name]: value for name, value in power.items()})
+    driver._modbus_client = client
+
+    read = driver.read_telemetry_values(channels)
+    assert read.is_ok()
+    # One read for the contiguous registers, one for the last channel
+    assert client.reads == [(9000, 2 * (len(channels) - 1)), (9100, 2)]
+    expected = {name: int(value) for name, value in power.items()}
+    expected[channels[1].Name] = 2**15 - 1
+    assert read.value.value == expected
+    assert [type(w) for w in read.value.warnings] == [EGaugeReadOutOfRange]
+
+    # Same values as the channel by channel reads
+    for ch in channels:
+        assert driver.read_power_w(ch).value.value == expected[ch.Name]
+
+    # A failed block read leaves its channels without value
+    del client.registers[9100]
+    read = driver.read_telemetry_values(channels)
+    assert read.value.value[channels[-1].Name] is None
+    assert read.value.value[channels[0].Name] == expected[channels[0].Name]
+    assert EGaugeReadFailed in [type(w) for w in read.value.warnings]
+
+
 # These tests no longer pass because the code requires many of its actors to be fired up
 # including synth-generator ,home-alone, atomic-ally, all the relays & dfrs & multiplexers
 # @pytest.mark.asyncio
@@ -0,0 +1,116 @@
+"""Tests for the columnar Report encoding of the upstream link (actors.report_codec)"""
+import uuid
+
+import numpy as np
+import pytest
+from gwproactor_test.certs import copy_keys, uses_tls
+from gwproto.messages import ChannelReadings, Report, ReportEvent
+from gwproto.named_types import MachineStates
+
+from actors import Scada
+from actors.config import ScadaSettings
+from actors.report_codec import decode_report, encode_report
+from data_classes.house_0_layout import House0Layout
+from data_classes.house_0_names import H0N
+from named_types import CompactReportEvent, ReportEncoding
+
+SLOT_START_S = 1_700_000_100
+
+
+def channel_readings(name: str, period_ms: int, values: np.ndarray, jitter_ms: int, rng) -> ChannelReadings:
+    read_ms = SLOT_START_S * 1000 + 137 + np.arange(len(values)) * period_ms
+    read_ms += rng.integers(0, jitter_ms + 1, len(values))
+    return ChannelReadings(
+        ChannelName=name,
+        ValueList=values.astype(int).tolist(),
+        ScadaReadTimeUnixMsList=np.sort(read_ms).tolist(),
+    )
+
+
+def five_minute_report() -> Report:
+    """Flow, power and temperature channels over a 5 minute slot"""
+    rng = np.random.default_rng(0)
+    readings = [
+        # 1 Hz flows, 0.1 Hz power, temperatures every 5 s, and a quiet channel
+        channel_readings(f"flow-{i}", 1000, 340 + np.cumsum(rng.integers(-3, 4, 300)), 2, rng) for i in range(4)
+    ] + [
+        channel_readings(f"power-{i}", 10_000, 4200 + np.cumsum(rng.integers(-60, 61, 30)), 0, rng) for i in range(6)
+    ] + [
+        channel_readings(f"temp-{i}", 5000, 52_000 + np.cumsum(rng.integers(-20, 21, 60)), 20, rng) for i in range(20)
+    ] + [
+        channel_readings("empty", 1000, np.array([]), 0, rng),
+        channel_readings("negative", 1000, np.array([-5, -5_000_000, 7]), 0, rng),
+    ]
+    return Report(
+        FromGNodeAlias="hw1.isone.me.versant.keene.beech.scada",
+        FromGNodeInstanceId=str(uuid.uuid4()),
+        AboutGNodeAlias="hw1.isone.me.versant.keene.beech.ta",
+        SlotStartUnixS=SLOT_START_S,
+        SlotDurationS=300,
+        ChannelReadingList=readings,
+        StateList=[
+            MachineStates(
+                MachineHandle="auto.h",
+                StateEnum="home.alone.state",
+                StateList=["HpOnStoreOff"],
+                UnixMsList=[SLOT_START_S * 1000 + 5000],
+            )
+        ],
+        FsmReportList=[],
+        MessageCreatedMs=(SLOT_START_S + 300) * 1000,
+        Id=str(uuid.uuid4()),
+    )
+
+
+@pytest.mark.parametrize("encoding", ["columnar", "columnar.zlib"])
+def test_report_codec(encoding):
+    report = five_minute_report()
+    compact = encode_report(report, encoding)
+    assert decode_report(compact) == report
+    assert decode_report(CompactReportEvent.model_validate_json(
+        CompactReportEvent(Report=compact).model_dump_json()
+    ).Report) == report
+
+    # Bytes on the wire, as the json of the events
+    json_bytes = len(ReportEvent(Report=report).model_dump_json())
+    compact_bytes = len(CompactReportEvent(Report=compact).model_dump_json())
+    assert compact_bytes < json_bytes / (4 if encoding == "columnar" else 5)
+
+
+def test_report_codec_errors():
+    with pytest.raises(ValueError):
+        encode_report(five_minute_report(), "zstd")
+    report = five_minute_report()
+    compact = encode_report(report).model_copy(update={"ChannelNameList": ["flow-0"]})
+    with pytest.raises(ValueError):
+        decode_report(compact)
+
+
+def test_scada_report_encoding_negotiation():
+    settings = ScadaSettings(compact_reports=True)
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    layout = House0Layout.load(settings.paths.hardware_layout)
+    scada = Scada(H0N.primary_scada, settings, layout)
+    events = []
+    scada.generate_event = events.append
+    scada.send_report()
+    assert isinstance(events[-1], ReportEvent)
+
+    encoding = ReportEncoding(
+        FromGNodeAlias=layout.atn_g_node_alias, Encoding="columnar.zlib", UnixTimeMs=SLOT_START_S * 1000
+    )
+    scada.process_report_encoding(scada.layout.node(H0N.home_alone), encoding)
+    assert scada.report_encoding == "json"
+    scada.process_report_encoding(scada.atn, encoding)
+    scada.send_report()
+    assert isinstance(events[-1], CompactReportEvent)
+    stored = scada.data.reports_to_store.get(events[-1].Report.Id)
+    assert decode_report(events[-1].Report) == stored
+
+    # Not without compact_reports
+    scada.settings.compact_reports = False
+    scada.report_encoding = "json"
+    scada.process_report_encoding(scada.atn, encoding)
+    assert scada.report_encoding == "json"
@@ -0,0 +1,98 @@
+"""Tests for the bounded report store of the Scada (actors.report_store)"""
+import uuid
+from typing import List, Optional
+
+from gwproto.messages import ChannelReadings, Report
+
+from actors.config import ReportStoreSettings
+from actors.report_store import ReportStore
+
+SLOT_S = 300
+START_S = 1_700_000_100
+
+
+def make_report(slot: int) -> Report:
+    slot_start_s = START_S + slot * SLOT_S
+    return Report(
+        FromGNodeAlias="hw1.isone.me.versant.keene.beech.scada",
+        FromGNodeInstanceId=str(uuid.uuid4()),
+        AboutGNodeAlias="hw1.isone.me.versant.keene.beech.ta",
+        SlotStartUnixS=slot_start_s,
+        SlotDurationS=SLOT_S,
+        ChannelReadingList=[
+            ChannelReadings(
+                ChannelName="hp-idu-pwr",
+                ChannelId=str(uuid.uuid4()),
+                ValueList=list(range(slot, slot + 20)),
+                ScadaReadTimeUnixMsList=[slot_start_s * 1000 + i * 15_000 for i in range(20)],
+            )
+        ],
+        StateList=[],
+        FsmReportList=[],
+        MessageCreatedMs=(slot_start_s + SLOT_S) * 1000,
+        Id=str(uuid.uuid4()),
+    )
+
+
+def stored(store: ReportStore, reports: List[Report]) -> List[Optional[Report]]:
+    return [store.get_by_slot(report.SlotStartUnixS) for report in reports]
+
+
+def test_report_store(tmp_path):
+    settings = ReportStoreSettings(max_in_memory=3, reports_per_segment=2, max_segments=2)
+    store = ReportStore(tmp_path / "reports", settings)
+    reports = [make_report(slot) for slot in range(10)]
+    for report in reports:
+        store.add(report)
+
+    # 3 in memory, 7 spilled to segments of 2: the 2 oldest segments dropped
+    stats = store.stats()
+    assert (stats.reports_in_memory, stats.reports_on_disk, stats.segments) == (3, 3, 2)
+    assert (stats.spilled, stats.dropped) == (7, 4)
+    assert stats.memory_bytes == sum(len(r.model_dump_json()) for r in reports[-3:])
+    assert stats.disk_bytes > 0
+    assert len(store) == 6
+    assert reports[3].Id not in store and store.get(reports[3].Id) is None
+    assert store.get_by_slot(reports[0].SlotStartUnixS) is None
+
+    # Lookups by Id and slot, from memory and from disk
+    assert store.get(reports[9].Id) is reports[9]
+    assert store.get(reports[5].Id) == reports[5]
+    assert store.get_by_slot(reports[4].SlotStartUnixS) == reports[4]
+    assert store.stats().disk_reads == 2
+    assert stored(store, reports[5:]) == reports[5:]
+
+    # A new store finds the spilled reports again, and does not append to their segments
+    restarted = ReportStore(tmp_path / "reports", settings)
+    assert stored(restarted, reports) == [None] * 4 + reports[4:7] + [None] * 3
+    last_segment = max((tmp_path / "reports").iterdir())
+    last_segment_bytes = last_segment.stat().st_size
+    new_reports = reports[7:] + [make_report(10)]
+    for report in new_reports:
+        restarted.add(report)
+    assert last_segment.stat().st_size == last_segment_bytes
+    assert stored(restarted, reports[6:] + new_reports[-1:]) == [reports[6]] + new_reports
+    assert restarted.get(reports[5].Id) is None
+
+
+def test_report_store_truncated_segment(tmp_path):
+    settings = ReportStoreSettings(max_in_memory=1, reports_per_segment=10, max_segments=2)
+    store = ReportStore(tmp_path / "reports", settings)
+    reports = [make_report(slot) for slot in range(4)]
+    for report in reports:
+        store.add(report)
+    (segment,) = (tmp_path / "reports").iterdir()
+    data = segment.read_bytes()
+    segment.write_bytes(data[:-50])
+    restarted = ReportStore(tmp_path / "reports", settings)
+    assert stored(restarted, reports) == reports[:2] + [None, None]
+
+
+def test_report_store_without_spill_dir():
+    store = ReportStore(None, ReportStoreSettings(max_in_memory=2))
+    reports = [make_report(slot) for slot in range(5)]
+    for report in reports:
+        store.add(report)
+    assert len(store) == 2
+    assert store.stats().dropped == 3
+    assert stored(store, reports) == [None] * 3 + reports[3:]
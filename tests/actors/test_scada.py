@@ -1,10 +1,12 @@
 """Test Scada"""
 import logging
+import random
 import time
 from typing import cast
 
 from gwproto.messages import ReportEvent
 from gwproto.messages import ChannelReadings
+from gwproto.messages import SyncedReadings
 
 from data_classes.house_0_layout import House0Layout
 from tests.atn import AtnSettings
@@ -18,8 +20,11 @@ from gwproactor_test.certs import copy_keys
 
 import pytest
 from actors import Scada
+from actors.scada import ScadaRouteKind
 from actors.config import ScadaSettings
-from named_types import SnapshotSpaceheat
+from actors.scada_data import ChannelBuffer, ScadaData
+from gwproto import Message
+from named_types import GoDormant, SnapshotSpaceheat
 from gwproto.messages import Report
 from data_classes.house_0_names import H0N, H0CN
 
@@ -53,13 +58,11 @@ def test_scada_small():
 
     ch = scada._layout.data_channels[H0CN.store_pump_pwr]
 
-    scada._data.recent_channel_values[ch.Name] = [43]
-    scada._data.recent_channel_unix_ms[ch.Name] = [
-        int(time.time() * 1000)
-    ]
+    scada._data.recent_readings[ch.Name].append(43, int(time.time() * 1000))
     
     s = scada._data.make_channel_readings(ch=ch)
     assert isinstance(s, ChannelReadings)
+    assert s.ValueList == [43]
 
 
     scada.send_report()
@@ -83,6 +86,233 @@ def test_scada_small():
     assert scada.time_to_send_report() is True
 
 
+def test_channel_buffer():
+    buffer = ChannelBuffer(capacity=2)
+    assert not buffer
+    buffer.append(1, 1000)
+    buffer.extend([2, 3, 4], [2000, 3000, 4000])
+    assert len(buffer) == 4
+    assert buffer.capacity == 4
+    assert buffer.grows == 1
+    assert buffer.value_list() == [1, 2, 3, 4]
+    assert buffer.unix_ms_list() == [1000, 2000, 3000, 4000]
+    with pytest.raises(ValueError):
+        buffer.extend([5], [])
+    buffer.clear()
+    assert buffer.value_list() == []
+    assert buffer.capacity == 4
+    assert buffer.total == 4
+    buffer.append(-5, 5000)
+    assert buffer.value_list() == [-5]
+
+
+def test_scada_data_channel_buffers():
+    settings = ScadaSettings()
+    layout = House0Layout.load(settings.paths.hardware_layout)
+    data = ScadaData(settings, layout)
+    ch = layout.data_channels[H0CN.store_pump_pwr]
+    now_ms = int(time.time() * 1000)
+    data.recent_readings[ch.Name].extend([1, 2], [now_ms, now_ms + 1])
+    stats = data.channel_buffer_stats()
+    assert stats.readings_in_slot == 2
+    assert stats.readings_total == 2
+    assert stats.allocated_bytes > 0
+    report = data.make_report(int(time.time()))
+    assert [
+        (r.ChannelName, r.ValueList, r.ScadaReadTimeUnixMsList)
+        for r in report.ChannelReadingList
+    ] == [(ch.Name, [1, 2], [now_ms, now_ms + 1])]
+    data.flush_recent_readings()
+    stats = data.channel_buffer_stats()
+    assert stats.readings_in_slot == 0
+    assert stats.readings_total == 2
+    assert stats.readings_per_second > 0
+    assert data.make_report(int(time.time())).ChannelReadingList == []
+
+
+def test_scada_data_incremental_snapshot(monkeypatch):
+    settings = ScadaSettings()
+    layout = House0Layout.load(settings.paths.hardware_layout)
+    data = ScadaData(settings, layout)
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+
+    def brute_force_readings():
+        return [
+            (ch.Name, data.latest_channel_values[ch.Name], data.latest_channel_unix_ms[ch.Name])
+            for ch in data.my_channels if not data.flatlined(ch)
+        ]
+
+    rng = random.Random(7)
+    names = [ch.Name for ch in data.my_channels]
+    assert data.make_snapshot().LatestReadingList == []
+    for _ in range(300):
+        for name in rng.sample(names, rng.randint(0, 4)):
+            read_ms = int((now[0] - rng.uniform(0, 30)) * 1000)
+            data.update_latest(name, rng.randint(-1000, 1000), read_ms)
+        if rng.random() < 0.05:
+            data.flush_channel_from_latest(rng.choice(names))
+        now[0] += rng.uniform(0, 20)
+        snapshot = data.make_snapshot()
+        assert [
+            (r.ChannelName, r.Value, r.ScadaReadTimeUnixMs) for r in snapshot.LatestReadingList
+        ] == brute_force_readings()
+    assert len(data._flatline_heap) <= len(names)
+
+
+def make_scada() -> Scada:
+    settings = ScadaSettings()
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    layout = House0Layout.load(settings.paths.hardware_layout)
+    return Scada(H0N.primary_scada, settings=settings, hardware_layout=layout)
+
+
+def readings_by_sender(scada: Scada) -> dict:
+    by_sender = {}
+    for ch in scada._layout.data_channels.values():
+        by_sender.setdefault(ch.captured_by_node, []).append(ch.Name)
+    return by_sender
+
+
+def test_scada_channel_indexed_dispatch():
+    scada = make_scada()
+    now_ms = int(time.time() * 1000)
+    for sender, names in readings_by_sender(scada).items():
+        scada.process_synced_readings(
+            sender,
+            SyncedReadings(
+                ChannelNameList=names,
+                ValueList=list(range(len(names))),
+                ScadaReadTimeUnixMs=now_ms,
+            )
+        )
+        for i, name in enumerate(names):
+            assert scada.data.latest_channel_values[name] == i
+            assert scada.data.latest_channel_unix_ms[name] == now_ms
+            assert scada.data.recent_readings[name].value_list() == [i]
+    assert len(scada.data.make_snapshot().LatestReadingList) == len(scada._layout.data_channels)
+
+    ch = scada._layout.data_channels[H0CN.store_pump_pwr]
+    synced_value = scada.data.latest_channel_values[ch.Name]
+    scada.process_channel_readings(
+        ch.captured_by_node,
+        ChannelReadings(
+            ChannelName=ch.Name,
+            ValueList=[5, 6],
+            ScadaReadTimeUnixMsList=[now_ms + 1, now_ms + 2],
+        )
+    )
+    assert scada.data.latest_channel_values[ch.Name] == 6
+    assert scada.data.recent_readings[ch.Name].value_list() == [synced_value, 5, 6]
+    with pytest.raises(ValueError):
+        scada.process_channel_readings(
+            scada.node,
+            ChannelReadings(ChannelName=ch.Name, ValueList=[7], ScadaReadTimeUnixMsList=[now_ms + 3])
+        )
+    with pytest.raises(ValueError):
+        scada.process_synced_readings(
+            ch.captured_by_node,
+            SyncedReadings(ChannelNameList=["not-a-channel"], ValueList=[1], ScadaReadTimeUnixMs=now_ms)
+        )
+    assert scada.data.latest_channel_values[ch.Name] == 6
+
+
+def test_scada_indexed_ingest_matches_name_based():
+    """The channel-indexed dispatch ingests readings as the previous name-based one did.
+
+    The layout's senders (tank module, relay and dfr multiplexers, power meter,
+    thermostat) each send one SyncedReadings, plus one ChannelReadings per channel.
+    """
+    scada = make_scada()
+    now_ms = int(time.time() * 1000)
+    messages = []
+    for sender, names in readings_by_sender(scada).items():
+        messages.append((
+            sender,
+            SyncedReadings(ChannelNameList=names, ValueList=[1] * len(names), ScadaReadTimeUnixMs=now_ms)
+        ))
+        for name in names:
+            messages.append((
+                sender,
+                ChannelReadings(ChannelName=name, ValueList=[1, 2], ScadaReadTimeUnixMsList=[now_ms, now_ms + 1])
+            ))
+    layout = scada._layout
+    data = scada.data
+
+    def name_based_ingest(from_node, payload):
+        # process_synced_readings/process_channel_readings before channel indexing
+        if isinstance(payload, SyncedReadings):
+            for idx, channel_name in enumerate(payload.ChannelNameList):
+                if channel_name not in layout.data_channels:
+                    raise ValueError(channel_name)
+                ch = layout.data_channels[channel_name]
+                data.recent_readings[ch.Name].append(payload.ValueList[idx], payload.ScadaReadTimeUnixMs)
+                data.update_latest(ch.Name, payload.ValueList[idx], payload.ScadaReadTimeUnixMs)
+        else:
+            if payload.ChannelName not in layout.data_channels:
+                raise ValueError(payload.ChannelName)
+            ch = layout.data_channels[payload.ChannelName]
+            if from_node != ch.captured_by_node:
+                raise ValueError(payload.ChannelName)
+            data.recent_readings[ch.Name].extend(payload.ValueList, payload.ScadaReadTimeUnixMsList)
+            data.update_latest(ch.Name, payload.ValueList[-1], payload.ScadaReadTimeUnixMsList[-1])
+
+    def indexed_ingest(from_node, payload):
+        if isinstance(payload, SyncedReadings):
+            scada.process_synced_readings(from_node, payload)
+        else:
+            scada.process_channel_readings(from_node, payload)
+
+    received = {}
+    for label, ingest in [("name based", name_based_ingest), ("channel indexed", indexed_ingest)]:
+        data.flush_recent_readings()
+        for from_node, payload in messages:
+            ingest(from_node, payload)
+        received[label] = (data.recent_channel_values, dict(data.latest_channel_values))
+    assert received["name based"] == received["channel indexed"]
+
+
+
+class RecordingCommunicator:
+    def __init__(self, name: str):
+        self.name = name
+        self.monitored_names = []
+        self.messages = []
+
+    def process_message(self, message):
+        self.messages.append(message)
+
+
+def test_scada_routes():
+    scada = make_scada()
+    routes = scada.routes
+    assert routes[H0N.primary_scada].kind == ScadaRouteKind.SELF
+    assert routes[H0N.admin].kind == ScadaRouteKind.ADMIN
+    assert routes[H0N.atn].kind == ScadaRouteKind.ATN
+    assert routes[H0N.home_alone].kind == ScadaRouteKind.LOCAL_MQTT
+    assert scada.routes is routes
+
+    # Rebuilt with a new communicator, which also handles home alone's normal node
+    home_alone = RecordingCommunicator(H0N.home_alone)
+    scada.add_communicator(home_alone)
+    assert scada.routes is not routes
+    assert scada.routes[H0N.home_alone].communicator is home_alone
+    assert scada.routes[H0N.home_alone_normal].communicator is home_alone
+
+    go_dormant = GoDormant(ToName=H0N.home_alone)
+    scada._send_to(scada.layout.node(H0N.home_alone), go_dormant)
+    scada._send_to(scada.layout.node(H0N.home_alone_normal), go_dormant, scada.layout.node(H0N.atn))
+    first, second = home_alone.messages
+    assert first.Payload is go_dormant
+    assert (first.Header.Src, first.Header.Dst, first.Header.MessageType) == (
+        H0N.primary_scada, H0N.home_alone, go_dormant.TypeName
+    )
+    assert first == Message(Src=H0N.primary_scada, Dst=H0N.home_alone, Payload=go_dormant)
+    assert (second.Header.Src, second.Header.Dst) == (H0N.atn, H0N.home_alone_normal)
+    assert scada.route_counts() == {H0N.home_alone: 1, H0N.home_alone_normal: 1}
+
 # @pytest.mark.asyncio
 # async def test_scada_relay_dispatch(tmp_path, monkeypatch, request):
 #     """Verify Scada forwards relay dispatch from Atn to relay and that resulting state changes in the relay are
@@ -0,0 +1,116 @@
+"""Tests for the delta snapshots between keyframes (actors.snapshot_delta)"""
+import uuid
+
+import numpy as np
+from gwproactor_test.certs import copy_keys, uses_tls
+from gwproto.named_types import SendSnap
+from gwproto.named_types.single_reading import SingleReading
+
+from actors import Scada
+from actors.config import ScadaSettings
+from actors.snapshot_delta import SnapshotAssembler, SnapshotDeltaTracker
+from data_classes.house_0_layout import House0Layout
+from data_classes.house_0_names import H0N
+from named_types import SingleMachineState, SnapshotDelta, SnapshotSpaceheat
+
+START_MS = 1_700_000_000_000
+INSTANCE_ID = str(uuid.uuid4())
+
+
+def snapshot(time_ms: int, values: dict, states: dict) -> SnapshotSpaceheat:
+    return SnapshotSpaceheat(
+        FromGNodeAlias="hw1.isone.me.versant.keene.beech.scada",
+        FromGNodeInstanceId=INSTANCE_ID,
+        SnapshotTimeUnixMs=time_ms,
+        LatestReadingList=[
+            SingleReading(ChannelName=name, Value=value, ScadaReadTimeUnixMs=time_ms - 500)
+            for name, value in values.items()
+        ],
+        LatestStateList=[
+            SingleMachineState(MachineHandle=handle, StateEnum="home.alone.state", State=state, UnixMs=START_MS)
+            for handle, state in states.items()
+        ],
+    )
+
+
+def snapshots(count: int) -> list:
+    """Temperatures drifting by a few mC, powers that switch, and a relay state change"""
+    rng = np.random.default_rng(0)
+    temps = 50_000 + np.cumsum(rng.integers(-10, 11, (count, 30)), axis=0)
+    result = []
+    for i in range(count):
+        values = {f"temp-{j}": int(temps[i, j]) for j in range(30)}
+        values.update({f"power-{j}": 4200 if (i // 4 + j) % 3 else 0 for j in range(5)})
+        states = {"auto.h": "HpOnStoreOff" if i < count // 2 else "HpOffStoreDischarge"}
+        result.append(snapshot(START_MS + i * 30_000, values, states))
+    return result
+
+
+def test_snapshot_delta_round_trip():
+    thresholds = {f"temp-{j}": 50 for j in range(30)}
+    tracker = SnapshotDeltaTracker(keyframe_every=10, thresholds=thresholds)
+    assembler = SnapshotAssembler(request_keyframe=lambda: None)
+    full_bytes = delta_bytes = 0
+    for i, snap in enumerate(snapshots(25)):
+        sent = tracker.next(snap)
+        assert isinstance(sent, SnapshotSpaceheat) == (i % 10 == 0)
+        full_bytes += len(snap.model_dump_json())
+        delta_bytes += len(sent.model_dump_json())
+        received = assembler.process(type(sent).model_validate_json(sent.model_dump_json()))
+        assert received.SnapshotTimeUnixMs == snap.SnapshotTimeUnixMs
+        expected = {r.ChannelName: r.Value for r in snap.LatestReadingList}
+        got = {r.ChannelName: r.Value for r in received.LatestReadingList}
+        assert got.keys() == expected.keys()
+        assert all(abs(got[name] - expected[name]) <= thresholds.get(name, 0) for name in got)
+        assert received.LatestStateList == snap.LatestStateList
+    assert delta_bytes < full_bytes / 3
+    assert assembler.gaps == 0
+
+
+def test_snapshot_delta_flatline_and_gap():
+    tracker = SnapshotDeltaTracker(keyframe_every=100)
+    requests = []
+    assembler = SnapshotAssembler(request_keyframe=lambda: requests.append(1))
+    assembler.process(tracker.next(snapshot(START_MS, {"a": 1, "b": 2}, {})))
+
+    # b flatlines, c appears
+    delta = tracker.next(snapshot(START_MS + 1000, {"a": 1, "c": 3}, {}))
+    assert isinstance(delta, SnapshotDelta)
+    assert [r.ChannelName for r in delta.ChangedReadingList] == ["c"]
+    assert delta.FlatlinedChannelList == ["b"]
+    received = assembler.process(delta)
+    assert {r.ChannelName: r.Value for r in received.LatestReadingList} == {"a": 1, "c": 3}
+
+    # A delta missed: one keyframe request, however many deltas follow
+    tracker.next(snapshot(START_MS + 2000, {"a": 2, "c": 3}, {}))
+    assert assembler.process(tracker.next(snapshot(START_MS + 3000, {"a": 3, "c": 3}, {}))) is None
+    assert assembler.process(tracker.next(snapshot(START_MS + 4000, {"a": 4, "c": 3}, {}))) is None
+    assert (len(requests), assembler.gaps) == (1, 2)
+
+    tracker.request_keyframe()
+    keyframe = tracker.next(snapshot(START_MS + 5000, {"a": 5}, {}))
+    assert isinstance(keyframe, SnapshotSpaceheat)
+    assert assembler.process(keyframe) == keyframe
+    assert assembler.process(tracker.next(snapshot(START_MS + 6000, {"a": 6}, {}))) is not None
+    assert len(requests) == 1
+
+
+def test_scada_snapshot_deltas():
+    settings = ScadaSettings(snapshot_keyframe_every=5)
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    layout = House0Layout.load(settings.paths.hardware_layout)
+    scada = Scada(H0N.primary_scada, settings, layout)
+    sent = []
+    scada._send_to = lambda dst, payload, *args, **kwargs: sent.append((dst.name, payload))
+    scada.send_snap()
+    scada.send_snap()
+    assert [type(payload) for _, payload in sent] == [SnapshotSpaceheat, SnapshotDelta]
+
+    # A send.snap from the atn gets a keyframe, to which later deltas refer
+    sent.clear()
+    scada.process_scada_message(scada.atn, SendSnap(FromGNodeAlias=layout.atn_g_node_alias))
+    assert isinstance(sent[0][1], SnapshotSpaceheat)
+    scada.send_snap()
+    assert sent[-1][1].KeyframeTimeUnixMs == sent[0][1].SnapshotTimeUnixMs
@@ -1,5 +1,6 @@
 import re
 import logging
+from typing import Literal
 from pydantic import BaseModel
 from pydantic import model_validator
 from enums import HpModel
@@ -50,6 +51,13 @@ class AtnSettings(ProactorSettings):
     model_config = SettingsConfigDict(env_prefix="ATN_", extra="ignore")
     contract_rep_logging_level: int = logging.INFO
     flo_logging_level: int = logging.INFO
+    flo_vectorized_solver: bool = False
+    flo_persistent_graph: bool = False
+    flo_process_mode: bool = False
+    flo_bid_min_price_usd_mwh: float = -100
+    flo_bid_max_price_usd_mwh: float = 2000
+    flo_bid_price_step_usd_mwh: float = 1
+    report_encoding: Literal["json", "columnar", "columnar.zlib"] = "json"
     
     @model_validator(mode="before")
     @classmethod
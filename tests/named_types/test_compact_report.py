@@ -0,0 +1,26 @@
+"""Tests compact.report type, version 000"""
+
+from named_types import CompactReport
+
+
+def test_compact_report_generated() -> None:
+    d = {
+        "FromGNodeAlias": "hw1.isone.me.versant.keene.beech.scada",
+        "FromGNodeInstanceId": "98542a17-3180-4f2a-a929-6023f0e7a106",
+        "AboutGNodeAlias": "hw1.isone.me.versant.keene.beech.ta",
+        "SlotStartUnixS": 1700000100,
+        "SlotDurationS": 300,
+        "ChannelNameList": ["hp-idu-pwr"],
+        "StateList": [],
+        "FsmReportList": [],
+        "MessageCreatedMs": 1700000400000,
+        "Id": "4dab57dd-8b4e-4ea4-90a3-d63df9eeb061",
+        "Encoding": "columnar.zlib",
+        "EncodedReadings": "eJxjYmBgZGBiYmRhYGRkBwACsAEG",
+        "TypeName": "compact.report",
+        "Version": "000",
+    }
+
+    d2 = CompactReport.model_validate(d).model_dump(exclude_none=True)
+
+    assert d2 == d
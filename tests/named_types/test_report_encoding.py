@@ -0,0 +1,17 @@
+"""Tests report.encoding type, version 000"""
+
+from named_types import ReportEncoding
+
+
+def test_report_encoding_generated() -> None:
+    d = {
+        "FromGNodeAlias": "hw1.isone.me.versant.keene.beech",
+        "Encoding": "columnar.zlib",
+        "UnixTimeMs": 1700000000000,
+        "TypeName": "report.encoding",
+        "Version": "000",
+    }
+
+    d2 = ReportEncoding.model_validate(d).model_dump(exclude_none=True)
+
+    assert d2 == d
@@ -0,0 +1,30 @@
+"""Tests snapshot.delta type, version 000"""
+
+from named_types import SnapshotDelta
+
+
+def test_snapshot_delta_generated() -> None:
+    d = {
+        "FromGNodeAlias": "hw1.isone.me.versant.keene.beech.scada",
+        "FromGNodeInstanceId": "98542a17-3180-4f2a-a929-6023f0e7a106",
+        "SnapshotTimeUnixMs": 1700000030000,
+        "KeyframeTimeUnixMs": 1700000000000,
+        "Sequence": 3,
+        "ChangedReadingList": [
+            {
+                "ChannelName": "hp-lwt",
+                "Value": 52300,
+                "ScadaReadTimeUnixMs": 1700000029500,
+                "TypeName": "single.reading",
+                "Version": "000",
+            }
+        ],
+        "FlatlinedChannelList": ["buffer-depth1"],
+        "ChangedStateList": [],
+        "TypeName": "snapshot.delta",
+        "Version": "000",
+    }
+
+    d2 = SnapshotDelta.model_validate(d).model_dump(exclude_none=True)
+
+    assert d2 == d
@@ -0,0 +1,22 @@
+"""Tests ticklist.batch type, version 000"""
+
+from named_types import TicklistBatch
+
+
+def test_ticklist_batch_generated() -> None:
+    d = {
+        "TerminalAssetAlias": "hw1.isone.me.versant.keene.beech.ta",
+        "ChannelName": "primary-flow",
+        "HwUid": "pico_1",
+        "TicklistTypeName": "ticklist.hall",
+        "TicklistCount": 2,
+        "TickCount": 3,
+        "FirstScadaReceivedUnixMs": 1700000000000,
+        "EncodedTicklists": "eJxjYmBgZGBiYmRhYGRkBwACsAEG",
+        "TypeName": "ticklist.batch",
+        "Version": "000",
+    }
+
+    d2 = TicklistBatch.model_validate(d).model_dump(exclude_none=True)
+
+    assert d2 == d
@@ -0,0 +1,97 @@
+"""Tests for the pipelined ADS1115 reads of the TSnap (drivers.multipurpose_sensor.ads1115_scan)"""
+import pytest
+
+from drivers.multipurpose_sensor.ads1115_scan import (
+    CONFIG_DATA_RATE,
+    CONFIG_GAIN,
+    AdafruitAdsChip,
+    AdsScanner,
+    FakeAdsChip,
+    FakeClock,
+    conversion_seconds,
+    run_scan_benchmark,
+)
+
+
+def fake_tsnap(clock: FakeClock, data_rate: int = 128, num_chips: int = 3):
+    return {
+        idx: FakeAdsChip({pin: idx + pin / 10 for pin in range(4)}, data_rate=data_rate, clock=clock)
+        for idx in range(num_chips)
+    }
+
+
+def test_scan():
+    clock = FakeClock()
+    chips = fake_tsnap(clock)
+    scanner = AdsScanner(chips, clock=clock, sleep=clock.sleep)
+    pins_by_chip = {0: [0, 1, 2, 3], 1: [0, 1, 2, 3], 2: [1, 3]}
+    volts = scanner.scan(pins_by_chip)
+    assert volts == {(idx, pin): idx + pin / 10 for idx, pins in pins_by_chip.items() for pin in pins}
+
+    # One wait per round of conversions: 4 rounds, not 10 conversions
+    assert clock.now == pytest.approx(4 * conversion_seconds(128))
+    assert clock.sleeps == 4
+    assert [chip.conversions for chip in chips.values()] == [4, 4, 2]
+    # One conversion in flight per chip: none started before the previous one was done
+    assert not any(chip.restarts for chip in chips.values())
+    # start, status and result, and no polling
+    assert sum(chip.transactions for chip in chips.values()) == 3 * 10
+
+    # Same results one conversion at a time, taking a conversion time each
+    clock.now = 0
+    assert AdsScanner(chips, clock=clock, sleep=clock.sleep).read_sequentially(pins_by_chip) == volts
+    assert clock.now >= 10 / 128
+
+
+def test_scan_failures():
+    clock = FakeClock()
+    chips = fake_tsnap(clock)
+    chips[1].volts[2] = OSError("Remote I/O error")
+    volts = AdsScanner(chips, clock=clock, sleep=clock.sleep).scan({0: [0, 1], 1: [1, 2, 3]})
+    assert isinstance(volts[(1, 2)], OSError)
+    assert volts[(1, 3)] == 1.3
+    assert volts[(0, 1)] == 0.1
+
+    # A conversion that never completes times out
+    chips[0].data_rate = 1000
+    chips[0].conversion_ready = lambda: False
+    volts = AdsScanner(chips, clock=clock, sleep=clock.sleep).scan({0: [0], 1: [0]})
+    assert isinstance(volts[(0, 0)], OSError)
+    assert volts[(1, 0)] == 1.0
+
+
+def test_scan_benchmark():
+    results = run_scan_benchmark(num_chips=3, pins_per_chip=4)
+    assert results["pipelined_s"] < results["sequential_s"] / 2.5
+    assert results["pipelined_fast_s"] < results["pipelined_s"] / 6
+    assert results["pipelined_transactions"] < results["sequential_transactions"]
+
+
+class FakeAdafruitAds:
+    """The register access of adafruit_ads1x15's ADS1115"""
+
+    def __init__(self, raw: int):
+        self.gain = 2 / 3
+        self.data_rate = 860
+        self.raw = raw
+        self.writes = []
+
+    def _write_register(self, reg: int, value: int) -> None:
+        self.writes.append((reg, value))
+
+    def _read_register(self, reg: int, fast: bool = False) -> int:
+        return 0x8000 if reg == 0x01 else self.raw
+
+    @staticmethod
+    def _conversion_value(raw_adc: int) -> int:
+        return raw_adc - 0x10000 if raw_adc & 0x8000 else raw_adc
+
+
+def test_adafruit_ads_chip():
+    ads = FakeAdafruitAds(raw=10000)
+    chip = AdafruitAdsChip(ads)
+    chip.start_conversion(2)
+    # Single shot, AIN2 against GND, +/- 6.144 V, 860 SPS, comparator off
+    assert ads.writes == [(0x01, 0x8000 | 0x6000 | CONFIG_GAIN[2 / 3] | 0x0100 | CONFIG_DATA_RATE[860] | 0x0003)]
+    assert chip.conversion_ready()
+    assert chip.read_volts() == pytest.approx(10000 * 6.144 / 32767)
@@ -11,6 +11,7 @@ from gwproactor.config.proactor_settings import NUM_INITIAL_EVENT_REUPLOADS
 
 from actors.config import AdminLinkSettings
 from actors.config import PersisterSettings
+from actors.config import ReportStoreSettings
 from gwproactor.config import LoggingSettings
 from gwproactor.config import MQTTClient
 from actors.config import ScadaSettings
@@ -46,6 +47,13 @@ def test_scada_settings_defaults(clean_scada_env):
         max_ewt_f=170,
         load_overestimation_percent=0,
         monitor_only=False,
+        flow_hz_streaming=False,
+        seconds_per_ticklist_batch=0,
+        power_meter_idle_poll_period_ms=0,
+        tsnap_pipelined_reads=False,
+        compact_reports=False,
+        snapshot_keyframe_every=0,
+        snapshot_delta_thresholds={},
         oil_boiler_for_onpeak_backup=True,
         stratboss_dist_010v=100,
         pico_cycler_state_logging=False,
@@ -64,6 +72,7 @@ def test_scada_settings_defaults(clean_scada_env):
         paths=Paths().model_dump(),
         logging=LoggingSettings().model_dump(),
         persister=PersisterSettings().model_dump(),
+        report_store=ReportStoreSettings().model_dump(),
         mqtt_link_poll_seconds=MQTT_LINK_POLL_SECONDS,
         ack_timeout_seconds=ACK_TIMEOUT_SECONDS,
         num_initial_event_reuploads=NUM_INITIAL_EVENT_REUPLOADS,
@@ -0,0 +1,256 @@
+"""Tests for the flow meter signal processing (drivers.pipe_flow_sensor)"""
+import json
+import time
+
+import numpy as np
+import pytest
+from gwproto.named_types import TicklistHall, TicklistHallReport, TicklistReed, TicklistReedReport
+
+from drivers.pipe_flow_sensor.filter_benchmark import load_ticklists, run_filter_benchmark, synthetic_ticklists
+from drivers.pipe_flow_sensor.hz_estimator import NO_FLOW_HZ, StreamingHzEstimator
+from drivers.pipe_flow_sensor.signal_processing import (
+    butter_lowpass,
+    direct_form_filter,
+    filtering,
+    lfilter_zi,
+    lowpass_design,
+    padded_forward_backward,
+    simple_linear_filter,
+    steady_state,
+)
+from drivers.pipe_flow_sensor.ticklist_codec import (
+    TicklistBatcher,
+    decode_ticklist_batch,
+    encode_ticklist_batch,
+    zigzag_varint_decode,
+    zigzag_varint_encode,
+)
+
+
+def ticks_ns(hz: np.ndarray, start_ns: float = 1.7e18) -> np.ndarray:
+    """Tick times for a flow at the given frequency, one tick per value"""
+    return start_ns + np.cumsum(1e9 / hz)
+
+
+@pytest.mark.parametrize("fs", [16, 128, 2500])
+def test_direct_form_filter(fs):
+    b, a = butter_lowpass(N=5, Wn=2, fs=fs)
+    x = np.random.default_rng(0).normal(10, 1, 700)
+    y, _ = direct_form_filter(b, a, x)
+    assert np.array_equal(y, simple_linear_filter(b, a, x)[0])
+    assert np.array_equal(filtering(b, a, x), padded_forward_backward(b, a, x, linear_filter=simple_linear_filter))
+
+    # Filtering block by block with the carried state is the same as one pass
+    y1, state = direct_form_filter(b, a, x[:123])
+    y2, state = direct_form_filter(b, a, x[123:], state)
+    assert np.array_equal(np.r_[y1, y2], y)
+
+    # The steady state of a constant input is the input
+    y, _ = direct_form_filter(b, a, np.full(50, 7.0), steady_state(b, a, 7.0))
+    assert np.allclose(y, 7.0)
+
+
+def test_lowpass_design():
+    b, a, zi = lowpass_design(2, 128)
+    assert lowpass_design(2, 128)[0] is b
+    assert not b.flags.writeable
+    assert np.array_equal(b, butter_lowpass(N=5, Wn=2, fs=128)[0])
+    assert np.array_equal(zi, lfilter_zi(b, a))
+    # zi is the direct form II transposed state of a unit step at rest
+    z = zi.tolist()
+    for _ in range(10):
+        y = b[0] + z[0]
+        z = [b[k + 1] + (z[k + 1] if k + 1 < len(z) else 0) - a[k + 1] * y for k in range(len(z))]
+        assert y == pytest.approx(1)
+    assert z == pytest.approx(zi.tolist())
+
+
+@pytest.mark.parametrize("kwargs", [dict(exp_alpha=0.3), dict(cutoff_frequency=2)])
+def test_streaming_hz_estimator(kwargs):
+    rng = np.random.default_rng(1)
+    # Between 15 and 22 Hz: resampled at 128 Hz throughout
+    hz = 18.5 + 3 * np.sin(np.arange(2000) / 200) + rng.normal(0, 0.1, 2000)
+    ticks = ticks_ns(hz)
+
+    estimator = StreamingHzEstimator(no_flow_ms=250, **kwargs)
+    times, smoothed = [], []
+    for chunk in np.array_split(ticks, 20):
+        t, y = estimator.update(chunk.tolist())
+        times.append(t)
+        smoothed.append(y)
+    times, smoothed = np.concatenate(times), np.concatenate(smoothed)
+    assert np.all(np.diff(times) > 0)
+    # No restart at ticklist boundaries: same output as all the ticks at once
+    one_pass = StreamingHzEstimator(no_flow_ms=250, **kwargs)
+    one_pass_times, one_pass_smoothed = one_pass.update(ticks)
+    # float64 ns timestamps are only exact to 256 ns around 2024
+    assert np.allclose(times, one_pass_times, rtol=0, atol=1e4)
+    assert np.allclose(smoothed, one_pass_smoothed)
+    # No startup transient, and the estimate follows the flow
+    assert smoothed[0] == pytest.approx(1e9 / (ticks[1] - ticks[0]), rel=1e-6)
+    true_hz = np.interp(times, ticks[1:], 1e9 / np.diff(ticks))
+    assert np.abs(smoothed - true_hz)[len(times) // 10:].mean() < 1
+
+    # Ticks already seen are ignored
+    assert len(estimator.update(ticks[-5:])[0]) == 0
+
+    # The flow doubles: a new Butterworth filter starts from where the previous one was
+    t, y = estimator.update(ticks_ns(np.full(200, 2 * hz[-1]), start_ns=ticks[-1]))
+    if "cutoff_frequency" in kwargs:
+        assert estimator.fs == 256
+        assert y[0] == pytest.approx(smoothed[-1], abs=0.01)
+    else:
+        assert y[0] == pytest.approx(0.7 * smoothed[-1] + 0.3 * 2 * hz[-1], rel=1e-4)
+    assert y[-1] == pytest.approx(2 * hz[-1], rel=1e-3)
+
+
+def test_streaming_hz_no_flow():
+    estimator = StreamingHzEstimator(no_flow_ms=250, exp_alpha=1)
+    ticks = np.r_[ticks_ns(np.full(10, 10.0)), 0]
+    # 0.5 s without ticks after the 10th tick
+    ticks[-1] = ticks[-2] + 5e8
+    times, hz = estimator.update(ticks)
+    added = times[(times > ticks[-2]) & (times < ticks[-1])]
+    assert np.allclose(np.diff(added), 20e6)
+    assert len(added) == 24
+    assert np.all(hz[np.isin(times, added)] == NO_FLOW_HZ)
+    assert hz[-1] == pytest.approx(2)
+
+    # The flow stopped between ticklists: start over
+    times, hz = estimator.update(ticks_ns(np.full(5, 40.0), start_ns=ticks[-1] + 1e10))
+    assert len(times) == 4
+    assert hz == pytest.approx(40, rel=1e-4)
+
+
+def test_filter_benchmark(tmp_path):
+    ticklists = synthetic_ticklists(num_ticklists=2, seconds=2, mean_hz=20)
+    messages = []
+    for ticks in ticklists:
+        first = int(ticks[0])
+        ticklist = TicklistHall(
+            HwUid="pico_4c1a21",
+            FirstTickTimestampNanoSecond=first,
+            RelativeMicrosecondList=[int(round((t - first) / 1e3)) for t in ticks],
+            PicoBeforePostTimestampNanoSecond=int(ticks[-1]),
+        )
+        messages.append(ticklist.model_dump())
+    messages[1] = TicklistHallReport(
+        TerminalAssetAlias="hw1.isone.me.versant.keene.beech.ta",
+        ChannelName="primary-flow",
+        ScadaReceivedUnixMs=int(ticklists[1][-1] / 1e6),
+        Ticklist=TicklistHall(**messages[1]),
+    ).model_dump()
+    (tmp_path / "ticklists.json").write_text(json.dumps(messages))
+    loaded = load_ticklists([tmp_path / "ticklists.json"])
+    assert len(loaded) == 2
+    # float64 ns timestamps are only exact to 256 ns around 2024
+    assert np.allclose(loaded[0], ticklists[0], rtol=0, atol=1e3)
+
+    results = run_filter_benchmark(loaded, repeat=1)
+    assert len(results["runs"]) == 2
+    assert results["identical"]
+    assert all(run["num_samples"] > 0 and run["new_s"] > 0 for run in results["runs"])
+
+
+def test_zigzag_varint():
+    values = np.array([0, 1, -1, 63, -64, 64, 300, -300, 1_700_000_000_000_000_000, 2**63 - 1, -2**63])
+    encoded = zigzag_varint_encode(values)
+    assert len(zigzag_varint_encode([0, 1, -1, 63, -64])) == 5
+    assert len(zigzag_varint_encode([64, -65])) == 4
+    assert np.array_equal(zigzag_varint_decode(encoded), values)
+    assert len(zigzag_varint_decode(b"")) == 0
+    with pytest.raises(ValueError):
+        zigzag_varint_decode(encoded[:-1])
+
+
+def test_ticklist_batch():
+    rng = np.random.default_rng(0)
+    received_ms = 1_700_000_000_000
+    hall_reports = []
+    for i in range(30):
+        relative = np.cumsum(rng.integers(15_000, 16_000, rng.integers(2, 400))).tolist()
+        first_ns = 1_700_000_000_000_000_000 + i * 10**9
+        hall_reports.append(
+            TicklistHallReport(
+                TerminalAssetAlias="hw1.isone.me.versant.keene.beech.ta",
+                ChannelName="primary-flow",
+                ScadaReceivedUnixMs=received_ms + i * 1000,
+                Ticklist=TicklistHall(
+                    HwUid="pico_1",
+                    FirstTickTimestampNanoSecond=first_ns,
+                    RelativeMicrosecondList=relative,
+                    PicoBeforePostTimestampNanoSecond=first_ns + relative[-1] * 1000 + 10**6,
+                ),
+            )
+        )
+    batcher = TicklistBatcher(window_s=30)
+    for report in hall_reports:
+        assert not batcher.due(now_ms=report.ScadaReceivedUnixMs)
+        batcher.reports.append(report)
+        batcher.counter.add_report(report)
+    assert batcher.due(now_ms=received_ms + 30_000)
+    batch = batcher.flush()
+    assert batcher.reports == [] and batcher.flush() is None
+    assert batch.TicklistCount == 30
+    assert batch.TickCount == sum(len(r.Ticklist.RelativeMicrosecondList) for r in hall_reports)
+    assert decode_ticklist_batch(batch) == hall_reports
+
+    # Hall ticks 15 to 16 ms apart: about 2 bytes per tick once base64 encoded, against 9 in json
+    counter = batcher.counter
+    assert counter.raw_bytes == sum(len(r.model_dump_json()) for r in hall_reports)
+    assert counter.encoded_bytes == len(batch.model_dump_json())
+    assert counter.encoded_bytes_per_tick < 2.5
+    assert counter.compression_ratio > 3
+
+    # Reed ticklists, with and without ticks
+    reed_reports = [
+        TicklistReedReport(
+            TerminalAssetAlias="hw1.isone.me.versant.keene.beech.ta",
+            ChannelName="dist-flow",
+            ScadaReceivedUnixMs=received_ms + i * 60_000,
+            Ticklist=TicklistReed(
+                HwUid="pico_2",
+                FirstTickTimestampNanoSecond=None if i % 2 else 1_700_000_000_000_000_000 + i * 6 * 10**10,
+                RelativeMillisecondList=[] if i % 2 else [0, 1200, 2500, 2501][: i % 4 + 1],
+                PicoBeforePostTimestampNanoSecond=1_700_000_000_000_000_000 + (i + 1) * 6 * 10**10,
+            ),
+        )
+        for i in range(5)
+    ]
+    assert decode_ticklist_batch(encode_ticklist_batch(reed_reports)) == reed_reports
+    with pytest.raises(ValueError):
+        encode_ticklist_batch(hall_reports[:1] + reed_reports[:1])
+    with pytest.raises(ValueError):
+        encode_ticklist_batch([])
+
+
+def test_ticklist_batcher_hw_uid_change():
+    """A pico swapped mid-window starts a new batch rather than failing the window"""
+    received_ms = int(time.time() * 1000) - 60_000
+    reports = [
+        TicklistHallReport(
+            TerminalAssetAlias="hw1.isone.me.versant.keene.beech.ta",
+            ChannelName="primary-flow",
+            ScadaReceivedUnixMs=received_ms + i * 1000,
+            Ticklist=TicklistHall(
+                HwUid="pico_1" if i < 3 else "pico_9",
+                FirstTickTimestampNanoSecond=1_700_000_000_000_000_000 + i * 10**9,
+                RelativeMicrosecondList=[0, 15_500, 31_000],
+                PicoBeforePostTimestampNanoSecond=1_700_000_000_000_000_000 + i * 10**9 + 32 * 10**6,
+            ),
+        )
+        for i in range(5)
+    ]
+    batcher = TicklistBatcher(window_s=3600)
+    assert [batcher.add(report) for report in reports[:3]] == [None] * 3
+    batch = batcher.add(reports[3])
+    assert batch.HwUid == "pico_1" and decode_ticklist_batch(batch) == reports[:3]
+    assert batcher.add(reports[4]) is None
+    batch = batcher.flush()
+    assert batch.HwUid == "pico_9" and decode_ticklist_batch(batch) == reports[3:]
+
+    # A batch that fails to encode is dropped, not retried with every later report
+    batcher.reports = reports[:1] + reports[3:4]
+    with pytest.raises(ValueError):
+        batcher.flush()
+    assert batcher.reports == []
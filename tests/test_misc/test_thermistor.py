@@ -0,0 +1,72 @@
+"""Tests for the thermistor volts to temperature conversion (drivers.thermistor)"""
+import math
+
+import numpy as np
+import pytest
+
+from drivers.thermistor import (
+    TABLE_MAX_C,
+    TABLE_MIN_C,
+    TABLE_SIZE,
+    PicoTankThermistor,
+    PullUpThermistor,
+    pico_tank_thermistor,
+    pull_up_thermistor,
+)
+
+
+def pico_tank_reference(volts: float, beta: float, pico_kohms: float) -> float:
+    """The scalar conversion ApiTankModule used before the converters"""
+    r_therm = 1 / ((3.3 / volts - 1) / 5.65 - 1 / pico_kohms)
+    if r_therm <= 0:
+        raise ValueError("Disconnected thermistor!")
+    return 1 / ((1 / 298) + (math.log(r_therm / 10) / beta)) - 273
+
+
+def tsnap_reference(voltage: float) -> float:
+    """The scalar conversion of the TSnap driver"""
+    rt = 10000 * voltage / (4.85 - voltage)
+    return 1 / ((1 / 298) + (math.log(rt / 10000) / 3977)) - 273
+
+
+@pytest.mark.parametrize("beta,pico_kohms", [(3977, 30), (3950, 20)])
+def test_pico_tank_thermistor(beta, pico_kohms):
+    converter = pico_tank_thermistor(beta, pico_kohms)
+    assert pico_tank_thermistor(beta, pico_kohms) is converter
+    volts = np.random.default_rng(0).uniform(0.15, 2.5, 1000)
+    expected = [pico_tank_reference(v, beta, pico_kohms) for v in volts]
+    assert np.allclose(converter.temp_c(volts), expected, rtol=0, atol=1e-9)
+    assert converter.temp_c(1.0) == pytest.approx(pico_tank_reference(1.0, beta, pico_kohms))
+    assert np.allclose(converter.temp_f(volts), 32 + np.array(expected) * 9 / 5)
+
+    # Disconnected: no positive resistance
+    with pytest.raises(ValueError):
+        pico_tank_reference(3.0, beta, pico_kohms)
+    assert np.isnan(converter.temp_c([0, 3.0, 3.3, -1])).all()
+
+
+def test_pull_up_thermistor():
+    converter = pull_up_thermistor(beta=3977, r0_ohms=10000, pull_up_ohms=10000, supply_volts=4.85)
+    volts = np.linspace(0.1, 4.7, 500)
+    assert np.allclose(converter.temp_c(volts), [tsnap_reference(v) for v in volts], rtol=0, atol=1e-9)
+    assert np.isnan(converter.temp_c([0, 4.85, 5])).all()
+
+
+@pytest.mark.parametrize(
+    "converter",
+    [
+        PicoTankThermistor(beta=3977, pico_kohms=30, table_size=TABLE_SIZE),
+        PullUpThermistor(beta=3977, r0_ohms=10000, pull_up_ohms=10000, supply_volts=4.85, table_size=TABLE_SIZE),
+    ],
+)
+def test_interpolation_table(converter):
+    # The table covers TABLE_MIN_C to TABLE_MAX_C, well within a thousandth of a degree
+    assert sorted(converter.temp_c(converter.table_volts[[0, -1]])) == pytest.approx([TABLE_MIN_C, TABLE_MAX_C])
+    assert converter.table_error_c < 1e-3
+    volts = np.random.default_rng(1).uniform(converter.table_volts[0], converter.table_volts[-1], 10_000)
+    error = np.abs(converter.temp_c(volts) - converter.exact_temp_c(volts))
+    assert error.max() <= converter.table_error_c * 1.01
+
+    # Outside of the table: the beta formula, or NaN
+    outside = np.array([converter.table_volts[0] / 2, 0, -1, 10])
+    assert np.array_equal(converter.temp_c(outside), converter.exact_temp_c(outside), equal_nan=True)